@@ -1,142 +1,453 @@
- # dashboard.py
-import time
-import os
-import sqlite3
-from datetime import datetime
-
-class RealTimeDashboard:
-    def __init__(self, db_path="sensor_data.db"):
-        self.db_path = db_path
-        self.running = True
-        
-    def clear_screen(self):
-        """Clear the terminal screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
-    
-    def get_live_data(self):
-        """Get the latest data from database"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            
-            # Get total statistics
-            cursor.execute("SELECT COUNT(*) FROM sensor_readings")
-            total = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM sensor_readings WHERE status='Critical'")
-            critical = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM sensor_readings WHERE status='Warning'")
-            warning = cursor.fetchone()[0]
-            
-            # Get latest readings from each device
-            cursor.execute('''
-                SELECT device_id, temperature, vibration, voltage, status, timestamp
-                FROM sensor_readings 
-                WHERE id IN (
-                    SELECT MAX(id) FROM sensor_readings GROUP BY device_id
-                )
-                ORDER BY device_id
-            ''')
-            devices = cursor.fetchall()
-            
-            conn.close()
-            
-            return {
-                'total': total,
-                'critical': critical,
-                'warning': warning,
-                'devices': devices
-            }
-            
-        except Exception as e:
-            print(f"Database error: {e}")
-            return None
-    
-    def display_dashboard(self):
-        """Display the real-time dashboard"""
-        print(" Starting Real-Time Dashboard...")
-        print("Press Ctrl+C to exit\n")
-        time.sleep(2)
-        
-        try:
-            while self.running:
-                self.clear_screen()
-                
-                # Get latest data
-                data = self.get_live_data()
-                
-                if data is None:
-                    print(" No data available yet")
-                    print("Start the monitoring system first to collect data")
-                    time.sleep(3)
-                    break
-                
-                # Display header
-                print("=" * 70)
-                print(" REAL-TIME SENSOR MONITORING DASHBOARD")
-                print("=" * 70)
-                print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f" Total Readings: {data['total']} | "
-                      f" Warnings: {data['warning']} | "
-                      f" Critical: {data['critical']}")
-                print("-" * 70)
-                
-                # Display device status
-                print("\n🔧 DEVICE STATUS")
-                print("-" * 70)
-                print(f"{'Device':<10} {'Status':<12} {'Temp (°C)':<10} {'Vibration':<10} {'Voltage':<10} {'Last Update':<15}")
-                print("-" * 70)
-                
-                for device in data['devices']:
-                    device_id, temp, vib, volt, status, timestamp = device
-                    
-                    # Format timestamp
-                    if 'T' in timestamp:
-                        time_str = timestamp.split('T')[1][:8]
-                    else:
-                        time_str = timestamp[11:19] if len(timestamp) > 11 else timestamp
-                    
-                    # Status icons
-                    if status == "Critical":
-                        status_icon = "🔴"
-                    elif status == "Warning":
-                        status_icon = "🟡"
-                    else:
-                        status_icon = "🟢"
-                    
-                    # Highlight high temperature
-                    temp_display = f"{temp}°C"
-                    if temp > 80:
-                        temp_display = f" {temp}°C"
-                    
-                    print(f"{device_id:<10} {status_icon} {status:<9} {temp_display:<12} {vib:<10} {volt:<10} {time_str:<15}")
-                
-                print("\n" + "=" * 70)
-                print("Auto-refreshing every 5 seconds... Press Ctrl+C to exit")
-                
-                # Wait before refresh
-                time.sleep(5)
-                
-        except KeyboardInterrupt:
-            print("\n Dashboard closed")
-            self.running = False
-        except Exception as e:
-            print(f"Dashboard error: {e}")
-            
-    def run(self):
-        """Start the dashboard"""
-        self.display_dashboard()
-
-# Quick test function
-if __name__ == "__main__":
-    print("Testing Dashboard...")
-    
-    # First, check if database exists
-    if not os.path.exists("sensor_data.db"):
-        print(" No database found!")
-        print("Run main.py first to generate sensor data")
-    else:
-        dashboard = RealTimeDashboard()
+ # dashboard.py
+import time
+import os
+import sys
+import json
+import shutil
+import socket
+import sqlite3
+import importlib.util
+from datetime import datetime
+from urllib.parse import quote
+
+def load_component(name):
+    """Load a component file such as storage.database.py by path, sharing main.py's copy"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{name}.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+# The storage component's reader queries and rollup summaries
+database = load_component("storage.database")
+
+# Where a running monitor serves its live state (LIVE_HOST / LIVE_PORT in the processor)
+LIVE_HOST = '127.0.0.1'
+LIVE_PORT = 8765
+
+class LiveStateClient:
+    """Polls a running processor's live state over its local socket"""
+    def __init__(self, host=LIVE_HOST, port=LIVE_PORT, timeout=1.0):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.conn = None
+        self.reader = None
+        
+    def snapshot(self):
+        """Return the live state dict, or None if no monitor is serving it"""
+        try:
+            if self.conn is None:
+                self.conn = socket.create_connection(self.address, timeout=self.timeout)
+                self.reader = self.conn.makefile('rb')
+            self.conn.sendall(b"SNAPSHOT\n")
+            line = self.reader.readline()
+            if not line:
+                raise ConnectionError("live state server closed the connection")
+            return json.loads(line)
+        except (OSError, ValueError):
+            self.close()
+            return None
+            
+    def close(self):
+        if self.conn is not None:
+            self.reader.close()
+            self.conn.close()
+        self.conn = self.reader = None
+        
+    def subscribe(self, rate=10.0, wait=0.1):
+        """Yield pushed updates (the first one complete, then changes only) on a
+        connection of their own; None every wait seconds without one, so the
+        caller can redraw and read keys. Ends when the monitor stops."""
+        conn = socket.create_connection(self.address, timeout=self.timeout)
+        try:
+            conn.sendall(f"SUBSCRIBE {rate}\n".encode('ascii'))
+            conn.settimeout(wait)
+            pending = b""
+            while True:
+                try:
+                    chunk = conn.recv(65536)
+                except socket.timeout:
+                    yield None
+                    continue
+                except OSError:
+                    return
+                if not chunk:
+                    return
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+# Live dashboard severity order and colors
+SEVERITY = {'Critical': 0, 'Warning': 1, 'Anomaly': 2, 'Good': 3}
+STATUS_COLORS = {'Critical': "\033[91m", 'Warning': "\033[93m", 'Anomaly': "\033[96m", 'Good': "\033[92m"}
+
+# (title, width) of the device table columns
+LIVE_COLUMNS = [('Device', 11), ('Status', 10), ('Temp (°C)', 11), ('Vibration', 11), ('Voltage', 11),
+                ('Last Update', 15)]
+
+class KeyReader:
+    """Non-blocking single key presses from the terminal, where the platform allows it"""
+    def __enter__(self):
+        self.saved = None
+        if os.name == 'nt':
+            import msvcrt
+            self.msvcrt = msvcrt
+        elif sys.stdin.isatty():
+            import termios
+            import tty
+            self.termios = termios
+            self.saved = termios.tcgetattr(sys.stdin)
+            tty.setcbreak(sys.stdin.fileno())
+        return self
+        
+    def read(self):
+        """Return a pressed key, or None"""
+        if os.name == 'nt':
+            return self.msvcrt.getwch() if self.msvcrt.kbhit() else None
+        if self.saved is None:
+            return None
+        import select
+        if select.select([sys.stdin], [], [], 0)[0]:
+            return sys.stdin.read(1)
+        return None
+        
+    def __exit__(self, *exc):
+        if self.saved is not None:
+            self.termios.tcsetattr(sys.stdin, self.termios.TCSADRAIN, self.saved)
+
+class LiveDashboard:
+    """Push-driven dashboard: redraws only the screen cells that changed, at most fps times a second"""
+    def __init__(self, client, fps=10.0, out=None):
+        self.client = client
+        self.fps = fps
+        self.out = out or sys.stdout
+        self.total = 0
+        self.counts = {}
+        self.devices = {}
+        self.page = 0
+        # Cell texts currently on screen: row -> {column: text}
+        self.screen = {}
+        self.size = None
+        
+    def apply(self, update):
+        """Merge a pushed update into the local state"""
+        self.total = update['total']
+        self.counts = update['counts']
+        self.devices.update(update['devices'])
+        
+    def device_rows(self):
+        """Device ids, most severe status first"""
+        devices = self.devices
+        return sorted(devices, key=lambda device_id: (SEVERITY.get(devices[device_id][3], 3), device_id))
+        
+    def layout(self, width, height):
+        """Build the frame as {row: {column: text}} for a terminal of the given size"""
+        page_size = max(1, height - 7)
+        ordered = self.device_rows()
+        pages = max(1, -(-len(ordered) // page_size))
+        self.page = min(self.page, pages - 1)
+        counts = self.counts
+        frame = {
+            0: {0: " REAL-TIME SENSOR MONITORING DASHBOARD (live)"},
+            1: {0: f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Total: {self.total} | "
+                   f"Warnings: {counts.get('Warning', 0)} | Critical: {counts.get('Critical', 0)} | "
+                   f"Anomalies: {counts.get('Anomaly', 0)}"},
+            2: {0: "-" * min(width, 70)},
+            3: {},
+            4: {0: "-" * min(width, 70)},
+        }
+        column = 0
+        for title, size in LIVE_COLUMNS:
+            frame[3][column] = f"{title:<{size}}"
+            column += size
+        
+        first = self.page * page_size
+        for row, device_id in enumerate(ordered[first:first + page_size], 5):
+            temp, vib, volt, status, timestamp = self.devices[device_id]
+            time_str = timestamp.split('T')[1][:8] if 'T' in timestamp else timestamp[11:19]
+            cells = [device_id, status, temp, vib, volt, time_str]
+            frame[row] = {}
+            column = 0
+            for index, ((_, size), value) in enumerate(zip(LIVE_COLUMNS, cells)):
+                text = f"{value:<{size}}"[:size]
+                if index == 1:
+                    # Pad before coloring so the escape codes do not count towards the width
+                    text = f"{STATUS_COLORS.get(status, '')}{text}\033[0m"
+                frame[row][column] = text
+                column += size
+        frame[height - 1] = {0: f"Page {self.page + 1}/{pages} | {len(ordered)} devices, most severe first | "
+                                f"n/p: page, q: quit"}
+        return frame
+        
+    def draw(self):
+        """Write the cells that differ from what is on screen"""
+        size = shutil.get_terminal_size()
+        parts = []
+        if size != self.size:
+            # New or resized terminal: start from a blank screen
+            self.size = size
+            self.screen = {}
+            parts.append("\033[2J")
+        frame = self.layout(size.columns, size.lines)
+        for row in sorted(set(self.screen) | set(frame)):
+            old, new = self.screen.get(row, {}), frame.get(row, {})
+            if row not in frame:
+                parts.append(f"\033[{row + 1};1H\033[K")
+                continue
+            for column, text in new.items():
+                if old.get(column) != text:
+                    parts.append(f"\033[{row + 1};{column + 1}H{text}")
+            if len(new) == 1 and old.get(0) != new.get(0):
+                # Single-cell lines change length; clear what the old text left behind
+                parts.append("\033[K")
+        self.screen = frame
+        if parts:
+            self.out.write("".join(parts))
+            self.out.flush()
+            
+    def handle_key(self, key):
+        """Return False when the dashboard should quit"""
+        if key in ('q', 'Q'):
+            return False
+        if key in ('n', 'N', ' '):
+            self.page += 1
+        elif key in ('p', 'P') and self.page > 0:
+            self.page -= 1
+        return True
+        
+    def run(self):
+        """Follow the monitor's pushed updates until it stops or q is pressed"""
+        interval = 1.0 / self.fps
+        next_frame = 0.0
+        dirty = True
+        self.out.write("\033[?25l")
+        try:
+            with KeyReader() as keys:
+                for update in self.client.subscribe(rate=self.fps):
+                    if update is not None:
+                        self.apply(update)
+                        dirty = True
+                    key = keys.read()
+                    if key is not None:
+                        if not self.handle_key(key):
+                            break
+                        dirty = True
+                    # Throttle: updates arriving faster than fps are merged into one frame
+                    now = time.monotonic()
+                    if dirty and now >= next_frame:
+                        self.draw()
+                        dirty = False
+                        next_frame = now + interval
+                else:
+                    # The monitor stopped: show the last state it pushed
+                    if dirty:
+                        self.draw()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            rows = self.size.lines if self.size else 0
+            self.out.write(f"\033[?25h\033[{rows};1H\n")
+            self.out.flush()
+
+
+class RealTimeDashboard:
+    def __init__(self, db_path="sensor_data.db", stats_path="rolling_stats.json", live_port=LIVE_PORT):
+        self.db_path = db_path
+        # Rolling statistics published by the processor; read without touching the database
+        self.stats_path = stats_path
+        # A running monitor's live state replaces the SQL queries; 0 always reads the database
+        self.live = LiveStateClient(port=live_port) if live_port else None
+        self.running = True
+        
+    def clear_screen(self):
+        """Clear the terminal screen"""
+        os.system('cls' if os.name == 'nt' else 'clear')
+    
+    def connect(self):
+        """Open a read-only connection so the dashboard never blocks the writer"""
+        uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+        
+    def get_live_data(self):
+        """Get the latest data from the running monitor, or else from the database"""
+        if self.live is not None:
+            state = self.live.snapshot()
+            if state is not None:
+                return live_data(state)
+        try:
+            conn = self.connect()
+            try:
+                # Status totals from the rollups, latest readings with the layout's own query
+                summary = database.summarize_range(conn, *database.ALL_TIME)
+                latest_sql, _ = database.reader_queries(conn)
+                devices = conn.execute(latest_sql).fetchall()
+            finally:
+                conn.close()
+            
+            return {
+                'total': summary['readings'],
+                'critical': summary['critical'],
+                'warning': summary['warning'],
+                'anomaly': summary['anomaly'],
+                'devices': devices,
+                'source': 'database'
+            }
+            
+        except Exception as e:
+            print(f"Database error: {e}")
+            return None
+    
+    def get_rolling_stats(self):
+        """Load the processor's latest rolling statistics, or None"""
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+    def display_rolling_stats(self, stats):
+        """Print the rolling statistics table"""
+        print(f"\n📈 ROLLING STATISTICS (as of {stats['updated']}, min/max over {stats['window']:g}s)")
+        print("-" * 70)
+        print(f"{'Device':<10} {'Temp EWMA':<10} {'Temp Min-Max':<14} {'Temp/s':<8} {'Vib EWMA':<9} {'Volt EWMA':<9}")
+        print("-" * 70)
+        for device_id, metrics in sorted(stats['devices'].items()):
+            temp, vib, volt = metrics['temperature'], metrics['vibration'], metrics['voltage']
+            temp_range = f"{temp['min']:.1f}-{temp['max']:.1f}"
+            print(f"{device_id:<10} {temp['ewma']:<10.1f} {temp_range:<14} {temp['rate']:<+8.2f} "
+                  f"{vib['ewma']:<9.2f} {volt['ewma']:<9.1f}")
+        
+    def display_dashboard(self):
+        """Display the real-time dashboard"""
+        print(" Starting Real-Time Dashboard...")
+        print("Press Ctrl+C to exit\n")
+        time.sleep(2)
+        
+        try:
+            while self.running:
+                self.clear_screen()
+                
+                # Get latest data
+                data = self.get_live_data()
+                
+                if data is None:
+                    print(" No data available yet")
+                    print("Start the monitoring system first to collect data")
+                    time.sleep(3)
+                    break
+                
+                # Display header
+                print("=" * 70)
+                print(" REAL-TIME SENSOR MONITORING DASHBOARD")
+                print("=" * 70)
+                print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} (from {data['source']})")
+                print(f" Total Readings: {data['total']} | "
+                      f" Warnings: {data['warning']} | "
+                      f" Critical: {data['critical']} | "
+                      f" Anomalies: {data['anomaly']}")
+                print("-" * 70)
+                
+                # Display device status
+                print("\n🔧 DEVICE STATUS")
+                print("-" * 70)
+                print(f"{'Device':<10} {'Status':<12} {'Temp (°C)':<10} {'Vibration':<10} {'Voltage':<10} {'Last Update':<15}")
+                print("-" * 70)
+                
+                for device in data['devices']:
+                    device_id, temp, vib, volt, status, timestamp = device
+                    
+                    # Format timestamp
+                    if 'T' in timestamp:
+                        time_str = timestamp.split('T')[1][:8]
+                    else:
+                        time_str = timestamp[11:19] if len(timestamp) > 11 else timestamp
+                    
+                    # Status icons
+                    if status == "Critical":
+                        status_icon = "🔴"
+                    elif status == "Warning":
+                        status_icon = "🟡"
+                    elif status == "Anomaly":
+                        status_icon = "🟣"
+                    else:
+                        status_icon = "🟢"
+                    
+                    # Highlight high temperature
+                    temp_display = f"{temp}°C"
+                    if temp > 80:
+                        temp_display = f" {temp}°C"
+                    
+                    print(f"{device_id:<10} {status_icon} {status:<9} {temp_display:<12} {vib:<10} {volt:<10} {time_str:<15}")
+                
+                stats = self.get_rolling_stats()
+                if stats and stats['devices']:
+                    self.display_rolling_stats(stats)
+                
+                print("\n" + "=" * 70)
+                print("Auto-refreshing every 5 seconds... Press Ctrl+C to exit")
+                
+                # Wait before refresh
+                time.sleep(5)
+                
+        except KeyboardInterrupt:
+            print("\n Dashboard closed")
+            self.running = False
+        except Exception as e:
+            print(f"Dashboard error: {e}")
+            
+    def run(self):
+        """Start the dashboard"""
+        self.display_dashboard()
+
+def live_data(state):
+    """Shape a live state snapshot like get_live_data's database result"""
+    counts = state['counts']
+    return {
+        'total': state['total'],
+        'critical': counts.get('Critical', 0),
+        'warning': counts.get('Warning', 0),
+        'anomaly': counts.get('Anomaly', 0),
+        'devices': [(device_id, *latest) for device_id, latest in sorted(state['devices'].items())],
+        'source': 'live monitor'
+    }
+
+# Quick test function
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sensor monitoring dashboard")
+    parser.add_argument("--fps", type=float, default=10.0,
+                        help="live mode: highest redraw rate per second")
+    parser.add_argument("--live-port", type=int, default=LIVE_PORT,
+                        help="port of the running monitor's live state")
+    parser.add_argument("--poll", action="store_true",
+                        help="always use the 5 second full-screen refresh")
+    args = parser.parse_args()
+    
+    # A running monitor pushes its updates; otherwise poll the database
+    client = LiveStateClient(port=args.live_port)
+    if not args.poll and client.snapshot() is not None:
+        client.close()
+        try:
+            LiveDashboard(client, fps=args.fps).run()
+        except OSError as e:
+            print(f"Live dashboard error: {e}")
+        sys.exit(0)
+    
+    print("Testing Dashboard...")
+    
+    # First, check if database exists
+    if not os.path.exists("sensor_data.db"):
+        print(" No database found!")
+        print("Run main.py first to generate sensor data")
+    else:
+        dashboard = RealTimeDashboard(live_port=args.live_port)
         dashboard.run()
\ No newline at end of file
@@ -1,639 +1,1291 @@
-
-# main.py - COMPLETE WORKING VERSION
-import os
-import sys
-import threading
-import time
-import queue
-from datetime import datetime
-import signal
-import random
-import sqlite3
-
-print("=" * 60)
-print(" SENSOR MONITORING SYSTEM")
-print("=" * 60)
-
-# ========== DEVICE SIMULATOR CLASS ==========
-class DeviceSimulator(threading.Thread):
-    def __init__(self, device_id: str, data_queue, device_name="Device"):
-        super().__init__()
-        self.device_id = device_id
-        self.device_name = device_name
-        self.data_queue = data_queue
-        self.running = True
-        self.message_id = 0
-        self.daemon = True
-        
-        self.base_temp = random.uniform(25.0, 40.0)
-        self.base_vibration = random.uniform(0.5, 3.0)
-        self.base_voltage = random.uniform(210.0, 240.0)
-        self.packets_sent = 0
-        
-    def generate_sensor_data(self):
-        self.message_id += 1
-        temp_variation = random.uniform(-3.0, 3.0)
-        vibration_variation = random.uniform(-0.5, 0.5)
-        voltage_variation = random.uniform(-5.0, 5.0)
-        
-        # Occasionally add anomalies
-        if random.random() < 0.05:
-            temp_variation = random.uniform(20.0, 50.0)
-        if random.random() < 0.03:
-            vibration_variation = random.uniform(5.0, 15.0)
-        if random.random() < 0.02:
-            voltage_variation = random.uniform(-50.0, -30.0)
-        
-        return {
-            "device_id": self.device_id,
-            "device_name": self.device_name,
-            "message_id": self.message_id,
-            "timestamp": datetime.now().isoformat(),
-            "temperature": round(self.base_temp + temp_variation, 2),
-            "vibration": round(max(0.1, self.base_vibration + vibration_variation), 2),
-            "voltage": round(self.base_voltage + voltage_variation, 2)
-        }
-    
-    def run(self):
-        print(f"📡 Device {self.device_id} started")
-        while self.running:
-            try:
-                sensor_data = self.generate_sensor_data()
-                self.data_queue.put(sensor_data)
-                self.packets_sent += 1
-                if self.packets_sent % 5 == 0:
-                    print(f" {self.device_id}: Sent {self.packets_sent} packets")
-                time.sleep(random.uniform(1.0, 2.0))
-            except Exception as e:
-                print(f" Error in {self.device_id}: {e}")
-                time.sleep(1)
-    
-    def stop(self):
-        self.running = False
-        print(f"⏹️  Device {self.device_id} stopped. Total packets: {self.packets_sent}")
-
-# ========== DATA STORAGE CLASS ==========
-class DataStorage:
-    def __init__(self, db_path="sensor_data.db"):
-        self.db_path = db_path
-        self.init_database()
-        
-    def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sensor_readings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                device_id TEXT,
-                device_name TEXT,
-                message_id INTEGER,
-                timestamp DATETIME,
-                temperature REAL,
-                vibration REAL,
-                voltage REAL,
-                status TEXT,
-                alert_type TEXT,
-                processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
-        
-    def store_sensor_data(self, data):
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO sensor_readings 
-                (device_id, device_name, message_id, timestamp, temperature, 
-                 vibration, voltage, status, alert_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data['device_id'],
-                data.get('device_name', 'Unknown'),
-                data['message_id'],
-                data['timestamp'],
-                data['temperature'],
-                data['vibration'],
-                data['voltage'],
-                data.get('status', 'Good'),
-                data.get('alert_type', 'None')
-            ))
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f" Database error: {e}")
-            return False
-
-# ========== DATA PROCESSOR CLASS ==========
-class DataProcessor(threading.Thread):
-    def __init__(self, data_queue, storage):
-        super().__init__()
-        self.data_queue = data_queue
-        self.storage = storage
-        self.running = True
-        self.processed_count = 0
-        self.daemon = True
-        
-        # Thresholds for alerts
-        self.thresholds = {
-            'temperature': {'warning': 70.0, 'critical': 85.0},
-            'vibration': {'warning': 7.0, 'critical': 10.0},
-            'voltage': {'warning_low': 190.0, 'critical_low': 180.0}
-        }
-        
-        # Create logs folder if it doesn't exist
-        os.makedirs('logs', exist_ok=True)
-        
-    def analyze_data(self, data):
-        status = "Good"
-        alert_type = "None"
-        
-        temperature = data['temperature']
-        vibration = data['vibration']
-        voltage = data['voltage']
-        
-        # Check temperature
-        if temperature > self.thresholds['temperature']['critical']:
-            status = "Critical"
-            alert_type = "High Temperature"
-        elif temperature > self.thresholds['temperature']['warning']:
-            status = "Warning"
-            alert_type = "High Temperature Warning"
-            
-        # Check vibration
-        if vibration > self.thresholds['vibration']['critical']:
-            status = "Critical"
-            alert_type = "High Vibration"
-        elif vibration > self.thresholds['vibration']['warning']:
-            if status == "Good":
-                status = "Warning"
-            alert_type = "High Vibration Warning" if alert_type == "None" else alert_type + ", High Vibration"
-                
-        # Check voltage
-        if voltage < self.thresholds['voltage']['critical_low']:
-            status = "Critical"
-            alert_type = "Low Voltage"
-        elif voltage < self.thresholds['voltage']['warning_low']:
-            if status == "Good":
-                status = "Warning"
-            alert_type = "Low Voltage Warning" if alert_type == "None" else alert_type + ", Low Voltage"
-                
-        return status, alert_type
-    
-    def log_alert(self, data, status, alert_type):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {data['device_id']} - {alert_type}: "
-        log_entry += f"Temp={data['temperature']}°C, Vib={data['vibration']}, Volt={data['voltage']}V"
-        
-        if status == "Critical":
-            print(f"\033[91m CRITICAL: {log_entry}\033[0m")
-            with open('logs/critical_alerts.log', 'a') as f:
-                f.write(log_entry + "\n")
-        elif status == "Warning":
-            print(f"\033[93m  WARNING: {log_entry}\033[0m")
-            with open('logs/alerts.log', 'a') as f:
-                f.write(log_entry + "\n")
-    
-    def run(self):
-        print(" Data processor started")
-        while self.running:
-            try:
-                data = self.data_queue.get(timeout=1)
-                status, alert_type = self.analyze_data(data)
-                data['status'] = status
-                data['alert_type'] = alert_type
-                
-                if status in ["Warning", "Critical"]:
-                    self.log_alert(data, status, alert_type)
-                
-                self.storage.store_sensor_data(data)
-                self.processed_count += 1
-                
-                if self.processed_count % 10 == 0:
-                    print(f" Total packets processed: {self.processed_count}")
-                    
-                self.data_queue.task_done()
-            except:
-                time.sleep(0.1)
-    
-    def stop(self):
-        self.running = False
-        print(f" Data processor stopped. Total: {self.processed_count}")
-
-# ========== SENSOR MONITORING SYSTEM CLASS ==========
-class SensorMonitoringSystem:
-    def __init__(self):
-        self.running = True
-        self.devices = []
-        self.data_queue = queue.Queue(maxsize=1000)
-        self.storage = DataStorage()
-        self.processor = DataProcessor(self.data_queue, self.storage)
-        
-    def start(self):
-        print("=" * 60)
-        print(" Starting Real-Time Monitoring")
-        print("=" * 60)
-        
-        # Create 3 devices
-        device_ids = ['DEV001', 'DEV002', 'DEV003']
-        device_names = ['Conveyor Belt', 'Cooling Unit', 'Robotic Arm']
-        
-        for i, dev_id in enumerate(device_ids):
-            device = DeviceSimulator(dev_id, self.data_queue, device_names[i])
-            self.devices.append(device)
-        
-        # Start processor
-        self.processor.start()
-        time.sleep(0.5)
-        
-        # Start devices
-        for device in self.devices:
-            device.start()
-            time.sleep(0.2)
-        
-        print(f"\n Monitoring started with {len(self.devices)} devices")
-        print(" Generating sensor data every 1-2 seconds...")
-        print("  Alerts will appear in colored text")
-        print("-" * 60)
-        print("\nPress Ctrl+C to stop monitoring\n")
-        
-    def run_monitoring(self):
-        """Run monitoring until Ctrl+C"""
-        self.start()
-        
-        # Handle Ctrl+C
-        try:
-            while self.running:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            self.stop_monitoring()
-    
-    def stop_monitoring(self):
-        print("\n Stopping monitoring...")
-        for device in self.devices:
-            device.stop()
-        self.processor.stop()
-        time.sleep(1)
-        print(" Monitoring stopped")
-
-# ========== MENU FUNCTIONS ==========
-def clear_screen():
-    """Clear terminal screen"""
-    os.system('cls' if os.name == 'nt' else 'clear')
-
-def show_menu():
-    """Display main menu"""
-    clear_screen()
-    print("=" * 60)
-    print(" SENSOR MONITORING SYSTEM - MAIN MENU")
-    print("=" * 60)
-    print("1. Start Real-Time Monitoring")
-    print("2. View Live Dashboard")
-    print("3. Generate Daily Report")
-    print("4. View Alert Logs")
-    print("5. View Database Stats")
-    print("6. Exit")
-    print("-" * 60)
-    
-    try:
-        choice = input("Select option (1-6): ")
-        return choice
-    except KeyboardInterrupt:
-        return '6'
-
-def view_alert_logs():
-    """Display alert logs"""
-    clear_screen()
-    print("=" * 60)
-    print(" ALERT LOGS")
-    print("=" * 60)
-    
-    try:
-        # Check if logs directory exists
-        if not os.path.exists("logs"):
-            print("No logs directory found. Start monitoring first.")
-            input("\nPress Enter to continue...")
-            return
-        
-        # View warning alerts
-        warning_file = "logs/alerts.log"
-        if os.path.exists(warning_file):
-            print("\n WARNING ALERTS:")
-            print("-" * 40)
-            with open(warning_file, "r") as f:
-                warnings = f.readlines()
-                if warnings:
-                    print("Last 10 warnings:")
-                    for warning in warnings[-10:]:
-                        print(f"  {warning.strip()}")
-                else:
-                    print("No warning alerts yet")
-        else:
-            print("Warning log file not found")
-        
-        # View critical alerts
-        critical_file = "logs/critical_alerts.log"
-        if os.path.exists(critical_file):
-            print("\n CRITICAL ALERTS:")
-            print("-" * 40)
-            with open(critical_file, "r") as f:
-                criticals = f.readlines()
-                if criticals:
-                    print("Last 10 critical alerts:")
-                    for critical in criticals[-10:]:
-                        print(f"  {critical.strip()}")
-                else:
-                    print("No critical alerts yet")
-        else:
-            print("Critical log file not found")
-            
-    except Exception as e:
-        print(f"Error reading logs: {e}")
-    
-    input("\nPress Enter to continue...")
-
-def view_database_stats():
-    """Show database statistics"""
-    clear_screen()
-    print("=" * 60)
-    print(" DATABASE STATISTICS")
-    print("=" * 60)
-    
-    try:
-        if not os.path.exists("sensor_data.db"):
-            print("No database found. Start monitoring first.")
-            input("\nPress Enter to continue...")
-            return
-            
-        conn = sqlite3.connect("sensor_data.db")
-        cursor = conn.cursor()
-        
-        # Total records
-        cursor.execute("SELECT COUNT(*) FROM sensor_readings")
-        total = cursor.fetchone()[0]
-        print(f"Total Sensor Readings: {total}")
-        
-        if total == 0:
-            print("\nNo data available yet. Start monitoring to collect data.")
-            conn.close()
-            input("\nPress Enter to continue...")
-            return
-        
-        # Device count
-        cursor.execute("SELECT COUNT(DISTINCT device_id) FROM sensor_readings")
-        devices = cursor.fetchone()[0]
-        print(f"Devices Monitored: {devices}")
-        
-        # Alert statistics
-        cursor.execute('''
-            SELECT status, COUNT(*) as count 
-            FROM sensor_readings 
-            GROUP BY status
-        ''')
-        print("\n Status Distribution:")
-        for status, count in cursor.fetchall():
-            print(f"  {status}: {count}")
-        
-        # Latest readings
-        print("\n Latest Readings:")
-        cursor.execute('''
-            SELECT device_id, temperature, status, timestamp 
-            FROM sensor_readings 
-            ORDER BY id DESC 
-            LIMIT 5
-        ''')
-        for device_id, temp, status, timestamp in cursor.fetchall():
-            time_str = timestamp[11:19] if len(timestamp) > 11 else timestamp
-            print(f"  {device_id}: {temp}°C ({status}) at {time_str}")
-        
-        conn.close()
-        
-    except Exception as e:
-        print(f"Error: {e}")
-    
-    input("\nPress Enter to continue...")
-
-def generate_daily_report():
-    """Generate a simple daily report"""
-    clear_screen()
-    
-    print("=" * 60)
-    print(" GENERATING DAILY REPORT")
-    print("=" * 60)
-    
-    today = datetime.now().strftime("%Y-%m-%d")
-    
-    try:
-        if not os.path.exists("sensor_data.db"):
-            print("No database found. Start monitoring first.")
-            input("\nPress Enter to continue...")
-            return
-            
-        conn = sqlite3.connect("sensor_data.db")
-        cursor = conn.cursor()
-        
-        # Get today's data
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status='Critical' THEN 1 ELSE 0 END) as critical,
-                SUM(CASE WHEN status='Warning' THEN 1 ELSE 0 END) as warning,
-                AVG(temperature) as avg_temp
-            FROM sensor_readings 
-            WHERE DATE(timestamp) = ?
-        ''', (today,))
-        
-        result = cursor.fetchone()
-        
-        if result[0] == 0:
-            print("No data available for today yet.")
-            print("Start monitoring to collect data.")
-        else:
-            total, critical, warning, avg_temp = result
-            
-            print(f"\n Report for: {today}")
-            print("-" * 40)
-            print(f"Total Readings: {total}")
-            print(f"Critical Alerts: {critical}")
-            print(f"Warning Alerts: {warning}")
-            print(f"Average Temperature: {avg_temp:.1f}°C")
-            
-            # Save to file
-            report_text = f"""DAILY SENSOR REPORT - {today}
-===============================
-Total Readings: {total}
-Critical Alerts: {critical}
-Warning Alerts: {warning}
-Average Temperature: {avg_temp:.1f}°C
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-==============================="""
-            
-            # Create reports folder if it doesn't exist
-            os.makedirs("reports", exist_ok=True)
-            
-            # Save as text file
-            filename = f"reports/report_{today}.txt"
-            with open(filename, "w") as f:
-                f.write(report_text)
-            
-            print(f"\n Report saved to: {filename}")
-        
-        conn.close()
-        
-    except Exception as e:
-        print(f"Error generating report: {e}")
-    
-    input("\nPress Enter to continue...")
-
-def run_dashboard():
-    """Run the dashboard"""
-    clear_screen()
-    print("Loading dashboard...")
-    time.sleep(1)
-    
-    try:
-        # Simple dashboard implementation
-        if not os.path.exists("sensor_data.db"):
-            print("=" * 60)
-            print(" DASHBOARD")
-            print("=" * 60)
-            print("\n No data available!")
-            print("Start monitoring first (Option 1 in main menu)")
-            input("\nPress Enter to continue...")
-            return
-        
-        import sqlite3
-        conn = sqlite3.connect("sensor_data.db")
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM sensor_readings")
-        total = cursor.fetchone()[0]
-        
-        if total == 0:
-            print("=" * 60)
-            print(" DASHBOARD")
-            print("=" * 60)
-            print("\n No data available!")
-            print("Start monitoring to collect data")
-            conn.close()
-            input("\nPress Enter to continue...")
-            return
-        
-        cursor.execute("SELECT COUNT(*) FROM sensor_readings WHERE status='Critical'")
-        critical = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM sensor_readings WHERE status='Warning'")
-        warning = cursor.fetchone()[0]
-        
-        # Get latest device data
-        cursor.execute('''
-            SELECT device_id, temperature, vibration, voltage, status, timestamp
-            FROM sensor_readings 
-            WHERE id IN (
-                SELECT MAX(id) FROM sensor_readings GROUP BY device_id
-            )
-            ORDER BY device_id
-        ''')
-        devices = cursor.fetchall()
-        
-        conn.close()
-        
-        # Display dashboard
-        clear_screen()
-        print("=" * 70)
-        print(" REAL-TIME SENSOR DASHBOARD")
-        print("=" * 70)
-        print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f" Total Readings: {total} |   Warnings: {warning} |  Critical: {critical}")
-        print("-" * 70)
-        
-        print("\n DEVICE STATUS")
-        print("-" * 70)
-        print(f"{'Device':<10} {'Status':<12} {'Temp (°C)':<12} {'Last Update':<15}")
-        print("-" * 70)
-        
-        for device in devices:
-            device_id, temp, vib, volt, status, timestamp = device
-            
-            # Format time
-            time_str = timestamp[11:19] if len(timestamp) > 11 else timestamp
-            
-            # Status icon
-            if status == "Critical":
-                status_display = " CRITICAL"
-            elif status == "Warning":
-                status_display = " WARNING"
-            else:
-                status_display = " GOOD"
-            
-            # Temperature warning
-            temp_display = f"{temp}°C"
-            if temp > 80:
-                temp_display = f" {temp}°C"
-            
-            print(f"{device_id:<10} {status_display:<12} {temp_display:<12} {time_str:<15}")
-        
-        print("\n" + "=" * 70)
-        
-    except Exception as e:
-        print(f"Dashboard error: {e}")
-    
-    input("\nPress Enter to continue...")
-
-# ========== MAIN PROGRAM ==========
-def main():
-    """Main program with menu"""
-    clear_screen()
-    
-    while True:
-        choice = show_menu()
-        
-        if choice == '1':
-            # Start monitoring
-            system = SensorMonitoringSystem()
-            try:
-                system.run_monitoring()
-            except KeyboardInterrupt:
-                print("\nReturning to menu...")
-                time.sleep(1)
-                
-        elif choice == '2':
-            # Run dashboard
-            run_dashboard()
-            
-        elif choice == '3':
-            # Generate report
-            generate_daily_report()
-            
-        elif choice == '4':
-            # View alert logs
-            view_alert_logs()
-            
-        elif choice == '5':
-            # View database stats
-            view_database_stats()
-            
-        elif choice == '6':
-            # Exit
-            clear_screen()
-            print("=" * 60)
-            print(" Thank you for using Sensor Monitoring System!")
-            print("Goodbye!")
-            print("=" * 60)
-            break
-            
-        else:
-            print("\n Invalid choice. Please select 1-6")
-            time.sleep(1)
-
-# ========== RUN THE PROGRAM ==========
-if __name__ == "__main__":
-    try:
-        main()
-    except KeyboardInterrupt:
-        print("\n\n Program terminated by user")
-    except Exception as e:
-        print(f"\n Unexpected error: {e}")
+
+# main.py - COMPLETE WORKING VERSION
+import os
+import sys
+import csv
+import json
+import threading
+import time
+import queue
+from datetime import datetime, timedelta
+import signal
+import random
+import sqlite3
+import importlib.util
+import argparse
+import multiprocessing
+import zlib
+
+from dashboard import LiveDashboard, LiveStateClient
+
+# Shard worker processes re-import this file; only print the banner once,
+# and not ahead of a report written to standard output
+if __name__ == "__main__" and not any(arg.startswith("--report") for arg in sys.argv[1:]):
+    print("=" * 60)
+    print(" SENSOR MONITORING SYSTEM")
+    print("=" * 60)
+
+# ========== COMPONENT LOADING ==========
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_component(name):
+    """Load a component file such as storage.database.py by path"""
+    # The component files are named after their package path, so a
+    # regular import statement cannot reach them
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(BASE_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+# ========== DEVICE SIMULATOR CLASS ==========
+class DeviceSimulator(threading.Thread):
+    def __init__(self, device_id: str, data_queue, device_name="Device"):
+        super().__init__()
+        self.device_id = device_id
+        self.device_name = device_name
+        self.data_queue = data_queue
+        self.running = True
+        self.message_id = 0
+        self.daemon = True
+        
+        self.base_temp = random.uniform(25.0, 40.0)
+        self.base_vibration = random.uniform(0.5, 3.0)
+        self.base_voltage = random.uniform(210.0, 240.0)
+        self.packets_sent = 0
+        
+    def generate_sensor_data(self):
+        self.message_id += 1
+        temp_variation = random.uniform(-3.0, 3.0)
+        vibration_variation = random.uniform(-0.5, 0.5)
+        voltage_variation = random.uniform(-5.0, 5.0)
+        
+        # Occasionally add anomalies
+        if random.random() < 0.05:
+            temp_variation = random.uniform(20.0, 50.0)
+        if random.random() < 0.03:
+            vibration_variation = random.uniform(5.0, 15.0)
+        if random.random() < 0.02:
+            voltage_variation = random.uniform(-50.0, -30.0)
+        
+        return {
+            "device_id": self.device_id,
+            "device_name": self.device_name,
+            "message_id": self.message_id,
+            "timestamp": datetime.now().isoformat(),
+            "temperature": round(self.base_temp + temp_variation, 2),
+            "vibration": round(max(0.1, self.base_vibration + vibration_variation), 2),
+            "voltage": round(self.base_voltage + voltage_variation, 2),
+            "generated_at": time.monotonic()
+        }
+    
+    def run(self):
+        print(f"📡 Device {self.device_id} started")
+        while self.running:
+            try:
+                sensor_data = self.generate_sensor_data()
+                self.data_queue.put(sensor_data)
+                self.packets_sent += 1
+                if self.packets_sent % 5 == 0:
+                    print(f" {self.device_id}: Sent {self.packets_sent} packets")
+                time.sleep(random.uniform(1.0, 2.0))
+            except Exception as e:
+                print(f" Error in {self.device_id}: {e}")
+                time.sleep(1)
+    
+    def stop(self):
+        self.running = False
+        print(f"⏹️  Device {self.device_id} stopped. Total packets: {self.packets_sent}")
+
+# High-rate virtual fleet for load testing
+sensors = load_component("sensors.sensor_simulator")
+# Binary stream recording and replay
+recorder = load_component("sensors.stream_recorder")
+# Batch analysis and the background alert sink
+processing = load_component("processor.data_processor")
+
+# ========== DATA STORAGE CLASS ==========
+# Shared with storage.database.py so both entry points use the batching writer
+database = load_component("storage.database")
+DataStorage = database.DataStorage
+connect_reader = database.connect_reader
+
+# ========== DATA PROCESSOR CLASS ==========
+# The processor component: batch classification, device health and the
+# stage metrics, the same analysis the shard workers run
+DataProcessor = processing.DataProcessor
+
+# ========== SHARDED PROCESSOR ==========
+def shard_of(device_id, shards):
+    """Stable shard index for a device (the built-in hash() is salted per process)"""
+    return zlib.crc32(device_id.encode('utf-8')) % shards
+
+class CollectingSink:
+    """Alert sink for shard workers: alerts go back with the results to the main sink"""
+    def __init__(self):
+        self.alerts = []
+        
+    def emit(self, status, entry, console, email=None, record=None, generated_at=None):
+        self.alerts.append((status, entry, console, email, record, generated_at))
+        return True
+        
+    def drain(self):
+        alerts, self.alerts = self.alerts, []
+        return alerts
+        
+    def close(self):
+        pass
+
+def shard_worker(inbox, outbox, alert_options=None, thresholds=None, stats_window=60.0,
+                 anomaly_options=None, timed=False):
+    """Worker process: analyze, format alerts and aggregate the batches of one shard"""
+    sink = CollectingSink()
+    # Alert state is per device, and a device only ever reaches one worker
+    manager = processing.AlertManager(**alert_options) if alert_options is not None else None
+    # Each worker compiles and watches the threshold config itself, reloading between batches
+    rules = processing.ThresholdRules.load(thresholds) if thresholds else None
+    # Baselines are per device too, so each worker's detector sees its devices' whole stream
+    detector = processing.AnomalyDetector(**anomaly_options) if anomaly_options is not None else None
+    analyzer = processing.DataProcessor(None, None, alert_sink=sink, alert_manager=manager, rules=rules,
+                                        stats_window=stats_window)
+    stats_sent = time.monotonic()
+    health = database.DeviceHealthAggregator()
+    rollups = database.RollupAggregator()
+    
+    while True:
+        try:
+            batch = inbox.get(timeout=1.0)
+        except queue.Empty:
+            # A quiet shard still owes the summaries that came due
+            if manager is not None:
+                manager.sweep(analyzer.log_summary)
+                alerts = sink.drain()
+                if alerts:
+                    outbox.put(([], [], alerts, None, None))
+            continue
+        if batch is None:
+            break
+        analyzer.check_rules()
+        rows = []
+        codes, flags = analyzer.analyze_batch(batch)
+        for data, code, alert_flags in zip(batch, codes, flags):
+            status = processing.STATUSES[code]
+            alert_type = processing.ALERT_TYPES[alert_flags]
+            if detector is not None:
+                status, alert_type = detector.classify(data, status, alert_type)
+            data['status'] = status
+            data['alert_type'] = alert_type
+            analyzer.stats.record(data)
+            if manager is not None:
+                manager.process(data, status, analyzer.rules,
+                                analyzer.log_alert, analyzer.log_summary)
+            elif status != "Good":
+                analyzer.log_alert(data, status, alert_type)
+            rows.append(database.reading_row(data))
+            rollups.record(data)
+            health.record(data['device_id'], data.get('device_name') or data['device_id'], status,
+                          1, 1 if status == "Critical" else 0)
+        # This worker's devices' statistics ride along every STATS_PUBLISH_INTERVAL
+        stats = None
+        if time.monotonic() - stats_sent >= processing.STATS_PUBLISH_INTERVAL:
+            stats_sent = time.monotonic()
+            stats = analyzer.stats.snapshot()
+        # timed: the router stamped dequeued_at; the merger turns the stamps into latencies
+        stamps = [(data['dequeued_at'], data.get('generated_at')) for data in batch] if timed else None
+        # Rows keep their queue order, so each device stays ordered by message_id
+        outbox.put((rows, health.drain() + rollups.drain(), sink.drain(), stats, stamps))
+    if manager is not None:
+        manager.flush(analyzer.log_summary)
+    outbox.put(([], [], sink.drain(), analyzer.stats.snapshot(), None))
+    outbox.put(None)
+
+class ShardedProcessor(threading.Thread):
+    """Routes readings by device to worker processes and merges their results into storage"""
+    def __init__(self, data_queue, storage, workers, batch_size=256, alert_sink=None,
+                 alert_options=None, rules=None, stats_window=60.0, anomaly_options=None,
+                 live_state=None, metrics=None):
+        super().__init__()
+        self.data_queue = data_queue
+        self.storage = storage
+        # Alerts from every worker are written by one sink in this process
+        self.alert_sink = alert_sink or processing.AlertSink()
+        self.running = True
+        self.processed_count = 0
+        self.daemon = True
+        self.batch_size = batch_size
+        
+        # Spawned rather than forked: the storage threads are already running
+        context = multiprocessing.get_context('spawn')
+        self.inboxes = [context.Queue(maxsize=64) for _ in range(workers)]
+        self.outbox = context.Queue()
+        # Workers get the config path: component classes cannot be pickled across processes
+        thresholds = rules.path if rules is not None else None
+        # Optional PipelineMetrics; readings are stamped on dequeue and timed again on merge
+        self.metrics = metrics
+        self.workers = [
+            context.Process(target=shard_worker,
+                            args=(inbox, self.outbox, alert_options, thresholds, stats_window,
+                                  anomaly_options, metrics is not None),
+                            daemon=True)
+            for inbox in self.inboxes
+        ]
+        self.merger = threading.Thread(target=self.merge_results, daemon=True)
+        # Counters and latest readings, kept up to date from the merged rows
+        self.live_state = live_state or processing.LiveState()
+        # Latest statistics per device, merged from the workers' snapshots
+        self.stats_window = stats_window
+        self.stats = {}
+        self.stats_published = time.monotonic()
+        
+    def start(self):
+        self.alert_sink.start()
+        for worker in self.workers:
+            worker.start()
+        self.merger.start()
+        super().start()
+        
+    def dispatch(self, pending, shard):
+        if pending[shard]:
+            self.inboxes[shard].put(pending[shard])
+            pending[shard] = []
+        
+    def run(self):
+        """Router loop - batches readings per shard so a device always lands on one worker"""
+        print(f" Sharded processor started with {len(self.workers)} workers")
+        shards = len(self.workers)
+        pending = [[] for _ in range(shards)]
+        try:
+            while self.running:
+                try:
+                    batch = self.data_queue.get_many(self.batch_size * shards, timeout=0.1)
+                except queue.Empty:
+                    continue
+                if self.metrics is not None:
+                    dequeued = time.monotonic()
+                    for data in batch:
+                        data['dequeued_at'] = dequeued
+                for data in batch:
+                    shard = shard_of(data['device_id'], shards)
+                    pending[shard].append(data)
+                    if len(pending[shard]) >= self.batch_size:
+                        self.dispatch(pending, shard)
+                self.data_queue.task_done(len(batch))
+                if self.data_queue.empty():
+                    # Caught up: hand over partial batches instead of waiting for more
+                    for shard in range(shards):
+                        self.dispatch(pending, shard)
+        finally:
+            for shard in range(shards):
+                self.dispatch(pending, shard)
+                self.inboxes[shard].put(None)
+                
+    def merge_results(self):
+        """Merger loop - the single point where worker results reach the storage writer"""
+        remaining = len(self.workers)
+        while remaining:
+            result = self.outbox.get()
+            if result is None:
+                remaining -= 1
+                continue
+            rows, upserts, alerts, stats, stamps = result
+            generated = None
+            if stamps:
+                now = time.monotonic()
+                self.metrics.record('analyze', [now - dequeued for dequeued, _ in stamps])
+                generated = [generated_at for _, generated_at in stamps]
+            self.storage.store_processed(rows, upserts, generated)
+            self.live_state.record_rows(rows)
+            if stats:
+                # Devices are sharded, so worker snapshots never overlap
+                self.stats.update(stats)
+                if time.monotonic() - self.stats_published >= processing.STATS_PUBLISH_INTERVAL:
+                    self.stats_published = time.monotonic()
+                    processing.publish_stats(self.stats, self.stats_window)
+            for alert in alerts:
+                self.alert_sink.emit(*alert)
+            previous = self.processed_count
+            self.processed_count += len(rows)
+            if self.processed_count // 10 > previous // 10:
+                print(f" Total packets processed: {self.processed_count}")
+        # Final snapshots arrive just before each worker's end marker
+        if self.stats:
+            processing.publish_stats(self.stats, self.stats_window)
+                
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout=2)
+        for worker in self.workers:
+            worker.join(timeout=5)
+        self.merger.join(timeout=5)
+        self.storage.flush()
+        self.alert_sink.close()
+        print(f" Sharded processor stopped. Total: {self.processed_count}")
+
+# ========== SENSOR MONITORING SYSTEM CLASS ==========
+class SensorMonitoringSystem:
+    def __init__(self, durability=database.DEFAULT_PROFILE, layout='standard', retention_days=7,
+                 workers=0, load=None, record=None, replay=None, replay_speed=1.0,
+                 alert_buffer=10000, alert_policy='block', alert_cooldown=60.0, alert_hysteresis=None,
+                 rules=None, stats_window=60.0, anomaly_threshold=4.0, anomaly_method='ewma',
+                 live_port=processing.LIVE_PORT, alert_log_size=processing.ALERT_LOG_MAX_BYTES,
+                 alert_log_backups=processing.ALERT_LOG_BACKUPS, alert_records='jsonl',
+                 queue_size=1000, queue_policy='block', queue_timeout=None, batch_size=256,
+                 metrics_file=processing.METRICS_FILE, metrics_interval=processing.METRICS_INTERVAL,
+                 profile=False, profile_dir=processing.PROFILE_DIR, profile_interval=processing.PROFILE_INTERVAL):
+        self.running = True
+        self.devices = []
+        # Per-stage latencies and rates, written to metrics_file every metrics_interval
+        # seconds; an interval of 0 turns them off
+        self.metrics = processing.PipelineMetrics() if metrics_interval > 0 else None
+        self.metrics_publisher = None
+        if self.metrics is not None:
+            self.metrics_publisher = processing.MetricsPublisher(self.metrics, metrics_file, metrics_interval)
+        # Stack sampling of the pipeline threads, toggled by SIGUSR1 or PROFILE on the live port;
+        # profile starts it with monitoring. Nothing runs while it is off
+        self.profiler = processing.HotPathProfiler(self.metrics, profile_dir, profile_interval)
+        self.profile = profile
+        self.previous_handler = None
+        # record: capture everything entering the queue to a stream file
+        self.recorder = recorder.StreamRecorder(record) if record else None
+        # queue_policy decides what happens to readings while the queue is full
+        self.data_queue = processing.ReadingQueue(queue_size, queue_policy, queue_timeout,
+                                                  recorder=self.recorder, metrics=self.metrics)
+        # load: LoadGenerator options; replaces the three simulated devices. With
+        # 'batch' set, a BatchLoad hands column batches straight to the processor
+        self.load_generator = None
+        self.batch_load = None
+        if load:
+            load = dict(load)
+            if load.pop('batch', False):
+                self.batch_load = sensors.BatchLoad(**load)
+            else:
+                self.load_generator = sensors.LoadGenerator(self.data_queue, **load)
+        # replay: feed a recorded stream instead of simulated devices
+        self.replayer = None
+        if replay:
+            self.replayer = recorder.ReplayThread(replay, self.data_queue, speed=replay_speed)
+        self.storage = DataStorage(profile=durability, layout=layout, retention_days=retention_days,
+                                   metrics=self.metrics)
+        # Alerts are logged from a bounded buffer; alert_policy applies when it is full
+        alert_sink = processing.AlertSink(capacity=alert_buffer, policy=alert_policy,
+                                          log_max_bytes=alert_log_size, log_backups=alert_log_backups,
+                                          record_format=alert_records, metrics=self.metrics)
+        # Repeated alerts are coalesced per cooldown; a cooldown of 0 logs every alert
+        alert_options = None
+        if alert_cooldown > 0:
+            alert_options = {'cooldown': alert_cooldown, 'hysteresis': alert_hysteresis}
+        # Live counters and latest readings, starting from what storage already holds
+        self.live_state = processing.LiveState()
+        self.live_state.seed(*self.storage.live_seed())
+        self.live_port = live_port
+        self.live_server = None
+        # Drift detection on top of the thresholds; a threshold of 0 turns it off
+        anomaly_options = None
+        if anomaly_threshold > 0:
+            anomaly_options = {'threshold': anomaly_threshold, 'method': anomaly_method}
+        # workers > 0 spreads analysis over that many processes, sharded by device
+        if workers > 0:
+            self.processor = ShardedProcessor(self.data_queue, self.storage, workers,
+                                              batch_size=batch_size, alert_sink=alert_sink,
+                                              alert_options=alert_options,
+                                              rules=rules, stats_window=stats_window,
+                                              anomaly_options=anomaly_options, live_state=self.live_state,
+                                              metrics=self.metrics)
+        else:
+            alert_manager = processing.AlertManager(**alert_options) if alert_options else None
+            detector = processing.AnomalyDetector(**anomaly_options) if anomaly_options else None
+            # batch_size readings at most are dequeued and classified together
+            self.processor = DataProcessor(self.data_queue, self.storage, batch_size=batch_size,
+                                           alert_sink=alert_sink, alert_manager=alert_manager, rules=rules,
+                                           stats_window=stats_window, anomaly_detector=detector,
+                                           live_state=self.live_state, metrics=self.metrics,
+                                           load=self.batch_load)
+        if self.metrics is not None:
+            # Depths and counters next to the latencies they explain
+            writer = self.storage.writer
+            self.metrics.add_gauge('queue', self.data_queue.metrics)
+            self.metrics.add_gauge('storage', lambda: {
+                'pending': len(writer.pending), 'written': writer.written_count,
+                'failed': writer.failed_count, 'batches': writer.batches_written,
+            })
+            self.metrics.add_gauge('alerts', lambda: {
+                'pending': len(alert_sink.pending), 'written': alert_sink.written_count,
+                'dropped': alert_sink.dropped_count,
+            })
+        
+    def start(self):
+        print("=" * 60)
+        print(" Starting Real-Time Monitoring")
+        print("=" * 60)
+        
+        # Start processor
+        self.processor.start()
+        if self.metrics_publisher is not None:
+            self.metrics_publisher.start()
+        self.watch_threads()
+        time.sleep(0.5)
+        
+        # Dashboards poll the live state instead of querying the database
+        if self.live_port:
+            self.live_server = processing.start_live_server(self.live_state, self.live_port,
+                                                            self.metrics, self.profiler)
+        
+        if self.load_generator is not None:
+            self.load_generator.start()
+            print(f"\n Load test running with {len(self.load_generator.devices)} virtual devices")
+            print("\nPress Ctrl+C to stop monitoring\n")
+            return
+        
+        if self.batch_load is not None:
+            print(f"\n Load test running with {self.batch_load.devices} virtual devices, "
+                  f"generated in column batches")
+            print("\nPress Ctrl+C to stop monitoring\n")
+            return
+        
+        if self.replayer is not None:
+            self.replay_started = time.monotonic()
+            self.replayer.start()
+            print("\nPress Ctrl+C to stop monitoring\n")
+            return
+        
+        # Create 3 devices
+        device_ids = ['DEV001', 'DEV002', 'DEV003']
+        device_names = ['Conveyor Belt', 'Cooling Unit', 'Robotic Arm']
+        
+        for i, dev_id in enumerate(device_ids):
+            device = DeviceSimulator(dev_id, self.data_queue, device_names[i])
+            self.devices.append(device)
+        
+        # Start devices
+        for device in self.devices:
+            device.start()
+            time.sleep(0.2)
+        
+        print(f"\n Monitoring started with {len(self.devices)} devices")
+        print(" Generating sensor data every 1-2 seconds...")
+        print("  Alerts will appear in colored text")
+        print("-" * 60)
+        print("\nPress Ctrl+C to stop monitoring\n")
+        
+    def watch_threads(self):
+        """Hand the pipeline threads to the profiler and install the SIGUSR1 toggle"""
+        if isinstance(self.processor, ShardedProcessor):
+            self.profiler.watch("router", self.processor)
+            self.profiler.watch("merger", self.processor.merger)
+        else:
+            self.profiler.watch("processor", self.processor)
+        self.profiler.watch("storage writer", self.storage.writer)
+        self.profiler.watch("alert sink", self.processor.alert_sink)
+        # Signal handlers can only be installed from the main thread, and Windows has no SIGUSR1
+        if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+            self.previous_handler = signal.signal(signal.SIGUSR1, self.toggle_profiling) or signal.SIG_DFL
+            print(f" kill -USR1 {os.getpid()} starts and stops profiling")
+        if self.profile:
+            self.profiler.start()
+            
+    def toggle_profiling(self, signum=None, frame=None):
+        self.profiler.toggle()
+        
+    def run_monitoring(self):
+        """Run monitoring until Ctrl+C"""
+        self.start()
+        
+        # Handle Ctrl+C
+        try:
+            while self.running:
+                time.sleep(1)
+                if self.replayer is not None and not self.replayer.is_alive():
+                    self.finish_replay()
+        except KeyboardInterrupt:
+            self.stop_monitoring()
+            
+    def finish_replay(self):
+        """Wait for the replayed stream to be processed, report throughput and stop"""
+        self.data_queue.join()
+        self.stop_monitoring()
+        elapsed = time.monotonic() - self.replay_started
+        print(f" Replay processed {self.processor.processed_count} readings in {elapsed:.2f}s "
+              f"({self.processor.processed_count / elapsed:.0f}/s)")
+        self.running = False
+    
+    def stop_monitoring(self):
+        print("\n Stopping monitoring...")
+        # A profile still running covers the run up to here
+        self.profiler.stop()
+        if self.previous_handler is not None:
+            signal.signal(signal.SIGUSR1, self.previous_handler)
+            self.previous_handler = None
+        for device in self.devices:
+            device.stop()
+        if self.load_generator is not None:
+            self.load_generator.stop()
+        if self.batch_load is not None:
+            print(f"⏹️  Batch load stopped. Total packets: {self.batch_load.packets_sent}")
+        if self.replayer is not None:
+            self.replayer.stop()
+        self.processor.stop()
+        if self.live_server is not None:
+            self.live_server.stop()
+        self.storage.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        print(f" {self.data_queue.summary()}")
+        if self.metrics_publisher is not None:
+            self.metrics_publisher.stop()
+            print(f" Pipeline latency (ms), also in {self.metrics_publisher.path}:")
+            for line in self.metrics.summary_lines():
+                print(f"   {line}")
+        print(" Monitoring stopped")
+
+# ========== MENU FUNCTIONS ==========
+def clear_screen():
+    """Clear terminal screen"""
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+def show_menu():
+    """Display main menu"""
+    clear_screen()
+    print("=" * 60)
+    print(" SENSOR MONITORING SYSTEM - MAIN MENU")
+    print("=" * 60)
+    print("1. Start Real-Time Monitoring")
+    print("2. View Live Dashboard")
+    print("3. Generate Daily Report")
+    print("4. View Alert Logs")
+    print("5. View Database Stats")
+    print("6. Exit")
+    print("-" * 60)
+    
+    try:
+        choice = input("Select option (1-6): ")
+        return choice
+    except KeyboardInterrupt:
+        return '6'
+
+# (title, log file, name of its lines, message when it does not exist) shown by view_alert_logs
+ALERT_LOG_VIEWS = [
+    ("WARNING ALERTS", "logs/alerts.log", "warnings", "Warning log file not found"),
+    ("CRITICAL ALERTS", "logs/critical_alerts.log", "critical alerts", "Critical log file not found"),
+    ("ANOMALIES", "logs/anomalies.log", "anomalies", None),
+]
+
+def parse_alert_query(text):
+    """Parse 'DEVICE [YYYY-MM-DD] [HH:MM-HH:MM]' into (device_id, start, end); times default to today"""
+    device_id = day = times = start = end = None
+    for token in text.split():
+        if len(token) == 10 and token[4] == '-' and token[7] == '-':
+            day = token
+        elif ':' in token:
+            times = token
+        else:
+            device_id = token
+    if day or times:
+        start = datetime.strptime(day or datetime.now().strftime("%Y-%m-%d"), "%Y-%m-%d")
+        end = start + timedelta(days=1)
+    if times:
+        first, _, last = times.partition('-')
+        start = datetime.combine(start, datetime.strptime(first, "%H:%M").time())
+        if last:
+            end = datetime.combine(start, datetime.strptime(last, "%H:%M").time())
+    return device_id, start, end
+
+def search_alert_logs(query):
+    """Print the alerts of every log that match a parse_alert_query query"""
+    device_id, start, end = parse_alert_query(query)
+    found = 0
+    for title, path, _, _ in ALERT_LOG_VIEWS:
+        lines = list(processing.AlertLogReader(path).search(device_id, start, end))
+        if lines:
+            print(f"\n {title} ({len(lines)}):")
+            print("-" * 40)
+            for line in lines[-SEARCH_RESULTS:]:
+                print(f"  {line}")
+            if len(lines) > SEARCH_RESULTS:
+                print(f"  ... last {SEARCH_RESULTS} of {len(lines)} shown")
+        found += len(lines)
+    if not found:
+        print("\nNo matching alerts")
+
+# Matches printed per log by a search
+SEARCH_RESULTS = 50
+
+def view_alert_logs():
+    """Display alert logs"""
+    clear_screen()
+    print("=" * 60)
+    print(" ALERT LOGS")
+    print("=" * 60)
+    
+    try:
+        # Check if logs directory exists
+        if not os.path.exists("logs"):
+            print("No logs directory found. Start monitoring first.")
+            input("\nPress Enter to continue...")
+            return
+        
+        # Tails are read backward from the end of each log, not the whole file
+        for title, path, plural, missing in ALERT_LOG_VIEWS:
+            reader = processing.AlertLogReader(path)
+            if not reader.segments():
+                if missing:
+                    print(missing)
+                continue
+            print(f"\n {title}:")
+            print("-" * 40)
+            lines = reader.tail(10)
+            if lines:
+                print(f"Last 10 {plural}:")
+                for line in lines:
+                    print(f"  {line.strip()}")
+            else:
+                print(f"No {plural} yet")
+        
+        # Searches go through the logs' offset indexes, archives included
+        while True:
+            query = input("\nSearch alerts (e.g. DEV002 14:00-15:00, or DEV002 2024-01-15), "
+                          "Enter to return: ").strip()
+            if not query:
+                return
+            try:
+                search_alert_logs(query)
+            except ValueError as e:
+                print(f"Invalid search: {e}")
+        
+    except Exception as e:
+        print(f"Error reading logs: {e}")
+    
+    input("\nPress Enter to continue...")
+
+def view_database_stats():
+    """Show database statistics"""
+    clear_screen()
+    print("=" * 60)
+    print(" DATABASE STATISTICS")
+    print("=" * 60)
+    
+    try:
+        if not os.path.exists("sensor_data.db"):
+            print("No database found. Start monitoring first.")
+            input("\nPress Enter to continue...")
+            return
+            
+        conn = connect_reader("sensor_data.db")
+        cursor = conn.cursor()
+        
+        # Total records
+        cursor.execute("SELECT COUNT(*) FROM sensor_readings")
+        total = cursor.fetchone()[0]
+        print(f"Total Sensor Readings: {total}")
+        
+        if total == 0:
+            print("\nNo data available yet. Start monitoring to collect data.")
+            conn.close()
+            input("\nPress Enter to continue...")
+            return
+        
+        # Device count
+        latest_sql, count_devices_sql = database.reader_queries(conn)
+        cursor.execute(count_devices_sql)
+        devices = cursor.fetchone()[0]
+        print(f"Devices Monitored: {devices}")
+        
+        # Alert statistics
+        cursor.execute('''
+            SELECT status, COUNT(*) as count 
+            FROM sensor_readings 
+            GROUP BY status
+        ''')
+        print("\n Status Distribution:")
+        for status, count in cursor.fetchall():
+            print(f"  {status}: {count}")
+        
+        # Latest readings
+        print("\n Latest Readings:")
+        cursor.execute('''
+            SELECT device_id, temperature, status, timestamp 
+            FROM sensor_readings 
+            ORDER BY id DESC 
+            LIMIT 5
+        ''')
+        for device_id, temp, status, timestamp in cursor.fetchall():
+            time_str = timestamp[11:19] if len(timestamp) > 11 else timestamp
+            print(f"  {device_id}: {temp}°C ({status}) at {time_str}")
+        
+        conn.close()
+        
+    except Exception as e:
+        print(f"Error: {e}")
+    
+    input("\nPress Enter to continue...")
+
+def generate_daily_report():
+    """Generate a simple daily report"""
+    clear_screen()
+    
+    print("=" * 60)
+    print(" GENERATING DAILY REPORT")
+    print("=" * 60)
+    
+    today = datetime.now().strftime("%Y-%m-%d")
+    
+    try:
+        if not os.path.exists("sensor_data.db"):
+            print("No database found. Start monitoring first.")
+            input("\nPress Enter to continue...")
+            return
+            
+        conn = connect_reader("sensor_data.db")
+        
+        # Answered from the minute/hour rollups, not a scan of today's readings
+        summary = database.summarize_range(conn, *database.day_bounds(today))
+        
+        if summary['readings'] == 0:
+            print("No data available for today yet.")
+            print("Start monitoring to collect data.")
+        else:
+            metrics = [
+                ("Temperature", summary['temperature'], "°C"),
+                ("Vibration", summary['vibration'], ""),
+                ("Voltage", summary['voltage'], "V"),
+            ]
+            lines = [
+                f"Total Readings: {summary['readings']}",
+                f"Critical Alerts: {summary['critical']}",
+                f"Warning Alerts: {summary['warning']}",
+                f"Anomalies: {summary['anomaly']}",
+            ]
+            for label, values, unit in metrics:
+                lines.append(f"Average {label}: {values['avg']:.1f}{unit}")
+                lines.append(f"{label} Range: {values['min']:.1f}{unit} - {values['max']:.1f}{unit}")
+            lines.extend(rolling_stats_lines())
+            
+            print(f"\n Report for: {today}")
+            print("-" * 40)
+            for line in lines:
+                print(line)
+            
+            # Save to file
+            body = "\n".join(lines)
+            report_text = f"""DAILY SENSOR REPORT - {today}
+===============================
+{body}
+Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+==============================="""
+            
+            # Create reports folder if it doesn't exist
+            os.makedirs("reports", exist_ok=True)
+            
+            # Save as text file
+            filename = f"reports/report_{today}.txt"
+            with open(filename, "w") as f:
+                f.write(report_text)
+            
+            print(f"\n Report saved to: {filename}")
+        
+        conn.close()
+        
+    except Exception as e:
+        print(f"Error generating report: {e}")
+    
+    input("\nPress Enter to continue...")
+
+# Report output formats and their file extensions
+REPORT_FORMATS = {'text': 'txt', 'csv': 'csv', 'json': 'json'}
+
+def report_lines(report):
+    """Text lines of a streaming report"""
+    lines = [f"Total Readings: {report['readings']}"]
+    for status in ('Good', 'Warning', 'Critical', 'Anomaly'):
+        lines.append(f"{status}: {report['statuses'].get(status, 0)}")
+    if report['alerts']:
+        lines.append("")
+        lines.append("Alerts by Type:")
+        for alert, count in report['alerts'].items():
+            lines.append(f"  {alert}: {count}")
+    for device_id, device in report['devices'].items():
+        lines.append("")
+        lines.append(
+            f"{device_id}: {device['readings']} readings, {device['first_seen']} - {device['last_seen']}"
+        )
+        lines.append(
+            f"  Uptime {device['uptime_percent']:.2f}% ({device['uptime_seconds']}s, "
+            f"{device['outages']} outages), message gaps {device['message_gaps']} "
+            f"({device['missing_messages']} missing), restarts {device['message_resets']}"
+        )
+        for metric, values in device['metrics'].items():
+            points = "  ".join(f"{point} {values[point]:.2f}" for point in values if point.startswith('p'))
+            lines.append(
+                f"  {metric.capitalize():<12} {points}  (min {values['min']:.2f}, "
+                f"mean {values['mean']:.2f}, max {values['max']:.2f})"
+            )
+        if device['alerts']:
+            lines.append("  Alerts: " + ", ".join(f"{alert} {count}" for alert, count in device['alerts'].items()))
+    return lines
+
+def write_report(report, f, report_format):
+    """Write a streaming report to an open file as text, csv (one row per device) or json"""
+    if report_format == 'json':
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    elif report_format == 'csv':
+        alerts = list(report['alerts'])
+        metrics = [
+            (metric, point) for metric in database.REPORT_METRICS
+            for point in ('min', 'mean', *(f"p{p}" for p in database.REPORT_PERCENTILES), 'max')
+        ]
+        writer = csv.writer(f)
+        writer.writerow(
+            ['device_id', 'readings', 'good', 'warning', 'critical', 'anomaly', 'first_seen', 'last_seen',
+             'uptime_seconds', 'uptime_percent', 'outages', 'message_gaps', 'missing_messages',
+             'message_resets']
+            + [f"{metric}_{point}" for metric, point in metrics] + alerts
+        )
+        for device_id, device in report['devices'].items():
+            writer.writerow(
+                [device_id, device['readings']]
+                + [device['statuses'].get(status, 0) for status in ('Good', 'Warning', 'Critical', 'Anomaly')]
+                + [device[key] for key in ('first_seen', 'last_seen', 'uptime_seconds', 'uptime_percent',
+                                           'outages', 'message_gaps', 'missing_messages', 'message_resets')]
+                + [device['metrics'][metric][point] for metric, point in metrics]
+                + [device['alerts'].get(alert, 0) for alert in alerts]
+            )
+    else:
+        f.write(f"SENSOR REPORT - {report['start']} to {report['end']}\n")
+        f.write("===============================\n")
+        for line in report_lines(report):
+            f.write(line + "\n")
+        f.write(f"Generated: {report['generated']}\n")
+        f.write("===============================\n")
+
+def run_report(args):
+    """Non-interactive report over --report days, streamed from the raw readings"""
+    (first_day, last_day), (start, end) = args.report
+    if not os.path.exists("sensor_data.db"):
+        print("No database found. Start monitoring first.")
+        return 1
+    conn = connect_reader("sensor_data.db")
+    try:
+        report = database.stream_report(conn, start, end, device_id=args.report_device)
+    finally:
+        conn.close()
+    
+    output = args.report_output
+    if output is None:
+        days = first_day if first_day == last_day else f"{first_day}_{last_day}"
+        os.makedirs("reports", exist_ok=True)
+        output = f"reports/report_{days}.{REPORT_FORMATS[args.report_format]}"
+    if output == "-":
+        write_report(report, sys.stdout, args.report_format)
+    else:
+        with open(output, "w", newline="" if args.report_format == 'csv' else None) as f:
+            write_report(report, f, args.report_format)
+        print(f" Report of {report['readings']} readings from {len(report['devices'])} devices "
+              f"saved to: {output}")
+    return 0
+
+def rolling_stats_lines():
+    """Report lines for the rolling statistics published by the last monitoring run"""
+    published = processing.read_stats()
+    if not published or not published['devices']:
+        return []
+    lines = ["", f"Rolling Statistics (as of {published['updated']}, "
+                 f"min/max over {published['window']:g}s):"]
+    for device_id, metrics in sorted(published['devices'].items()):
+        lines.append(f"  {device_id}:")
+        for metric, unit in (('temperature', "°C"), ('vibration', ""), ('voltage', "V")):
+            stats = metrics[metric]
+            lines.append(
+                f"    {metric.capitalize():<12} mean {stats['mean']:.2f}{unit} ± {stats['std']:.2f}, "
+                f"EWMA {stats['ewma']:.2f}{unit}, window {stats['min']:.2f}-{stats['max']:.2f}{unit}, "
+                f"rate {stats['rate']:+.3f}/s"
+            )
+    return lines
+
+# Highest redraw rate of the live dashboard (dashboard.py --fps)
+DASHBOARD_FPS = 10.0
+
+def run_dashboard():
+    """Run the dashboard"""
+    clear_screen()
+    print("Loading dashboard...")
+    time.sleep(1)
+    
+    try:
+        # A monitor running in another process pushes its live state: follow it
+        # with the incremental dashboard until q is pressed
+        client = LiveStateClient()
+        if client.snapshot() is not None:
+            client.close()
+            try:
+                LiveDashboard(client, fps=DASHBOARD_FPS).run()
+            except OSError as e:
+                print(f"Live dashboard error: {e}")
+            return
+        
+        # Simple dashboard implementation
+        if not os.path.exists("sensor_data.db"):
+            print("=" * 60)
+            print(" DASHBOARD")
+            print("=" * 60)
+            print("\n No data available!")
+            print("Start monitoring first (Option 1 in main menu)")
+            input("\nPress Enter to continue...")
+            return
+        
+        conn = connect_reader("sensor_data.db")
+        cursor = conn.cursor()
+        
+        # Status totals from the rollups rather than a count per status
+        summary = database.summarize_range(conn, *database.ALL_TIME)
+        total = summary['readings']
+        
+        if total == 0:
+            print("=" * 60)
+            print(" DASHBOARD")
+            print("=" * 60)
+            print("\n No data available!")
+            print("Start monitoring to collect data")
+            conn.close()
+            input("\nPress Enter to continue...")
+            return
+        
+        critical, warning, anomaly = summary['critical'], summary['warning'], summary['anomaly']
+        
+        # Get latest device data
+        latest_sql, count_devices_sql = database.reader_queries(conn)
+        cursor.execute(latest_sql)
+        devices = cursor.fetchall()
+        
+        conn.close()
+        
+        # Display dashboard
+        clear_screen()
+        print("=" * 70)
+        print(" REAL-TIME SENSOR DASHBOARD")
+        print("=" * 70)
+        print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f" Total Readings: {total} |   Warnings: {warning} |  Critical: {critical} |  Anomalies: {anomaly}")
+        print("-" * 70)
+        
+        print("\n DEVICE STATUS")
+        print("-" * 70)
+        print(f"{'Device':<10} {'Status':<12} {'Temp (°C)':<12} {'Last Update':<15}")
+        print("-" * 70)
+        
+        for device in devices:
+            device_id, temp, vib, volt, status, timestamp = device
+            
+            # Format time
+            time_str = timestamp[11:19] if len(timestamp) > 11 else timestamp
+            
+            # Status icon
+            if status == "Critical":
+                status_display = " CRITICAL"
+            elif status == "Warning":
+                status_display = " WARNING"
+            elif status == "Anomaly":
+                status_display = " ANOMALY"
+            else:
+                status_display = " GOOD"
+            
+            # Temperature warning
+            temp_display = f"{temp}°C"
+            if temp > 80:
+                temp_display = f" {temp}°C"
+            
+            print(f"{device_id:<10} {status_display:<12} {temp_display:<12} {time_str:<15}")
+        
+        print("\n" + "=" * 70)
+        
+    except Exception as e:
+        print(f"Dashboard error: {e}")
+    
+    input("\nPress Enter to continue...")
+
+# ========== MAIN PROGRAM ==========
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Sensor Monitoring System")
+    parser.add_argument(
+        "--durability", choices=sorted(database.STORAGE_PROFILES), default=database.DEFAULT_PROFILE,
+        help="strict syncs every commit, throughput only syncs at WAL checkpoints"
+    )
+    parser.add_argument(
+        "--layout", choices=database.LAYOUTS, default='standard',
+        help="table layout for a new database; compact uses integer codes and timestamps, "
+             "partitioned keeps one table per day with rollups"
+    )
+    parser.add_argument(
+        "--retention-days", type=int, default=7,
+        help="days of raw readings kept by the partitioned layout"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="worker processes for sharded analysis (0 keeps the single processor thread)"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=256,
+        help="readings dequeued and classified together (per worker with --workers; 1 analyzes one at a time)"
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=1000,
+        help="readings the processing queue holds"
+    )
+    parser.add_argument(
+        "--queue-policy", choices=processing.QUEUE_POLICIES, default='block',
+        help="when the queue is full: block the producer, drop the oldest or the new reading, "
+             "or keep each device to a fair share of the queue"
+    )
+    parser.add_argument(
+        "--queue-timeout", type=float, default=None, metavar="S",
+        help="block policy: seconds a producer waits for room before its reading is dropped "
+             "(default: wait as long as it takes)"
+    )
+    parser.add_argument(
+        "--metrics-file", default=processing.METRICS_FILE, metavar="PATH",
+        help="file the per-stage pipeline latencies and rates are written to"
+    )
+    parser.add_argument(
+        "--metrics-interval", type=float, default=processing.METRICS_INTERVAL, metavar="S",
+        help="seconds between metrics file updates (0 turns pipeline metrics off)"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="profile the pipeline threads from the start (SIGUSR1 or PROFILE on the live port toggles it)"
+    )
+    parser.add_argument(
+        "--profile-dir", default=processing.PROFILE_DIR, metavar="PATH",
+        help="directory profile dumps are written to"
+    )
+    parser.add_argument(
+        "--profile-interval", type=float, default=processing.PROFILE_INTERVAL, metavar="S",
+        help="seconds between stack samples while profiling"
+    )
+    parser.add_argument(
+        "--devices", type=int, default=0,
+        help="load test: simulate this many virtual devices instead of the three default ones"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=1.0,
+        help="load test: readings per second per virtual device"
+    )
+    parser.add_argument(
+        "--generator-threads", type=int, default=2,
+        help="load test: threads driving the virtual devices"
+    )
+    parser.add_argument(
+        "--batch-generator", action="store_true",
+        help="load test: generate the virtual devices' readings as NumPy column batches handed "
+             "straight to the processor, bypassing the queue (not with --workers, --record or --replay)"
+    )
+    parser.add_argument(
+        "--anomaly-rates", type=parse_anomaly_rates, default=None, metavar="TEMP,VIB,VOLT",
+        help="load test: chance per reading of a temperature, vibration and voltage anomaly"
+    )
+    parser.add_argument(
+        "--record", metavar="PATH",
+        help="append every reading entering the processing queue to a stream recording"
+    )
+    parser.add_argument(
+        "--replay", metavar="PATH",
+        help="feed a stream recording instead of simulated devices, then stop"
+    )
+    parser.add_argument(
+        "--replay-speed", type=float, default=1.0,
+        help="replay speed: 1.0 keeps recorded timing, 0 replays as fast as possible"
+    )
+    parser.add_argument(
+        "--alert-buffer", type=int, default=10000,
+        help="alerts buffered for the background log writer"
+    )
+    parser.add_argument(
+        "--alert-policy", choices=processing.ALERT_POLICIES, default='block',
+        help="when the alert buffer is full: block processing, drop the oldest alert, "
+             "or keep a sample of new alerts"
+    )
+    parser.add_argument(
+        "--alert-cooldown", type=float, default=60.0,
+        help="seconds repeats of an active alert are coalesced into one summary (0 logs every alert)"
+    )
+    parser.add_argument(
+        "--alert-hysteresis", type=parse_hysteresis, default=None, metavar="TEMP,VIB,VOLT",
+        help="margin past a threshold before an active alert clears (default 2,0.5,2)"
+    )
+    parser.add_argument(
+        "--alert-log-size", type=float, default=processing.ALERT_LOG_MAX_BYTES / (1024 * 1024),
+        metavar="MB", help="size at which an alert log is rotated to a compressed archive (0 never rotates)"
+    )
+    parser.add_argument(
+        "--alert-log-backups", type=int, default=processing.ALERT_LOG_BACKUPS,
+        help="compressed archives kept per alert log"
+    )
+    parser.add_argument(
+        "--alert-records", choices=processing.ALERT_RECORD_FORMATS, default='jsonl',
+        help="also write every alert as a structured record: logs/alerts.jsonl or compact logs/alerts.bin"
+    )
+    parser.add_argument(
+        "--thresholds", type=load_rules, default=None, metavar="PATH",
+        help="per-device and per-class threshold config, reloaded when it changes "
+             "(default: the built-in thresholds for every device; see thresholds.example.json)"
+    )
+    parser.add_argument(
+        "--stats-window", type=float, default=60.0,
+        help="seconds covered by the rolling per-device min/max statistics"
+    )
+    parser.add_argument(
+        "--anomaly-threshold", type=float, default=4.0,
+        help="deviations from a device's baseline that mark a reading as Anomaly (0 disables)"
+    )
+    parser.add_argument(
+        "--anomaly-method", choices=processing.ANOMALY_METHODS, default='ewma',
+        help="baseline: ewma adapts to slow changes, quantile tracks robust quartiles"
+    )
+    parser.add_argument(
+        "--live-port", type=int, default=processing.LIVE_PORT,
+        help="localhost port serving live counters and latest readings to dashboards (0 disables)"
+    )
+    parser.add_argument(
+        "--report", type=parse_report_days, metavar="DAY[:DAY]",
+        help="write a report over these days (YYYY-MM-DD, inclusive) from the raw readings and exit"
+    )
+    parser.add_argument(
+        "--report-format", choices=sorted(REPORT_FORMATS), default='text',
+        help="report output format"
+    )
+    parser.add_argument(
+        "--report-output", metavar="PATH",
+        help="report file, - for standard output (default reports/report_DAY.EXT)"
+    )
+    parser.add_argument(
+        "--report-device", metavar="DEVICE_ID",
+        help="limit the report to one device"
+    )
+    args = parser.parse_args()
+    if args.batch_generator and (args.workers or args.record or args.replay):
+        parser.error("--batch-generator cannot be combined with --workers, --record or --replay")
+    return args
+
+def parse_sensor_values(text, example, upper=None):
+    """Parse TEMP,VIB,VOLT into a per-sensor dict of non-negative numbers"""
+    try:
+        values = [float(part) for part in text.split(',')]
+    except ValueError:
+        values = []
+    if len(values) != 3 or not all(0.0 <= value <= (upper or value) for value in values):
+        raise argparse.ArgumentTypeError(f"expected three values, e.g. {example}")
+    return dict(zip(('temperature', 'vibration', 'voltage'), values))
+
+def parse_anomaly_rates(text):
+    """Parse TEMP,VIB,VOLT anomaly probabilities for the load generator"""
+    return parse_sensor_values(text, "0.05,0.03,0.02", upper=1.0)
+
+def parse_hysteresis(text):
+    """Parse TEMP,VIB,VOLT alert hysteresis margins"""
+    return parse_sensor_values(text, "2,0.5,2")
+
+def parse_report_days(text):
+    """Parse DAY or FIRST:LAST into ((first, last), [start, end) ts_epoch range)"""
+    first_day, _, last_day = text.partition(':')
+    last_day = last_day or first_day
+    try:
+        start, end = database.day_bounds(first_day)[0], database.day_bounds(last_day)[1]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD or YYYY-MM-DD:YYYY-MM-DD, got {text}")
+    if end <= start:
+        raise argparse.ArgumentTypeError(f"{last_day} is before {first_day}")
+    return (first_day, last_day), (start, end)
+
+def load_rules(path):
+    """Compile a threshold config file"""
+    try:
+        return processing.ThresholdRules.load(path)
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        raise argparse.ArgumentTypeError(f"cannot load thresholds from {path}: {e}")
+
+def load_options(args):
+    """LoadGenerator (or BatchLoad) keyword arguments from the command line, or None without --devices"""
+    if args.devices <= 0:
+        return None
+    if args.batch_generator:
+        return {'devices': args.devices, 'rate': args.rate, 'anomaly_rates': args.anomaly_rates, 'batch': True}
+    return {
+        'devices': args.devices,
+        'rate': args.rate,
+        'threads': args.generator_threads,
+        'anomaly_rates': args.anomaly_rates,
+    }
+
+def main(args):
+    """Main program with menu"""
+    clear_screen()
+    
+    while True:
+        choice = show_menu()
+        
+        if choice == '1':
+            # Start monitoring
+            system = SensorMonitoringSystem(
+                durability=args.durability, layout=args.layout, retention_days=args.retention_days,
+                workers=args.workers, load=load_options(args),
+                record=args.record, replay=args.replay, replay_speed=args.replay_speed,
+                alert_buffer=args.alert_buffer, alert_policy=args.alert_policy,
+                alert_cooldown=args.alert_cooldown, alert_hysteresis=args.alert_hysteresis,
+                rules=args.thresholds, stats_window=args.stats_window,
+                anomaly_threshold=args.anomaly_threshold, anomaly_method=args.anomaly_method,
+                live_port=args.live_port, alert_log_size=int(args.alert_log_size * 1024 * 1024),
+                alert_log_backups=args.alert_log_backups, alert_records=args.alert_records,
+                queue_size=args.queue_size, queue_policy=args.queue_policy, queue_timeout=args.queue_timeout,
+                batch_size=args.batch_size,
+                metrics_file=args.metrics_file, metrics_interval=args.metrics_interval,
+                profile=args.profile, profile_dir=args.profile_dir, profile_interval=args.profile_interval
+            )
+            try:
+                system.run_monitoring()
+            except KeyboardInterrupt:
+                print("\nReturning to menu...")
+                time.sleep(1)
+                
+        elif choice == '2':
+            # Run dashboard
+            run_dashboard()
+            
+        elif choice == '3':
+            # Generate report
+            generate_daily_report()
+            
+        elif choice == '4':
+            # View alert logs
+            view_alert_logs()
+            
+        elif choice == '5':
+            # View database stats
+            view_database_stats()
+            
+        elif choice == '6':
+            # Exit
+            clear_screen()
+            print("=" * 60)
+            print(" Thank you for using Sensor Monitoring System!")
+            print("Goodbye!")
+            print("=" * 60)
+            break
+            
+        else:
+            print("\n Invalid choice. Please select 1-6")
+            time.sleep(1)
+
+# ========== RUN THE PROGRAM ==========
+if __name__ == "__main__":
+    args = parse_args()
+    if args.report:
+        sys.exit(run_report(args))
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("\n\n Program terminated by user")
+    except Exception as e:
+        print(f"\n Unexpected error: {e}")
         input("Press Enter to exit...")
\ No newline at end of file
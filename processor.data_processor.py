@@ -1,164 +1,2494 @@
- # processor/data_processor.py
-import threading
-import time
-from datetime import datetime
-import os
-
-class DataProcessor(threading.Thread):
-    def __init__(self, data_queue, storage):
-        super().__init__()
-        self.data_queue = data_queue
-        self.storage = storage
-        self.running = True
-        self.processed_count = 0
-        self.daemon = True
-        
-        # Thresholds for alerts (from project requirements)
-        self.thresholds = {
-            'temperature': {'warning': 70.0, 'critical': 85.0},
-            'vibration': {'warning': 7.0, 'critical': 10.0},
-            'voltage': {'warning_low': 190.0, 'critical_low': 180.0}
-        }
-        
-        # Ensure logs directory exists
-        os.makedirs('logs', exist_ok=True)
-        
-    def analyze_data(self, data):
-        """Analyze sensor data and determine status"""
-        status = "Good"
-        alert_type = "None"
-        
-        temperature = data['temperature']
-        vibration = data['vibration']
-        voltage = data['voltage']
-        
-        # Check temperature
-        if temperature > self.thresholds['temperature']['critical']:
-            status = "Critical"
-            alert_type = "High Temperature"
-        elif temperature > self.thresholds['temperature']['warning']:
-            status = "Warning"
-            alert_type = "High Temperature Warning"
-            
-        # Check vibration
-        if vibration > self.thresholds['vibration']['critical']:
-            status = "Critical"
-            alert_type = "High Vibration"
-        elif vibration > self.thresholds['vibration']['warning']:
-            if status == "Good":
-                status = "Warning"
-            alert_type = "High Vibration Warning" if alert_type == "None" else alert_type + ", High Vibration"
-                
-        # Check voltage
-        if voltage < self.thresholds['voltage']['critical_low']:
-            status = "Critical"
-            alert_type = "Low Voltage"
-        elif voltage < self.thresholds['voltage']['warning_low']:
-            if status == "Good":
-                status = "Warning"
-            alert_type = "Low Voltage Warning" if alert_type == "None" else alert_type + ", Low Voltage"
-                
-        return status, alert_type
-    
-    def log_alert(self, data, status, alert_type):
-        """Log alerts to appropriate files"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {data['device_id']} - {alert_type}: "
-        log_entry += f"Temp={data['temperature']}°C, Vib={data['vibration']}, Volt={data['voltage']}V"
-        
-        # Print to console with colors
-        if status == "Critical":
-            print(f"\033[91m CRITICAL: {log_entry}\033[0m")  # Red
-        elif status == "Warning":
-            print(f"\033[93m WARNING: {log_entry}\033[0m")  # Yellow
-            
-        # Log to file
-        try:
-            if status == "Critical":
-                with open('logs/critical_alerts.log', 'a', encoding='utf-8') as f:
-                    f.write(log_entry + "\n")
-            elif status == "Warning":
-                with open('logs/alerts.log', 'a', encoding='utf-8') as f:
-                    f.write(log_entry + "\n")
-        except Exception as e:
-            print(f" Failed to write log: {e}")
-            
-        # Simulate email alert for critical events
-        if status == "Critical":
-            self.simulate_email_alert(data, alert_type)
-    
-    def simulate_email_alert(self, data, alert_type):
-        """Simulate sending email alert"""
-        email_content = f"""
-        {'='*60}
-         CRITICAL ALERT - Immediate Attention Required 
-        
-        Device: {data['device_id']} ({data.get('device_name', 'Unknown')})
-        Alert Type: {alert_type}
-        Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        
-        Sensor Readings:
-        - Temperature: {data['temperature']}°C
-        - Vibration: {data['vibration']}
-        - Voltage: {data['voltage']}V
-        - Message ID: {data['message_id']}
-        
-        Action Required: Please inspect the device immediately!
-        
-        ---
-        Sensor Monitoring System
-        {'='*60}
-        """
-        print(f"\033[91m📧 EMAIL ALERT SIMULATED:\033[0m")
-        print(email_content)
-        
-    def run(self):
-        """Main processing loop"""
-        print("⚙️ Data processor started and waiting for data...")
-        
-        while self.running:
-            try:
-                # Get data from queue with timeout
-                data = self.data_queue.get(timeout=1)
-                
-                # Process the data
-                status, alert_type = self.analyze_data(data)
-                
-                # Add processing results to data
-                data['status'] = status
-                data['alert_type'] = alert_type
-                
-                # Log alerts if needed
-                if status in ["Warning", "Critical"]:
-                    self.log_alert(data, status, alert_type)
-                
-                # Store in database
-                self.storage.store_sensor_data(data)
-                
-                # Update device health
-                error_increment = 1 if status == "Critical" else 0
-                self.storage.update_device_health(
-                    data['device_id'], 
-                    status, 
-                    packets_increment=1,
-                    error_increment=error_increment
-                )
-                
-                self.processed_count += 1
-                
-                # Print progress every 10 processed items
-                if self.processed_count % 10 == 0:
-                    print(f"Total packets processed: {self.processed_count}")
-                    
-                self.data_queue.task_done()
-                
-            except Exception as e:
-                # Handle empty queue (timeout) - this is normal
-                if "empty" not in str(e).lower():
-                    print(f" Processing error: {e}")
-                time.sleep(0.1)
-                
-    def stop(self):
-        """Stop the processor thread"""
-        self.running = False
+ # processor/data_processor.py
+import threading
+import time
+import queue
+import operator
+import sys
+import json
+import math
+import re
+import zlib
+import struct
+import socket
+import socketserver
+import calendar
+from array import array
+from collections import deque
+from functools import lru_cache
+from bisect import bisect_right
+from itertools import repeat
+from datetime import datetime, timedelta
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    # Batch mode falls back to classifying one reading at a time
+    np = None
+
+# Indexed by status code; Anomaly is last so the threshold codes keep their values
+STATUSES = ('Good', 'Warning', 'Critical', 'Anomaly')
+
+# (reading key, alert name, warning bit, critical bit), in analyze_data check
+# order; the bits match ALERT_FLAGS in storage.database
+ALERT_BITS = [
+    ('temperature', 'High Temperature', 0x01, 0x02),
+    ('vibration', 'High Vibration', 0x04, 0x08),
+    ('voltage', 'Low Voltage', 0x10, 0x20),
+]
+WARNING_BITS = 0x01 | 0x04 | 0x10
+CRITICAL_BITS = 0x02 | 0x08 | 0x20
+
+# (reading key, alert name, bit) set by AnomalyDetector; match storage.database too
+ANOMALY_BITS = [
+    ('temperature', 'Temperature Anomaly', 0x40),
+    ('vibration', 'Vibration Anomaly', 0x80),
+    ('voltage', 'Voltage Anomaly', 0x100),
+]
+ANOMALY_MASK = 0x40 | 0x80 | 0x100
+
+def alert_type_for(flags):
+    """Build the analyze_data alert_type string for an alert bitmask"""
+    parts = []
+    for _, name, warning_bit, critical_bit in ALERT_BITS:
+        if flags & critical_bit:
+            # A critical alert replaces everything reported before it
+            parts = [name]
+        elif flags & warning_bit:
+            parts.append(name if parts else f"{name} Warning")
+    parts.extend(name for _, name, bit in ANOMALY_BITS if flags & bit)
+    return ', '.join(parts) if parts else 'None'
+
+def status_code_for(flags):
+    """Return the STATUSES index for an alert bitmask"""
+    if flags & CRITICAL_BITS:
+        return 2
+    if flags & WARNING_BITS:
+        return 1
+    return 3 if flags & ANOMALY_MASK else 0
+
+# Every bitmask decoded once, so batches never build alert strings
+ALERT_TYPES = [alert_type_for(flags) for flags in range(ANOMALY_MASK + 1)]
+
+# Thresholds for alerts (from project requirements); config files override them
+DEFAULT_THRESHOLDS = {
+    'temperature': {'warning': 70.0, 'critical': 85.0},
+    'vibration': {'warning': 7.0, 'critical': 10.0},
+    'voltage': {'warning_low': 190.0, 'critical_low': 180.0}
+}
+
+# Seconds between checks of the threshold config file for changes
+RULES_RELOAD_INTERVAL = 2.0
+
+def merge_thresholds(base, override):
+    """Overlay a (possibly partial) {sensor: {level: value}} mapping on base"""
+    merged = {sensor: dict(limits) for sensor, limits in base.items()}
+    for sensor, limits in (override or {}).items():
+        if sensor == 'class':
+            continue
+        if sensor not in merged:
+            raise ValueError(f"Unknown sensor in thresholds: {sensor}")
+        for level, value in limits.items():
+            if level not in merged[sensor]:
+                raise ValueError(f"Unknown {sensor} threshold: {level}")
+            merged[sensor][level] = float(value)
+    return merged
+
+def limit_vectors(thresholds):
+    """(warning, critical) per ALERT_BITS sensor; voltage is negated so higher is always worse"""
+    temperature, vibration, voltage = thresholds['temperature'], thresholds['vibration'], thresholds['voltage']
+    warning = (temperature['warning'], vibration['warning'], -voltage['warning_low'])
+    critical = (temperature['critical'], vibration['critical'], -voltage['critical_low'])
+    return warning, critical
+
+class ThresholdRules:
+    """Thresholds per device and device class, compiled into limit rows.
+    
+    Config (JSON): {"default": {...}, "classes": {name: {...}},
+    "devices": {device_id: {"class": name, ...}}}, each level holding partial
+    {sensor: {level: value}} overrides applied default -> class -> device.
+    Devices without an entry use the default row.
+    """
+    def __init__(self, config=None, path=None, mtime=None):
+        config = config or {}
+        self.path = path
+        self.mtime = mtime
+        default = merge_thresholds(DEFAULT_THRESHOLDS, config.get('default'))
+        classes = {
+            name: merge_thresholds(default, overrides)
+            for name, overrides in config.get('classes', {}).items()
+        }
+        # Row 0 is the default; every configured device gets its own row
+        rows = [limit_vectors(default)]
+        self.device_rows = {}
+        for device_id, entry in config.get('devices', {}).items():
+            base = default
+            if 'class' in entry:
+                if entry['class'] not in classes:
+                    raise ValueError(f"Unknown device class for {device_id}: {entry['class']}")
+                base = classes[entry['class']]
+            self.device_rows[device_id] = len(rows)
+            rows.append(limit_vectors(merge_thresholds(base, entry)))
+        self.rows = rows
+        if np is not None:
+            self.warning = np.array([warning for warning, _ in rows], dtype=np.float64)
+            self.critical = np.array([critical for _, critical in rows], dtype=np.float64)
+            
+    @classmethod
+    def load(cls, path):
+        """Read and compile a threshold config file"""
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), path, mtime)
+            
+    def limits(self, device_id):
+        """(warning, critical) vectors of a device"""
+        return self.rows[self.device_rows.get(device_id, 0)]
+        
+    def flags(self, data):
+        """Return the alert bitmask of one reading"""
+        warning, critical = self.rows[self.device_rows.get(data['device_id'], 0)]
+        flags = 0
+        values = (data['temperature'], data['vibration'], -data['voltage'])
+        for i, (_, _, warning_bit, critical_bit) in enumerate(ALERT_BITS):
+            if values[i] > critical[i]:
+                flags |= critical_bit
+            elif values[i] > warning[i]:
+                flags |= warning_bit
+        return flags
+        
+    def flag_columns(self, temperature, vibration, voltage, device_ids=None):
+        """Return the alert bitmasks of equally long NumPy columns"""
+        # One row per sensor column, voltage negated to match the limits
+        values = np.array([temperature, vibration, voltage], dtype=np.float64)
+        values[2] *= -1
+        if device_ids is None or not self.device_rows:
+            warning, critical = self.warning[0][:, None], self.critical[0][:, None]
+        else:
+            rows = np.fromiter(map(self.device_rows.get, device_ids, repeat(0)), np.intp, len(device_ids))
+            warning, critical = self.warning[rows].T, self.critical[rows].T
+        is_critical = values > critical
+        is_warning = (values > warning) & ~is_critical
+        critical_bits = np.array([bit for _, _, _, bit in ALERT_BITS])
+        warning_bits = np.array([bit for _, _, bit, _ in ALERT_BITS])
+        return critical_bits @ is_critical + warning_bits @ is_warning
+        
+    def reloaded(self):
+        """Return freshly compiled rules if the config file changed, otherwise self"""
+        if self.path is None:
+            return self
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self
+        if mtime == self.mtime:
+            return self
+        try:
+            rules = ThresholdRules.load(self.path)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            # Keep evaluating with the previous rules until the file is fixed
+            print(f" Threshold config error, keeping previous rules: {e}")
+            self.mtime = mtime
+            return self
+        print(f" Reloaded thresholds from {self.path}")
+        return rules
+
+# What AlertSink.emit does when the buffer is full
+ALERT_POLICIES = ('block', 'drop-oldest', 'sample')
+
+# Log file per alert status
+ALERT_LOGS = {'Warning': 'alerts.log', 'Critical': 'critical_alerts.log', 'Anomaly': 'anomalies.log'}
+
+# ========== ALERT LOG FILES ==========
+# Every alert log has a sidecar <log>.idx with one INDEX_RECORD per line:
+# the latest line timestamp so far (epoch seconds, so the column stays
+# sorted when lines arrive slightly out of order), the CRC32 of the line's
+# device_id and its byte offset. Searches bisect the timestamps and read
+# only the lines whose device matches. A log past its size limit is rotated
+# to <log>.N.gz, made of gzip members of about ARCHIVE_BLOCK_SIZE bytes of
+# whole lines each and listed in <log>.N.blocks, so reaching any line means
+# inflating one member; its index moves along as <log>.N.idx.
+INDEX_RECORD = struct.Struct("<IIQ")
+ARCHIVE_BLOCK = struct.Struct("<QQ")
+ARCHIVE_BLOCK_SIZE = 64 * 1024
+ALERT_LOG_MAX_BYTES = 10 * 1024 * 1024
+ALERT_LOG_BACKUPS = 5
+
+# Seconds a line's timestamp may lag behind an earlier line's
+INDEX_SKEW = 60
+# Bytes read per step when tailing backward from the end of a log
+TAIL_CHUNK = 8192
+
+@lru_cache(maxsize=4096)
+def log_seconds(text):
+    """Epoch seconds of a log timestamp, treating the naive local time as UTC like ts_epoch"""
+    return calendar.timegm(time.strptime(text, "%Y-%m-%d %H:%M:%S"))
+
+def parse_alert_line(line):
+    """Return (epoch seconds, device_id) of a '[YYYY-MM-DD HH:MM:SS] DEVICE - ...' line, or Nones"""
+    if len(line) > 22 and line[0] == '[' and line[20] == ']':
+        end = line.find(' - ', 22)
+        try:
+            return log_seconds(line[1:20]), line[22:end] if end > 0 else None
+        except ValueError:
+            pass
+    return None, None
+
+def device_crc(device_id):
+    return zlib.crc32(device_id.encode('utf-8')) if device_id else 0
+
+def archive_numbers(path):
+    """Numbers N of the rotated <path>.N / <path>.N.gz archives, oldest first"""
+    pattern = re.compile(re.escape(os.path.basename(path)) + r"\.(\d+)(?:\.gz)?$")
+    try:
+        names = os.listdir(os.path.dirname(path) or '.')
+    except OSError:
+        return []
+    return sorted({int(match.group(1)) for match in map(pattern.match, names) if match})
+
+def compress_archive(archive):
+    """Compress a rotated log to archive.gz in separately inflatable blocks of whole lines"""
+    try:
+        blocks = []
+        with open(archive, 'rb') as source, open(archive + '.gz.tmp', 'wb') as target:
+            position = 0
+            while True:
+                chunk = source.read(ARCHIVE_BLOCK_SIZE)
+                if not chunk:
+                    break
+                chunk += source.readline()
+                blocks.append(ARCHIVE_BLOCK.pack(position, target.tell()))
+                # Each block is a complete gzip member; together they still read as one file with zcat
+                compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+                target.write(compressor.compress(chunk) + compressor.flush())
+                position += len(chunk)
+        with open(archive + '.blocks', 'wb') as f:
+            f.write(b"".join(blocks))
+        # Readers use the plain file for as long as it exists
+        os.replace(archive + '.gz.tmp', archive + '.gz')
+        os.remove(archive)
+    except OSError as e:
+        print(f" Failed to compress {archive}: {e}")
+
+def remove_archive(archive):
+    for suffix in ('', '.gz', '.gz.tmp', '.idx', '.blocks'):
+        try:
+            os.remove(archive + suffix)
+        except FileNotFoundError:
+            pass
+
+class AlertLog:
+    """One alert log file and its offset index, rotated to compressed archives past max_bytes"""
+    def __init__(self, path, max_bytes=ALERT_LOG_MAX_BYTES, backups=ALERT_LOG_BACKUPS):
+        self.path = path
+        # max_bytes 0 never rotates
+        self.max_bytes = max_bytes
+        self.backups = max(1, backups)
+        self.compressors = []
+        self.open()
+        
+    def open(self):
+        self.file = open(self.path, 'ab')
+        self.size = self.file.tell()
+        self.index = open(self.path + '.idx', 'a+b')
+        self.latest = 0
+        self.catch_up()
+        
+    def catch_up(self):
+        """Index lines the index does not cover yet: a log from before indexing, or a crash"""
+        index_size = self.index.seek(0, 2)
+        count = index_size // INDEX_RECORD.size
+        offset = 0
+        if count:
+            self.index.seek((count - 1) * INDEX_RECORD.size)
+            latest, _, offset = INDEX_RECORD.unpack(self.index.read(INDEX_RECORD.size))
+            if offset < self.size:
+                self.latest = latest
+            else:
+                # Not this log's index
+                count = offset = 0
+        self.index.truncate(count * INDEX_RECORD.size)
+        if self.size == 0:
+            return
+        
+        records = []
+        line = b"\n"
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            if count:
+                offset += len(f.readline())
+            for line in f:
+                seconds, device_id = parse_alert_line(line.decode('utf-8', errors='replace'))
+                if seconds is not None and seconds > self.latest:
+                    self.latest = seconds
+                records.append(INDEX_RECORD.pack(self.latest, device_crc(device_id), offset))
+                offset += len(line)
+        self.index.write(b"".join(records))
+        if not line.endswith(b"\n"):
+            # A line cut off by a crash must not run into the next one written
+            self.file.write(b"\n")
+            self.size += 1
+        
+    def write(self, lines):
+        """Append newline-terminated lines and their index records, rotating as the log fills"""
+        chunks = []
+        records = []
+        offset = self.size
+        latest = self.latest
+        for line in lines:
+            if self.max_bytes and offset >= self.max_bytes:
+                self.append(chunks, records, offset, latest)
+                self.rotate()
+                chunks, records, offset = [], [], 0
+            seconds, device_id = parse_alert_line(line)
+            if seconds is not None and seconds > latest:
+                latest = seconds
+            records.append(INDEX_RECORD.pack(latest, device_crc(device_id), offset))
+            data = line.encode('utf-8')
+            chunks.append(data)
+            offset += len(data)
+        self.append(chunks, records, offset, latest)
+        
+    def append(self, chunks, records, size, latest):
+        # The log goes first so index records never point past its end for long
+        self.file.write(b"".join(chunks))
+        self.index.write(b"".join(records))
+        self.size = size
+        self.latest = latest
+        
+    def rotate(self):
+        """Move the log and its index aside as the next archive and start new ones"""
+        self.close_files()
+        number = max(archive_numbers(self.path), default=0) + 1
+        archive = f"{self.path}.{number}"
+        os.replace(self.path + '.idx', archive + '.idx')
+        os.replace(self.path, archive)
+        # Compression runs beside the sink, one archive after another; the
+        # archive is readable meanwhile
+        previous = self.compressors[-1] if self.compressors else None
+        compressor = threading.Thread(target=self.compress, args=(number, previous), daemon=True)
+        compressor.start()
+        self.compressors = [thread for thread in self.compressors if thread.is_alive()] + [compressor]
+        self.open()
+        
+    def compress(self, number, previous):
+        """Compress archive number once the previous one is done, then prune old archives"""
+        if previous is not None:
+            previous.join()
+        compress_archive(f"{self.path}.{number}")
+        # Archives up to this one are compressed; newer ones are pruned by their own compressor
+        for old in archive_numbers(self.path)[:-self.backups]:
+            if old <= number:
+                remove_archive(f"{self.path}.{old}")
+        
+    def flush(self):
+        self.file.flush()
+        self.index.flush()
+        
+    def close_files(self):
+        self.file.close()
+        self.index.close()
+        
+    def close(self):
+        self.close_files()
+        for compressor in self.compressors:
+            compressor.join()
+
+class OffsetIndex:
+    """Record access to an index sidecar without loading it"""
+    def __init__(self, path):
+        try:
+            self.file = open(path, 'rb')
+            self.count = os.fstat(self.file.fileno()).st_size // INDEX_RECORD.size
+        except FileNotFoundError:
+            self.file = None
+            self.count = 0
+            
+    def record(self, i):
+        """(latest seconds, device CRC, offset) of record i"""
+        self.file.seek(i * INDEX_RECORD.size)
+        return INDEX_RECORD.unpack(self.file.read(INDEX_RECORD.size))
+        
+    def bisect(self, seconds):
+        """First record whose latest seconds are >= seconds"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[0] < seconds:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+        
+    def records(self, first, chunk=4096):
+        """Yield records from the first one on"""
+        self.file.seek(first * INDEX_RECORD.size)
+        while True:
+            data = self.file.read(chunk * INDEX_RECORD.size)
+            usable = len(data) - len(data) % INDEX_RECORD.size
+            if not usable:
+                return
+            yield from INDEX_RECORD.iter_unpack(data[:usable])
+            
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+class LogSegment:
+    """The live log or one rotated archive (plain while being compressed, then .gz)"""
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.file = None
+        self.blocks = None
+        self.cached = (None, b"")
+        
+    def open(self):
+        try:
+            self.file = open(self.path, 'rb')
+        except FileNotFoundError:
+            self.file = open(self.path + '.gz', 'rb')
+            with open(self.path + '.blocks', 'rb') as f:
+                data = f.read()
+            self.blocks = list(ARCHIVE_BLOCK.iter_unpack(data[:len(data) - len(data) % ARCHIVE_BLOCK.size]))
+            self.starts = [position for position, _ in self.blocks]
+            self.compressed_end = os.fstat(self.file.fileno()).st_size
+        return self
+        
+    def block(self, i):
+        """Inflate archive block i, keeping the last one inflated"""
+        if self.cached[0] != i:
+            start = self.blocks[i][1]
+            end = self.blocks[i + 1][1] if i + 1 < len(self.blocks) else self.compressed_end
+            self.file.seek(start)
+            self.cached = (i, zlib.decompress(self.file.read(end - start), 31))
+        return self.cached[1]
+        
+    def line_at(self, offset):
+        if self.blocks is None:
+            self.file.seek(offset)
+            return self.file.readline()
+        i = bisect_right(self.starts, offset) - 1
+        data = self.block(i)
+        start = offset - self.blocks[i][0]
+        end = data.find(b"\n", start)
+        return data[start:] if end < 0 else data[start:end + 1]
+        
+    def lines_from(self, offset, skip_first):
+        """Yield the lines of a plain segment from offset on"""
+        self.file.seek(offset)
+        if skip_first:
+            self.file.readline()
+        yield from self.file
+        
+    def tail(self, n):
+        """The last n lines, reading backward from the end"""
+        if self.blocks is not None:
+            lines = []
+            for i in range(len(self.blocks) - 1, -1, -1):
+                lines = self.block(i).splitlines() + lines
+                if len(lines) >= n:
+                    break
+            return lines[-n:] if n else []
+        position = self.file.seek(0, 2)
+        data = b""
+        while position > 0 and data.count(b"\n") <= n:
+            step = min(TAIL_CHUNK, position)
+            position -= step
+            self.file.seek(position)
+            data = self.file.read(step) + data
+        lines = data.splitlines()
+        if position > 0:
+            # Cut off at the front
+            lines = lines[1:]
+        return lines[-n:] if n else []
+        
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+class AlertLogReader:
+    """Tails and searches an alert log together with its rotated archives"""
+    def __init__(self, path):
+        self.path = path
+        
+    def segments(self):
+        """Archives oldest first, then the live log"""
+        paths = [f"{self.path}.{number}" for number in archive_numbers(self.path)]
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        return [LogSegment(path) for path in paths]
+        
+    def tail(self, n=10):
+        """The last n lines, newest last"""
+        lines = []
+        for segment in reversed(self.segments()):
+            try:
+                lines = segment.open().tail(n - len(lines)) + lines
+            except FileNotFoundError:
+                # Rotated away or pruned while listing
+                continue
+            finally:
+                segment.close()
+            if len(lines) >= n:
+                break
+        return [line.decode('utf-8', errors='replace') for line in lines]
+        
+    def search(self, device_id=None, start=None, end=None):
+        """Yield the lines of one device and/or start <= time < end (naive datetimes), oldest first"""
+        first = calendar.timegm(start.timetuple()) if start is not None else None
+        last = calendar.timegm(end.timetuple()) if end is not None else None
+        crc = device_crc(device_id) if device_id is not None else None
+        
+        def wanted(line):
+            seconds, line_device = parse_alert_line(line)
+            if device_id is not None and line_device != device_id:
+                return False
+            if first is not None or last is not None:
+                if seconds is None:
+                    return False
+                if (first is not None and seconds < first) or (last is not None and seconds >= last):
+                    return False
+            return True
+            
+        for segment in self.segments():
+            index = OffsetIndex(segment.index_path)
+            try:
+                segment.open()
+            except FileNotFoundError:
+                index.close()
+                continue
+            try:
+                done = False
+                if index.count:
+                    begin = index.bisect(first) if first is not None else 0
+                    for seconds, line_crc, offset in index.records(begin):
+                        if last is not None and seconds >= last + INDEX_SKEW:
+                            # Everything after this, here and in newer segments, is too late
+                            done = True
+                            break
+                        if crc is None or line_crc == crc:
+                            line = segment.line_at(offset).decode('utf-8', errors='replace').rstrip("\n")
+                            if wanted(line):
+                                yield line
+                if not done and segment.blocks is None:
+                    # Lines written after the index was last flushed
+                    offset = index.record(index.count - 1)[2] if index.count else 0
+                    for line in segment.lines_from(offset, skip_first=index.count > 0):
+                        line = line.decode('utf-8', errors='replace').rstrip("\n")
+                        if wanted(line):
+                            yield line
+            finally:
+                index.close()
+                segment.close()
+            if done:
+                return
+
+class AlertSink(threading.Thread):
+    """Writes alert log lines, console lines and simulated emails from a background thread"""
+    def __init__(self, log_dir='logs', capacity=10000, policy='block', flush_interval=1.0,
+                 sample_every=10, log_max_bytes=ALERT_LOG_MAX_BYTES, log_backups=ALERT_LOG_BACKUPS,
+                 record_format='none', metrics=None):
+        super().__init__()
+        if policy not in ALERT_POLICIES:
+            raise ValueError(f"Unknown alert policy: {policy}")
+        self.log_dir = log_dir
+        self.capacity = capacity
+        self.policy = policy
+        self.flush_interval = flush_interval
+        # With the sample policy, one in sample_every alerts is kept while full
+        self.sample_every = sample_every
+        self.running = True
+        self.daemon = True
+        
+        # (status, log line, console line, email text or None, record or None,
+        # reading's generated_at or None), guarded by the condition
+        self.condition = threading.Condition()
+        self.pending = deque()
+        self.overflow = 0
+        
+        # Log files stay open; writes are buffered and flushed every flush_interval.
+        # Past log_max_bytes a log is rotated to a compressed archive; log_backups are kept
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_max_bytes = log_max_bytes
+        self.log_backups = log_backups
+        self.files = {}
+        # Structured records of every alert, unless record_format is 'none'
+        self.records = None
+        if record_format != 'none':
+            self.records = AlertRecordFile(os.path.join(log_dir, ALERT_RECORD_FILES[record_format]),
+                                           record_format, log_max_bytes, log_backups)
+        # Optional PipelineMetrics; written alerts add their generated -> written latency
+        self.metrics = metrics
+        
+        # Statistics
+        self.emitted_count = 0
+        self.written_count = 0
+        self.dropped_count = 0
+        
+    def emit(self, status, entry, console, email=None, record=None, generated_at=None):
+        """Queue one alert; returns False if the full-buffer policy dropped it"""
+        with self.condition:
+            if len(self.pending) >= self.capacity:
+                if self.policy == 'block':
+                    self.condition.wait_for(
+                        lambda: len(self.pending) < self.capacity or not self.running
+                    )
+                else:
+                    self.overflow += 1
+                    if self.policy == 'sample' and self.overflow % self.sample_every:
+                        self.dropped_count += 1
+                        return False
+                    # Make room by dropping the oldest alert
+                    self.pending.popleft()
+                    self.dropped_count += 1
+            self.pending.append((status, entry, console, email, record, generated_at))
+            self.emitted_count += 1
+            if len(self.pending) == 1:
+                self.condition.notify_all()
+            return True
+            
+    def log_file(self, status):
+        f = self.files.get(status)
+        if f is None:
+            path = os.path.join(self.log_dir, ALERT_LOGS[status])
+            f = self.files[status] = AlertLog(path, self.log_max_bytes, self.log_backups)
+        return f
+        
+    def write(self, alerts, dropped):
+        """Write a batch: one console write and one write per log file"""
+        lines = {}
+        console = []
+        records = []
+        generated = []
+        for status, entry, line, email, record, generated_at in alerts:
+            lines.setdefault(status, []).append(entry + "\n")
+            if record is not None:
+                records.append(record)
+            if generated_at is not None:
+                generated.append(generated_at)
+            console.append(line + "\n")
+            if email:
+                console.append(email + "\n")
+        if dropped:
+            # Keep the logs honest about what the full-buffer policy discarded
+            note = (f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ALERT SINK - "
+                    f"{dropped} alerts dropped (buffer full, policy {self.policy})\n")
+            lines.setdefault('Warning', []).append(note)
+            console.append(note)
+        try:
+            if console:
+                sys.stdout.write("".join(console))
+            for status, batch in lines.items():
+                self.log_file(status).write(batch)
+            if records and self.records is not None:
+                self.records.write(records)
+            self.written_count += len(alerts)
+            if self.metrics is not None:
+                now = time.monotonic()
+                self.metrics.record('alert', [now - generated_at for generated_at in generated])
+        except Exception as e:
+            print(f" Failed to write log: {e}")
+            
+    def flush_files(self):
+        files = list(self.files.values())
+        if self.records is not None:
+            files.append(self.records)
+        for f in files:
+            try:
+                f.flush()
+            except Exception as e:
+                print(f" Failed to flush log: {e}")
+                
+    def run(self):
+        """Sink loop - drains the buffer as it fills, flushes files periodically"""
+        last_flush = time.monotonic()
+        reported = 0
+        while True:
+            with self.condition:
+                timeout = max(0, self.flush_interval - (time.monotonic() - last_flush))
+                if self.running and not self.pending:
+                    self.condition.wait(timeout=timeout)
+                alerts = list(self.pending)
+                self.pending.clear()
+                dropped = self.dropped_count - reported
+                reported = self.dropped_count
+                stopping = not self.running
+                # Wake producers blocked on a full buffer
+                self.condition.notify_all()
+            if alerts or dropped:
+                self.write(alerts, dropped)
+            if stopping or time.monotonic() - last_flush >= self.flush_interval:
+                self.flush_files()
+                last_flush = time.monotonic()
+            if stopping:
+                break
+                
+    def close(self, timeout=5.0):
+        """Write out buffered alerts and close the log files"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.is_alive():
+            self.join(timeout=timeout)
+        elif self.ident is None:
+            # Never started: write out what was emitted in this thread
+            self.run()
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
+        if self.records is not None:
+            self.records.close()
+
+# ========== STRUCTURED ALERT RECORDS ==========
+# Besides the text logs, AlertSink can write every alert and summary as a
+# record: one JSON object per line (alerts.jsonl), or fixed-width binary
+# records (alerts.bin) that load_alerts maps straight into NumPy columns.
+# Records are tuples in ALERT_RECORD_FIELDS order; kind is 'alert' or
+# 'summary', the timestamp is the reading's (the summary time for
+# summaries), and a summary carries only its worst value.
+ALERT_RECORD_FORMATS = ('none', 'jsonl', 'binary')
+ALERT_RECORD_FILES = {'jsonl': 'alerts.jsonl', 'binary': 'alerts.bin'}
+ALERT_RECORD_FIELDS = ('kind', 'timestamp', 'device_id', 'status', 'alert_type',
+                       'temperature', 'vibration', 'voltage', 'repeats')
+ALERT_KINDS = ('alert', 'summary')
+
+# Binary layout: MAGIC, then records of timestamp (epoch microseconds),
+# device_id (UTF-8, NUL padded, cut at 16 bytes), status code, kind, alert
+# bitmask (an ALERT_TYPES index), temperature, vibration, voltage (NaN when
+# absent) and repeats
+ALERT_RECORD_MAGIC = b"SALERTS1"
+ALERT_RECORD = struct.Struct("<q16sBBHdddI")
+ALERT_FLAGS_BY_TYPE = {alert_type: flags for flags, alert_type in enumerate(ALERT_TYPES)}
+
+def alert_record(data, status, alert_type):
+    """Record of an alert raised for a reading"""
+    return ('alert', data['timestamp'], data['device_id'], status, alert_type,
+            data['temperature'], data['vibration'], data['voltage'], 1)
+
+def encode_alert_record(record):
+    """Binary ALERT_RECORD bytes of a record tuple"""
+    kind, timestamp, device_id, status, alert_type, temperature, vibration, voltage, repeats = record
+    micros = (datetime.fromisoformat(timestamp) - EPOCH) // timedelta(microseconds=1)
+    nan = math.nan
+    return ALERT_RECORD.pack(
+        micros, device_id.encode('utf-8')[:16], STATUSES.index(status), ALERT_KINDS.index(kind),
+        ALERT_FLAGS_BY_TYPE.get(alert_type, 0),
+        nan if temperature is None else temperature,
+        nan if vibration is None else vibration,
+        nan if voltage is None else voltage,
+        repeats
+    )
+
+class AlertRecordFile:
+    """Appends alert records as JSON Lines or binary, rotating to <path>.N past max_bytes"""
+    def __init__(self, path, record_format='jsonl', max_bytes=ALERT_LOG_MAX_BYTES, backups=ALERT_LOG_BACKUPS):
+        if record_format not in ALERT_RECORD_FILES:
+            raise ValueError(f"Unknown alert record format: {record_format}")
+        self.path = path
+        self.binary = record_format == 'binary'
+        self.max_bytes = max_bytes
+        self.backups = max(1, backups)
+        self.open()
+        
+    def open(self):
+        self.file = open(self.path, 'ab')
+        self.size = self.file.tell()
+        if self.binary:
+            if self.size == 0:
+                self.file.write(ALERT_RECORD_MAGIC)
+                self.size = len(ALERT_RECORD_MAGIC)
+            else:
+                # Drop a record cut off by a crash so the rest stays aligned
+                extra = (self.size - len(ALERT_RECORD_MAGIC)) % ALERT_RECORD.size
+                if extra:
+                    self.file.truncate(self.size - extra)
+                    self.size -= extra
+                    
+    def write(self, records):
+        if self.max_bytes and self.size >= self.max_bytes:
+            self.rotate()
+        if self.binary:
+            data = b"".join(map(encode_alert_record, records))
+        else:
+            data = "".join(json.dumps(dict(zip(ALERT_RECORD_FIELDS, record))) + "\n"
+                           for record in records).encode('utf-8')
+        self.file.write(data)
+        self.size += len(data)
+        
+    def rotate(self):
+        self.file.close()
+        number = max(archive_numbers(self.path), default=0) + 1
+        os.replace(self.path, f"{self.path}.{number}")
+        for old in archive_numbers(self.path)[:-self.backups]:
+            remove_archive(f"{self.path}.{old}")
+        self.open()
+        
+    def flush(self):
+        self.file.flush()
+        
+    def close(self):
+        self.file.close()
+
+def alert_record_paths(path):
+    """The rotated <path>.N files oldest first, then path itself if it exists"""
+    paths = [f"{path}.{number}" for number in archive_numbers(path)]
+    return paths + [path] if os.path.exists(path) else paths
+
+def decode_devices(raw):
+    """Decode a column of NUL padded UTF-8 device ids, each distinct id once"""
+    unique, inverse = np.unique(raw, return_inverse=True)
+    return np.array([device_id.decode('utf-8', errors='replace') for device_id in unique.tolist()])[inverse]
+
+def load_alerts(path, archives=True, mmap=False):
+    """Load an alert record file (and its rotated predecessors) as NumPy columns.
+    
+    Binary files are read with one np.fromfile (or np.memmap with mmap=True)
+    per file; JSON Lines are parsed into lists first. Returns a dict with
+    every ALERT_RECORD_FIELDS column plus status_code and flags.
+    """
+    if np is None:
+        raise RuntimeError("load_alerts requires numpy")
+    paths = alert_record_paths(path) if archives else [path]
+    if not paths:
+        raise FileNotFoundError(f"No alert records at {path}")
+    with open(paths[-1], 'rb') as f:
+        binary = f.read(len(ALERT_RECORD_MAGIC)) == ALERT_RECORD_MAGIC
+    
+    if binary:
+        dtype = np.dtype([
+            ('timestamp', '<i8'), ('device_id', 'S16'), ('status_code', 'u1'), ('kind', 'u1'),
+            ('flags', '<u2'), ('temperature', '<f8'), ('vibration', '<f8'), ('voltage', '<f8'),
+            ('repeats', '<u4'),
+        ])
+        parts = []
+        for part in paths:
+            count = (os.path.getsize(part) - len(ALERT_RECORD_MAGIC)) // dtype.itemsize
+            if mmap:
+                parts.append(np.memmap(part, dtype=dtype, mode='r', offset=len(ALERT_RECORD_MAGIC), shape=(count,)))
+            else:
+                parts.append(np.fromfile(part, dtype=dtype, count=count, offset=len(ALERT_RECORD_MAGIC)))
+        records = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        columns = {
+            'kind': np.array(ALERT_KINDS)[records['kind']],
+            'timestamp': records['timestamp'].astype('datetime64[us]'),
+            'device_id': decode_devices(records['device_id']),
+            'status': np.array(STATUSES)[records['status_code']],
+            'alert_type': np.array(ALERT_TYPES, dtype=object)[records['flags']],
+            'status_code': records['status_code'],
+            'flags': records['flags'],
+        }
+        for field in ('temperature', 'vibration', 'voltage', 'repeats'):
+            columns[field] = records[field]
+        return columns
+    
+    values = {field: [] for field in ALERT_RECORD_FIELDS}
+    appends = [(field, values[field].append) for field in ALERT_RECORD_FIELDS]
+    for part in paths:
+        with open(part, 'rb') as f:
+            for line in f:
+                record = json.loads(line)
+                for field, append in appends:
+                    append(record[field])
+    columns = {
+        'kind': np.array(values['kind']),
+        'timestamp': np.array(values['timestamp'], dtype='datetime64[us]'),
+        'device_id': np.array(values['device_id']),
+        'status': np.array(values['status']),
+        'alert_type': np.array(values['alert_type'], dtype=object),
+        'repeats': np.array(values['repeats'], dtype=np.uint32),
+    }
+    for field in ('temperature', 'vibration', 'voltage'):
+        columns[field] = np.array([math.nan if value is None else value for value in values[field]])
+    codes = {status: code for code, status in enumerate(STATUSES)}
+    columns['status_code'] = np.array([codes[status] for status in values['status']], dtype=np.uint8)
+    columns['flags'] = np.array([ALERT_FLAGS_BY_TYPE.get(alert_type, 0) for alert_type in values['alert_type']],
+                                dtype=np.uint16)
+    return columns
+
+# Console color of summary lines per status
+SUMMARY_COLORS = {'Warning': "\033[93m", 'Critical': "\033[91m", 'Anomaly': "\033[96m"}
+
+# Alert state only clears once a value is back past its threshold by this margin
+DEFAULT_HYSTERESIS = {'temperature': 2.0, 'vibration': 0.5, 'voltage': 2.0}
+
+# How summary lines show the worst value of each sensor
+SENSOR_LABELS = {'temperature': ("Temp", "°C"), 'vibration': ("Vib", ""), 'voltage': ("Volt", "V")}
+
+class AlertManager:
+    """Stateful filter between classification and log_alert, per device and sensor.
+    
+    An alert fires when a sensor's level (warning / critical) rises. Repeats at
+    the same level are counted and reported as one summary per cooldown, and a
+    level only drops once the value has cleared the threshold by the hysteresis
+    margin. A summary is also written when the level drops. Anomaly readings are
+    tracked the same way under the 'anomaly' key until a reading is normal again.
+    """
+    def __init__(self, cooldown=60.0, hysteresis=None):
+        self.cooldown = cooldown
+        self.hysteresis = dict(DEFAULT_HYSTERESIS, **(hysteresis or {}))
+        # device_id -> {sensor: [level, window start, repeats, worst value]}
+        self.states = {}
+        self.last_sweep = time.monotonic()
+        
+        # Statistics
+        self.raised_count = 0
+        self.suppressed_count = 0
+        self.summary_count = 0
+        
+    def level(self, sensor, value, warning, critical, current):
+        """Alert level (0-2) of a value; levels up to current only clear past the hysteresis band"""
+        if sensor == 'voltage':
+            # Negated like its limits, so that higher is worse
+            value = -value
+        margin = self.hysteresis[sensor]
+        if value > critical - (margin if current >= 2 else 0):
+            return 2
+        if value > warning - (margin if current >= 1 else 0):
+            return 1
+        return 0
+        
+    @staticmethod
+    def worse(sensor, value, worst):
+        if sensor == 'voltage':
+            return value if value < worst else worst
+        return value if value > worst else worst
+        
+    def summary(self, device_id, sensor, state, now):
+        """Return (status, log entry, record) for the repeats collected in a state, and reset it"""
+        level, since, repeats, worst = state
+        current = datetime.now()
+        timestamp = current.strftime("%Y-%m-%d %H:%M:%S")
+        values = dict.fromkeys(METRICS)
+        if sensor == 'anomaly':
+            # worst holds the alert_type of the latest anomalous reading
+            alert_type = worst
+            entry = f"[{timestamp}] {device_id} - {worst}: {repeats} repeats in {now - since:.0f}s"
+        else:
+            name = next(alert for key, alert, _, _ in ALERT_BITS if key == sensor)
+            alert_type = name if level == 2 else f"{name} Warning"
+            label, unit = SENSOR_LABELS[sensor]
+            entry = (f"[{timestamp}] {device_id} - {alert_type}: {repeats} repeats in "
+                     f"{now - since:.0f}s, worst {label}={worst}{unit}")
+            values[sensor] = worst
+        record = ('summary', current.isoformat(), device_id, STATUSES[level], alert_type,
+                  values['temperature'], values['vibration'], values['voltage'], repeats)
+        state[1], state[2] = now, 0
+        self.summary_count += 1
+        return STATUSES[level], entry, record
+        
+    def process(self, data, status, rules, log_alert, log_summary, now=None):
+        """Update the device's alert state for one reading and emit what is due"""
+        now = time.monotonic() if now is None else now
+        device_id = data['device_id']
+        if now - self.last_sweep >= 1.0:
+            self.sweep(log_summary, now)
+        states = self.states.get(device_id)
+        if states is None:
+            if status == "Good":
+                return
+            states = self.states[device_id] = {}
+        
+        anomaly = states.get('anomaly')
+        if status == "Anomaly":
+            if anomaly is None:
+                states['anomaly'] = [3, now, 0, data['alert_type']]
+                self.raised_count += 1
+                log_alert(data, status, data['alert_type'])
+            else:
+                anomaly[2] += 1
+                anomaly[3] = data['alert_type']
+                self.suppressed_count += 1
+                if now - anomaly[1] >= self.cooldown:
+                    log_summary(*self.summary(device_id, 'anomaly', anomaly, now))
+        elif anomaly:
+            if anomaly[2]:
+                log_summary(*self.summary(device_id, 'anomaly', anomaly, now))
+            del states['anomaly']
+        
+        warning, critical = rules.limits(device_id)
+        for i, (sensor, name, _, _) in enumerate(ALERT_BITS):
+            value = data[sensor]
+            state = states.get(sensor)
+            current = state[0] if state else 0
+            level = self.level(sensor, value, warning[i], critical[i], current)
+            if level > current:
+                # New or escalated alert: report held back repeats, then fire
+                if state and state[2]:
+                    log_summary(*self.summary(device_id, sensor, state, now))
+                states[sensor] = [level, now, 0, value]
+                self.raised_count += 1
+                log_alert(data, STATUSES[level], name if level == 2 else f"{name} Warning")
+            elif level and level == current:
+                state[2] += 1
+                state[3] = self.worse(sensor, value, state[3]) if state[2] > 1 else value
+                self.suppressed_count += 1
+                if now - state[1] >= self.cooldown:
+                    log_summary(*self.summary(device_id, sensor, state, now))
+            elif state:
+                # Cleared or de-escalated
+                if state[2]:
+                    log_summary(*self.summary(device_id, sensor, state, now))
+                if level:
+                    states[sensor] = [level, now, 0, value]
+                else:
+                    del states[sensor]
+        if not states:
+            del self.states[device_id]
+            
+    def sweep(self, log_summary, now=None):
+        """Emit summaries whose cooldown ran out while the device went quiet"""
+        now = time.monotonic() if now is None else now
+        self.last_sweep = now
+        for device_id, states in self.states.items():
+            for sensor, state in states.items():
+                if state[2] and now - state[1] >= self.cooldown:
+                    log_summary(*self.summary(device_id, sensor, state, now))
+                    
+    def flush(self, log_summary, now=None):
+        """Emit a summary for every state with repeats held back, cooldown or not (at shutdown)"""
+        now = time.monotonic() if now is None else now
+        for device_id, states in self.states.items():
+            for sensor, state in states.items():
+                if state[2]:
+                    log_summary(*self.summary(device_id, sensor, state, now))
+
+# Metrics tracked by RollingStats, in ALERT_BITS order
+METRICS = tuple(sensor for sensor, _, _, _ in ALERT_BITS)
+EPOCH = datetime(1970, 1, 1)
+
+# Rolling statistics snapshot read by the dashboard and reports
+STATS_FILE = 'rolling_stats.json'
+STATS_PUBLISH_INTERVAL = 2.0
+
+class RollingStats:
+    """Per device and metric running statistics, each updated in O(1) per reading.
+    
+    mean/variance (Welford) and EWMA cover every reading since start; min/max
+    cover the window seconds up to the device's latest reading; rate is the
+    change per second since the previous reading. Scalars live in flat arrays
+    indexed slot * len(METRICS) + metric, with one slot per device.
+    """
+    def __init__(self, window=60.0, alpha=0.1):
+        self.window = window
+        self.alpha = alpha
+        self.slots = {}
+        self.count = array('q')
+        self.mean = array('d')
+        self.m2 = array('d')
+        self.ewma = array('d')
+        self.last = array('d')
+        self.rate = array('d')
+        self.last_time = array('d')
+        # Monotonic deques of (time, value): window minimum at [0] of
+        # lows, maximum at [0] of highs; each value is pushed and popped once
+        self.lows = []
+        self.highs = []
+        
+    def slot(self, device_id):
+        """Slot of a device, allocating one on first sight"""
+        slot = self.slots.get(device_id)
+        if slot is None:
+            slot = self.slots[device_id] = len(self.last_time)
+            width = len(METRICS)
+            for column in (self.count, self.mean, self.m2, self.ewma, self.last, self.rate):
+                column.extend([0] * width)
+            self.last_time.append(0.0)
+            self.lows.extend(deque() for _ in range(width))
+            self.highs.extend(deque() for _ in range(width))
+        return slot
+        
+    def update(self, device_id, t, values):
+        """Add one reading: t in seconds, values in METRICS order"""
+        slot = self.slot(device_id)
+        base = slot * len(METRICS)
+        dt = t - self.last_time[slot]
+        horizon = t - self.window
+        for i, value in enumerate(values, base):
+            n = self.count[i] + 1
+            self.count[i] = n
+            delta = value - self.mean[i]
+            self.mean[i] += delta / n
+            self.m2[i] += delta * (value - self.mean[i])
+            if n == 1:
+                self.ewma[i] = value
+            else:
+                self.ewma[i] += self.alpha * (value - self.ewma[i])
+                if dt > 0:
+                    self.rate[i] = (value - self.last[i]) / dt
+            self.last[i] = value
+            
+            lows = self.lows[i]
+            while lows and lows[-1][1] >= value:
+                lows.pop()
+            lows.append((t, value))
+            while lows[0][0] < horizon:
+                lows.popleft()
+            highs = self.highs[i]
+            while highs and highs[-1][1] <= value:
+                highs.pop()
+            highs.append((t, value))
+            while highs[0][0] < horizon:
+                highs.popleft()
+        self.last_time[slot] = t
+        
+    def record(self, data):
+        """Add a generate_sensor_data style reading"""
+        t = (datetime.fromisoformat(data['timestamp']) - EPOCH).total_seconds()
+        self.update(data['device_id'], t, (data['temperature'], data['vibration'], data['voltage']))
+        
+    def get(self, device_id, metric):
+        """Statistics of one device metric as a dict, or None for an unseen device"""
+        slot = self.slots.get(device_id)
+        if slot is None:
+            return None
+        i = slot * len(METRICS) + METRICS.index(metric)
+        n = self.count[i]
+        return {
+            'count': n,
+            'mean': self.mean[i],
+            'std': math.sqrt(self.m2[i] / (n - 1)) if n > 1 else 0.0,
+            'ewma': self.ewma[i],
+            'min': self.lows[i][0][1],
+            'max': self.highs[i][0][1],
+            'rate': self.rate[i],
+            'last': self.last[i],
+        }
+        
+    def snapshot(self):
+        """{device_id: {metric: statistics}} for every device seen"""
+        return {
+            device_id: {metric: self.get(device_id, metric) for metric in METRICS}
+            for device_id in self.slots
+        }
+        
+    def publish(self, path=STATS_FILE):
+        """Write the snapshot for the dashboard and reports"""
+        publish_stats(self.snapshot(), self.window, path)
+
+def publish_stats(devices, window, path=STATS_FILE):
+    """Atomically replace the rolling statistics file"""
+    try:
+        temp = f"{path}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'updated': datetime.now().isoformat(timespec='seconds'),
+                'window': window,
+                'devices': devices
+            }, f)
+        os.replace(temp, path)
+        return True
+    except OSError as e:
+        print(f" Stats publish error: {e}")
+        return False
+
+def read_stats(path=STATS_FILE):
+    """Load the latest published rolling statistics, or None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Local address dashboards poll for the live state
+LIVE_HOST = '127.0.0.1'
+LIVE_PORT = 8765
+
+# Positions of the reading_row fields LiveState keeps
+ROW_DEVICE_ID, ROW_TIMESTAMP, ROW_TEMPERATURE, ROW_VIBRATION, ROW_VOLTAGE, ROW_STATUS = 0, 3, 4, 5, 6, 7
+
+class LiveState:
+    """Status counters and the latest reading per device, updated as readings are processed.
+    
+    Only the processing thread writes; readers take snapshots, which copy
+    the containers in single C calls, so no lock is needed under the GIL.
+    """
+    def __init__(self):
+        self.counts = dict.fromkeys(STATUSES, 0)
+        self.total = 0
+        # device_id -> [temperature, vibration, voltage, status, timestamp]
+        self.latest = {}
+        # Bumped per reading; changed maps device_id -> version of its last update
+        self.version = 0
+        self.changed = {}
+        
+    def seed(self, counts, latest):
+        """Start from the totals and latest readings already in storage"""
+        for status, count in counts.items():
+            self.counts[status] = self.counts.get(status, 0) + count
+            self.total += count
+        for device_id, temperature, vibration, voltage, status, timestamp in latest:
+            self.latest.setdefault(device_id, [temperature, vibration, voltage, status, timestamp])
+            
+    def record(self, data):
+        """Account for one processed reading"""
+        status = data['status']
+        self.counts[status] += 1
+        self.total += 1
+        self.latest[data['device_id']] = [
+            data['temperature'], data['vibration'], data['voltage'], status, data['timestamp']
+        ]
+        self.version += 1
+        self.changed[data['device_id']] = self.version
+        
+    def record_rows(self, rows):
+        """Account for processed reading_row tuples, e.g. merged from shard workers"""
+        for row in rows:
+            status = row[ROW_STATUS]
+            self.counts[status] += 1
+            self.latest[row[ROW_DEVICE_ID]] = [
+                row[ROW_TEMPERATURE], row[ROW_VIBRATION], row[ROW_VOLTAGE], status, row[ROW_TIMESTAMP]
+            ]
+            self.version += 1
+            self.changed[row[ROW_DEVICE_ID]] = self.version
+        self.total += len(rows)
+        
+    def snapshot(self, since=None):
+        """Counters and latest readings as a JSON-ready dict; since keeps only devices updated later"""
+        version = self.version
+        if since is None:
+            devices = dict(self.latest)
+        else:
+            latest = self.latest
+            devices = {device_id: latest[device_id]
+                       for device_id, changed in list(self.changed.items()) if changed > since}
+        return {
+            'version': version,
+            'total': self.total,
+            'counts': dict(self.counts),
+            'devices': devices,
+        }
+
+# Highest update rate a subscriber can ask for, per second
+MAX_PUSH_RATE = 60.0
+
+class LiveStateHandler(socketserver.StreamRequestHandler):
+    """One dashboard connection: each SNAPSHOT (or METRICS) line is answered with one JSON line.
+    
+    PROFILE toggles hot-path profiling; the reply tells whether it is now on
+    and, when it was just stopped, where the dump was written.
+    
+    SUBSCRIBE [rate] turns the connection into a push stream: a full snapshot,
+    then at most rate times per second the devices changed since the last one.
+    """
+    def setup(self):
+        super().setup()
+        self.server.connections.add(self.connection)
+        
+    def finish(self):
+        self.server.connections.discard(self.connection)
+        super().finish()
+        
+    def handle(self):
+        for line in self.rfile:
+            command = line.strip().upper()
+            if command == b'SNAPSHOT':
+                reply = json.dumps(self.server.live_state.snapshot())
+            elif command == b'METRICS':
+                metrics = self.server.metrics
+                reply = json.dumps(metrics.snapshot() if metrics is not None else {'error': "metrics are off"})
+            elif command == b'PROFILE':
+                profiler = self.server.profiler
+                if profiler is None:
+                    reply = json.dumps({'error': "profiling is unavailable"})
+                else:
+                    dump = profiler.toggle()
+                    reply = json.dumps({'profiling': profiler.active, 'dump': dump})
+            elif command.split()[:1] == [b'SUBSCRIBE']:
+                try:
+                    rate = float(command.split()[1]) if len(command.split()) > 1 else 10.0
+                except ValueError:
+                    rate = 10.0
+                self.stream(min(max(rate, 0.1), MAX_PUSH_RATE))
+                return
+            else:
+                reply = json.dumps({'error': f"unknown command {command.decode(errors='replace')}"})
+            self.wfile.write(reply.encode('utf-8') + b"\n")
+            
+    def stream(self, rate):
+        """Push changes until the client disconnects or the server stops"""
+        state = self.server.live_state
+        update = state.snapshot()
+        try:
+            while True:
+                self.wfile.write(json.dumps(update).encode('utf-8') + b"\n")
+                since = update['version']
+                time.sleep(1.0 / rate)
+                # Nothing is sent while nothing changes
+                while state.version == since and not self.server.stopping:
+                    time.sleep(1.0 / rate)
+                if self.server.stopping:
+                    return
+                update = state.snapshot(since)
+        except OSError:
+            pass
+
+class LiveStateServer(socketserver.ThreadingTCPServer):
+    """Serves a LiveState on a localhost socket from a background thread"""
+    allow_reuse_address = True
+    daemon_threads = True
+    
+    def __init__(self, live_state, host=LIVE_HOST, port=LIVE_PORT, metrics=None, profiler=None):
+        super().__init__((host, port), LiveStateHandler)
+        self.live_state = live_state
+        # Optional PipelineMetrics answered to METRICS, and HotPathProfiler toggled by PROFILE
+        self.metrics = metrics
+        self.profiler = profiler
+        # Open dashboard connections, closed on stop so clients notice
+        self.connections = set()
+        self.stopping = False
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        
+    def start(self):
+        self.thread.start()
+        host, port = self.server_address[:2]
+        print(f" Live state served on {host}:{port}")
+        
+    def stop(self):
+        self.stopping = True
+        self.shutdown()
+        self.server_close()
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+def start_live_server(live_state, port=LIVE_PORT, metrics=None, profiler=None):
+    """Start serving the live state, or return None if the port is unavailable"""
+    try:
+        server = LiveStateServer(live_state, port=port, metrics=metrics, profiler=profiler)
+    except OSError as e:
+        print(f" Live state server unavailable on port {port}: {e}")
+        return None
+    server.start()
+    return server
+
+ANOMALY_METHODS = ('ewma', 'quantile')
+
+# Readings a baseline is seeded with before outliers are held back
+SEED_READINGS = 5
+
+# Quantiles tracked by the quantile method
+QUARTILES = (0.25, 0.5, 0.75)
+
+# Interquartile range of a normal distribution, in standard deviations
+IQR_SIGMAS = 1.349
+
+class AnomalyDetector:
+    """Online per device and metric detector of readings far from their baseline.
+    
+    method 'ewma' keeps an exponentially weighted mean per metric and flags
+    |z| > threshold. The noise is estimated from reading-to-reading changes, so
+    a slow drift leaves it alone and its lag behind the mean shows up as a
+    growing z; outliers pull the mean by at most the threshold and are left
+    out of the noise. 'quantile' instead tracks the quartiles with streaming
+    stochastic approximation (each step a fixed fraction of the interquartile
+    range, so spikes cannot drag them) and flags readings more than threshold
+    robust standard deviations from the median. Either way the state is a
+    fixed number of array slots per device.
+    """
+    def __init__(self, threshold=4.0, alpha=0.005, warmup=50, method='ewma'):
+        if method not in ANOMALY_METHODS:
+            raise ValueError(f"Unknown anomaly method: {method}")
+        self.threshold = threshold
+        self.alpha = alpha
+        # Readings per metric before anything is flagged
+        self.warmup = max(warmup, SEED_READINGS)
+        self.method = method
+        self.slots = {}
+        self.count = array('q')
+        # ewma: [mean, noise variance, last normal value] per metric;
+        # quantile: the QUARTILES, seeded with the first SEED_READINGS values
+        self.width = 3 if method == 'ewma' else SEED_READINGS
+        self.state = array('d')
+        self.observe_metric = self.ewma if method == 'ewma' else self.quantile
+        
+        # Statistics
+        self.flagged_count = 0
+        
+    def observe(self, data):
+        """Update the device's baselines with a reading and return its anomaly bits"""
+        slot = self.slots.get(data['device_id'])
+        if slot is None:
+            slot = self.slots[data['device_id']] = len(self.count) // len(ANOMALY_BITS)
+            self.count.extend([0] * len(ANOMALY_BITS))
+            self.state.extend([0.0] * (self.width * len(ANOMALY_BITS)))
+        flags = 0
+        i = slot * len(ANOMALY_BITS)
+        for sensor, _, bit in ANOMALY_BITS:
+            if self.observe_metric(i, data[sensor]):
+                flags |= bit
+            i += 1
+        if flags:
+            self.flagged_count += 1
+        return flags
+        
+    def classify(self, data, status, alert_type):
+        """Observe a reading; threshold alerts win, otherwise anomalies turn it into 'Anomaly'"""
+        flags = self.observe(data)
+        if flags and status == "Good":
+            return STATUSES[3], ALERT_TYPES[flags]
+        return status, alert_type
+        
+    def ewma(self, i, value):
+        n = self.count[i]
+        self.count[i] = n + 1
+        state = self.state
+        j = i * 3
+        if n == 0:
+            state[j] = state[j + 2] = value
+            return False
+        mean, variance = state[j], state[j + 1]
+        delta = value - mean
+        limit = self.threshold * math.sqrt(variance)
+        # Plain running averages until 1/n drops below alpha, so the baseline settles fast
+        alpha = max(self.alpha, 1.0 / (n + 1))
+        if n >= SEED_READINGS and limit > 0 and abs(delta) > limit:
+            state[j] = mean + alpha * math.copysign(limit, delta)
+            return n >= self.warmup
+        # Half the squared step between independent readings estimates their variance
+        step = value - state[j + 2]
+        state[j] = mean + alpha * delta
+        state[j + 1] = (1 - alpha) * variance + alpha * step * step / 2
+        state[j + 2] = value
+        return False
+        
+    def quantile(self, i, value):
+        n = self.count[i]
+        self.count[i] = n + 1
+        q = self.state
+        j = i * SEED_READINGS
+        if n < SEED_READINGS:
+            # Collect the first readings, then start from their quartiles
+            q[j + n] = value
+            if n + 1 == SEED_READINGS:
+                seed = sorted(q[j:j + SEED_READINGS])
+                for k, p in enumerate(QUARTILES):
+                    q[j + k] = seed[round(p * (SEED_READINGS - 1))]
+            return False
+        
+        low, median, high = q[j], q[j + 1], q[j + 2]
+        # Floor keeps a constant stream from freezing the steps at zero
+        spread = max(high - low, 1e-3 * abs(median), 1e-9)
+        anomalous = n >= self.warmup and abs(value - median) > self.threshold * spread / IQR_SIGMAS
+        
+        # Each quantile moves up by p or down by 1 - p steps, settling where
+        # a fraction p of the readings falls below it; steps shrink like 1/n
+        # at first, as in the ewma baseline, so the seed is forgotten quickly
+        step = max(self.alpha, 1.0 / (n + 1)) * spread
+        for k, p in enumerate(QUARTILES):
+            q[j + k] += step * (p - (value < q[j + k]))
+        return anomalous
+
+# ========== PIPELINE METRICS ==========
+# Readings carry a monotonic 'generated_at' stamp from their source. As a
+# reading moves through the pipeline, PipelineMetrics collects latencies per stage:
+#   enqueue  generated -> accepted by the reading queue, waits for room included
+#   queue    enqueued -> dequeued by the processor
+#   analyze  dequeued -> classified; in sharded mode this includes the hop to the worker
+#   alert    generated -> alert line written by the alert sink
+#   store    handed to the storage writer -> committed
+#   total    generated -> committed
+# time.monotonic() is system-wide, so stamps compare across worker processes.
+PIPELINE_STAGES = ('enqueue', 'queue', 'analyze', 'alert', 'store', 'total')
+
+# Periodic snapshot of the stage metrics, for whoever is watching a load test
+METRICS_FILE = 'pipeline_metrics.json'
+METRICS_INTERVAL = 5.0
+
+# Each power of two of microseconds is split into 2 ** (LATENCY_SUB_BITS - 1)
+# buckets, so a bucket is at most ~1.6% wide; latencies are capped at ~71 minutes
+LATENCY_SUB_BITS = 7
+LATENCY_MAX_US = 2 ** 32 - 1
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+
+# Seconds of one-second buckets behind the stage rates
+RATE_WINDOW = 10
+
+def latency_bucket(micros):
+    """Histogram bucket of a latency in whole microseconds"""
+    shift = micros.bit_length() - LATENCY_SUB_BITS
+    if shift <= 0:
+        return micros
+    return (shift << (LATENCY_SUB_BITS - 1)) + (micros >> shift)
+
+def bucket_ceiling(index):
+    """Highest latency (microseconds) counted in a bucket"""
+    shift = (index >> (LATENCY_SUB_BITS - 1)) - 1
+    if shift <= 0:
+        return index
+    return ((index - (shift << (LATENCY_SUB_BITS - 1)) + 1) << shift) - 1
+
+class LatencyHistogram:
+    """HDR-style log-linear latency histogram: fixed buckets, constant-time recording.
+    
+    Latencies under 2 ** LATENCY_SUB_BITS microseconds are counted exactly;
+    above that, each value lands in a bucket within ~1.6% of it, so
+    percentiles are exact to that precision however many values are recorded.
+    """
+    def __init__(self):
+        self.counts = [0] * (latency_bucket(LATENCY_MAX_US) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        
+    def record_many(self, latencies):
+        """Add a list of latencies in seconds"""
+        if not latencies:
+            return
+        counts = self.counts
+        last = len(counts) - 1
+        exact = 1 << LATENCY_SUB_BITS
+        sub_bits, half_bits = LATENCY_SUB_BITS, LATENCY_SUB_BITS - 1
+        for seconds in latencies:
+            micros = int(seconds * 1000000.0)
+            if micros < exact:
+                counts[micros if micros > 0 else 0] += 1
+            else:
+                shift = micros.bit_length() - sub_bits
+                index = (shift << half_bits) + (micros >> shift)
+                counts[index if index < last else last] += 1
+        self.count += len(latencies)
+        self.total += sum(latencies)
+        low, high = min(latencies), max(latencies)
+        if self.min is None or low < self.min:
+            self.min = low
+        if high > self.max:
+            self.max = high
+            
+    def percentile(self, p):
+        """Latency in seconds that p percent of the recorded values do not exceed"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bucket_ceiling(index) / 1000000.0, self.max)
+        return self.max
+        
+    def copy(self):
+        histogram = LatencyHistogram()
+        histogram.counts = list(self.counts)
+        histogram.count, histogram.total = self.count, self.total
+        histogram.min, histogram.max = self.min, self.max
+        return histogram
+        
+    def since(self, earlier):
+        """Histogram of the values recorded after earlier (a copy() of this one); min and max to bucket precision"""
+        histogram = LatencyHistogram()
+        histogram.counts = [now - then for now, then in zip(self.counts, earlier.counts)]
+        histogram.count = self.count - earlier.count
+        histogram.total = self.total - earlier.total
+        used = [index for index, count in enumerate(histogram.counts) if count]
+        if used:
+            histogram.min = bucket_ceiling(used[0]) / 1000000.0
+            histogram.max = min(bucket_ceiling(used[-1]) / 1000000.0, self.max)
+        return histogram
+        
+    def summary(self):
+        """count, mean, min, max and LATENCY_PERCENTILES (as 'p50', ...) in seconds"""
+        summary = {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min or 0.0,
+            'max': self.max,
+        }
+        for p in LATENCY_PERCENTILES:
+            summary[f"p{p:g}"] = self.percentile(p)
+        return summary
+
+class RateCounter:
+    """Events per second over the last RATE_WINDOW seconds, in one-second buckets"""
+    def __init__(self, window=RATE_WINDOW, now=None):
+        self.window = window
+        self.buckets = [0] * window
+        self.started = time.monotonic() if now is None else now
+        self.second = int(self.started)
+        
+    def advance(self, now):
+        """Clear the buckets of the seconds passed since the last event"""
+        second = int(now)
+        if second > self.second:
+            for s in range(self.second + 1, min(second, self.second + self.window) + 1):
+                self.buckets[s % self.window] = 0
+            self.second = second
+            
+    def add(self, count, now):
+        self.advance(now)
+        self.buckets[self.second % self.window] += count
+        
+    def rate(self, now):
+        self.advance(now)
+        # The current second is still filling, so it counts for the part already past
+        elapsed = min(self.window - 1 + now - self.second, now - self.started)
+        return sum(self.buckets) / elapsed if elapsed > 0 else 0.0
+
+class PipelineMetrics:
+    """Latency histograms and rate counters per pipeline stage, shared by every stage.
+    
+    Stages report whole batches of latencies under one lock acquisition.
+    Components that only take a metrics argument (the storage writer, the
+    reading queue) stay independent of this class. Gauges are callables
+    read at snapshot time, e.g. the reading queue's own counters.
+    """
+    def __init__(self, stages=PIPELINE_STAGES):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.histograms = {stage: LatencyHistogram() for stage in stages}
+        self.rates = {stage: RateCounter(now=self.started) for stage in stages}
+        self.gauges = {}
+        
+    def checkpoint(self):
+        """Copies of the stage histograms, for summarizing a later period with summaries(since)"""
+        with self.lock:
+            return {stage: histogram.copy() for stage, histogram in self.histograms.items()}
+            
+    def summaries(self, since=None):
+        """Latency summary per stage, of everything or of what was recorded after a checkpoint()"""
+        with self.lock:
+            return {
+                stage: (histogram.since(since[stage]) if since else histogram).summary()
+                for stage, histogram in self.histograms.items()
+            }
+        
+    def record(self, stage, latencies):
+        """Add a list of latencies (seconds) for a stage"""
+        if not latencies:
+            return
+        with self.lock:
+            self.histograms[stage].record_many(latencies)
+            self.rates[stage].add(len(latencies), time.monotonic())
+            
+    def add_gauge(self, name, read):
+        """Include read() in every snapshot under name"""
+        self.gauges[name] = read
+        
+    def snapshot(self):
+        """Per-stage latency summary and rate, plus the gauges, as a JSON-ready dict"""
+        stages = self.summaries()
+        with self.lock:
+            now = time.monotonic()
+            for stage, rate in self.rates.items():
+                stages[stage]['rate'] = rate.rate(now)
+        gauges = {}
+        for name, read in self.gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception as e:
+                gauges[name] = {'error': str(e)}
+        return {
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'uptime': now - self.started,
+            'stages': stages,
+            'gauges': gauges,
+        }
+        
+    def publish(self, path=METRICS_FILE):
+        """Atomically replace the metrics file with a fresh snapshot"""
+        try:
+            temp = f"{path}.tmp"
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=1)
+            os.replace(temp, path)
+            return True
+        except OSError as e:
+            print(f" Metrics publish error: {e}")
+            return False
+            
+    def summary_lines(self):
+        """One line per stage that saw readings: rate, mean and percentiles in milliseconds"""
+        return stage_lines(self.snapshot()['stages'])
+
+def stage_lines(stages):
+    """Format {stage: summary with 'rate'} as one line per stage that saw readings"""
+    lines = []
+    for stage, m in stages.items():
+        if not m['count']:
+            continue
+        percentiles = " ".join(f"p{p:g} {m[f'p{p:g}'] * 1000:.2f}" for p in LATENCY_PERCENTILES)
+        lines.append(f"{stage:<8} {m['count']:>9} readings {m['rate']:>8.1f}/s  mean "
+                     f"{m['mean'] * 1000:.2f}  {percentiles}  max {m['max'] * 1000:.2f} ms")
+    return lines
+
+class MetricsPublisher(threading.Thread):
+    """Writes the pipeline metrics file every interval seconds, and once more on stop"""
+    def __init__(self, metrics, path=METRICS_FILE, interval=METRICS_INTERVAL):
+        super().__init__()
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.daemon = True
+        self.stop_event = threading.Event()
+        
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.metrics.publish(self.path)
+            
+    def stop(self):
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout=5)
+        self.metrics.publish(self.path)
+
+# ========== HOT-PATH PROFILING ==========
+# A stack sampler for the pipeline threads, switched on and off while
+# monitoring runs. While off there is no sampler thread and the pipeline
+# runs unchanged. While on, one thread reads the watched threads' stacks
+# every PROFILE_INTERVAL seconds (sys._current_frames), so nothing has to
+# be instrumented and already running threads can be profiled, which
+# cProfile cannot do. Stopping writes profile_<time>.txt (per thread, the
+# busy share and the functions sampled most, plus the pipeline stage
+# latencies of the profiled period) and profile_<time>.folded, collapsed
+# stacks for flame graph tools.
+PROFILE_DIR = 'profiles'
+PROFILE_INTERVAL = 0.005
+PROFILE_TOP = 25
+
+# A sample whose innermost frame is in one of these modules is a thread waiting for work
+IDLE_MODULES = ('threading', 'queue', 'selectors', 'socketserver',
+                'multiprocessing.queues', 'multiprocessing.connection')
+
+def code_label(code):
+    """file:line Class.function of a code object"""
+    path = code.co_filename
+    name = os.path.basename(path)
+    if name == '__init__.py':
+        # Name the package, e.g. json/__init__.py
+        name = f"{os.path.basename(os.path.dirname(path))}/{name}"
+    return f"{name}:{code.co_firstlineno} {getattr(code, 'co_qualname', code.co_name)}"
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of some threads until stopped, counting per function and per stack"""
+    def __init__(self, threads, interval=PROFILE_INTERVAL):
+        super().__init__()
+        # [(name, thread ident)]
+        self.threads = threads
+        self.interval = interval
+        self.daemon = True
+        self.stop_event = threading.Event()
+        idle = (getattr(sys.modules.get(name), '__file__', None) for name in IDLE_MODULES)
+        self.idle_files = {path for path in idle if path}
+        
+        # Per thread name: samples, idle samples, and over the busy samples
+        # {code: samples on top} and {code: samples on the stack}
+        self.samples = dict.fromkeys((name for name, _ in threads), 0)
+        self.idle = dict.fromkeys(self.samples, 0)
+        self.own = {name: {} for name in self.samples}
+        self.inclusive = {name: {} for name in self.samples}
+        # (thread name, codes outermost first) -> samples
+        self.stacks = {}
+        self.started = self.stopped = None
+        
+    def run(self):
+        self.started = time.monotonic()
+        while not self.stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for name, ident in self.threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.sample(name, frame)
+        self.stopped = time.monotonic()
+        
+    def sample(self, name, frame):
+        """Count one stack, innermost frame first"""
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        self.samples[name] += 1
+        key = (name, tuple(reversed(codes)))
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+        if codes[0].co_filename in self.idle_files:
+            self.idle[name] += 1
+            return
+        own = self.own[name]
+        own[codes[0]] = own.get(codes[0], 0) + 1
+        inclusive = self.inclusive[name]
+        # Recursive functions count once per sample
+        for code in set(codes):
+            inclusive[code] = inclusive.get(code, 0) + 1
+        
+    def stop(self):
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout=5)
+            
+    def report_lines(self, top=PROFILE_TOP):
+        """Per thread: busy share, then the busiest functions by busy samples on top and on the stack"""
+        lines = []
+        for name, samples in self.samples.items():
+            if not samples:
+                lines.append(f"{name}: no samples")
+                continue
+            busy = samples - self.idle[name]
+            lines.append(f"{name}: {samples} samples, {busy / samples:.1%} busy")
+            lines.append("   self%  total%  function")
+            own, inclusive = self.own[name], self.inclusive[name]
+            # Thread bootstrap frames are on every stack and say nothing
+            busiest = sorted((code for code in inclusive if code.co_filename not in self.idle_files),
+                             key=lambda code: (-own.get(code, 0), -inclusive[code]))
+            for code in busiest[:top]:
+                lines.append(f"  {own.get(code, 0) / samples:>6.1%}  {inclusive[code] / samples:>6.1%}  "
+                             f"{code_label(code)}")
+            lines.append("")
+        return lines
+        
+    def folded_lines(self):
+        """Collapsed stacks, 'thread;outer;...;inner samples' per line"""
+        return [
+            ";".join([name.replace(" ", "_")] + [code_label(code).replace(";", ",") for code in codes])
+            + f" {count}"
+            for (name, codes), count in sorted(self.stacks.items(), key=lambda item: -item[1])
+        ]
+
+class HotPathProfiler:
+    """Starts and stops stack sampling of the watched pipeline threads and writes the dumps"""
+    def __init__(self, metrics=None, directory=PROFILE_DIR, interval=PROFILE_INTERVAL):
+        # Optional PipelineMetrics whose stage latencies go into each dump
+        self.metrics = metrics
+        self.directory = directory
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.watched = []
+        self.sampler = None
+        self.checkpoint = None
+        self.began = None
+        
+    @property
+    def active(self):
+        return self.sampler is not None
+        
+    def watch(self, name, thread):
+        """Sample thread under name whenever profiling is on"""
+        self.watched.append((name, thread))
+        
+    def start(self):
+        """Start sampling; False if already sampling"""
+        with self.lock:
+            if self.sampler is not None:
+                return False
+            threads = [(name, thread.ident) for name, thread in self.watched if thread.is_alive()]
+            self.sampler = StackSampler(threads, self.interval)
+            self.checkpoint = self.metrics.checkpoint() if self.metrics is not None else None
+            self.began = datetime.now()
+            self.sampler.start()
+        print(f" Profiling {', '.join(name for name, _ in threads)} every {self.interval * 1000:g} ms")
+        return True
+        
+    def stop(self):
+        """Stop sampling and write the dump; returns its path, or None"""
+        with self.lock:
+            sampler, self.sampler = self.sampler, None
+            if sampler is None:
+                return None
+            sampler.stop()
+            return self.dump(sampler)
+            
+    def toggle(self):
+        """Start sampling, or stop and write the dump"""
+        if self.active:
+            return self.stop()
+        self.start()
+        return None
+        
+    def dump(self, sampler):
+        """Write the report and the collapsed stacks of a finished sampler"""
+        elapsed = sampler.stopped - sampler.started
+        lines = [
+            f"Profile {self.began.strftime('%Y-%m-%d %H:%M:%S')} - {datetime.now().strftime('%H:%M:%S')} "
+            f"({elapsed:.1f} s, one sample every {self.interval * 1000:g} ms)",
+            "",
+        ]
+        lines += sampler.report_lines()
+        if self.metrics is not None:
+            stages = self.metrics.summaries(self.checkpoint)
+            for summary in stages.values():
+                summary['rate'] = summary['count'] / elapsed if elapsed > 0 else 0.0
+            lines.append("Pipeline stages while profiling (ms):")
+            lines += [f"  {line}" for line in stage_lines(stages)] or ["  no readings"]
+        name = os.path.join(self.directory, f"profile_{self.began.strftime('%Y%m%d_%H%M%S')}")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{name}.txt", 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            with open(f"{name}.folded", 'w', encoding='utf-8') as f:
+                f.write("\n".join(sampler.folded_lines()) + "\n")
+        except OSError as e:
+            print(f" Profile dump error: {e}")
+            return None
+        print(f" Profile written to {name}.txt")
+        return f"{name}.txt"
+
+# ========== READING QUEUE ==========
+# What ReadingQueue.put does when the queue is full: block (for at most
+# block_timeout seconds, then drop the reading), drop the oldest queued
+# reading, drop the new one, or keep every device to its fair share
+QUEUE_POLICIES = ('block', 'drop-oldest', 'drop-newest', 'fair')
+
+class ReadingQueue:
+    """Bounded ring buffer between producers and the processor, with overload policies.
+    
+    Drop-in for the queue.Queue methods the pipeline uses (put, get,
+    get_nowait, task_done, join, empty, qsize), plus get_many, which takes
+    a whole batch under one lock acquisition. Consumers are only notified
+    when the queue turns non-empty, producers only under the block policy.
+    Every reading carries its enqueue time, so each batch adds its queueing
+    latency in O(1).
+    
+    With the fair policy a full queue drops readings of a device at or over
+    its share (capacity / devices queued); a reading of a device under its
+    share evicts the oldest reading of the device furthest over it. Each
+    device's slots and a count -> devices map find that reading in O(1); it
+    leaves an empty slot that dequeuing skips, and the ring (twice capacity
+    under this policy) is compacted once those gaps fill it.
+    """
+    def __init__(self, capacity=1000, policy='block', block_timeout=None, recorder=None, metrics=None):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.capacity = max(1, capacity)
+        self.policy = policy
+        # None blocks until there is room, like queue.Queue
+        self.block_timeout = block_timeout
+        # Optional StreamRecorder; accepted readings are recorded in queue order
+        # without holding up the consumer: put appends them to unrecorded under
+        # the queue lock and writes them out after releasing it, under record_lock
+        self.recorder = recorder
+        self.unrecorded = deque()
+        self.record_lock = threading.Lock()
+        # Optional PipelineMetrics; dequeued batches add their enqueue and queue latencies
+        # (named apart from metrics(), the queue's own counters)
+        self.stage_metrics = metrics
+        
+        # Slots hold readings in enqueue order from head; used counts the
+        # readings plus the slots left empty by fair evictions
+        self.slots = self.capacity * 2 if policy == 'fair' else self.capacity
+        self.items = [None] * self.slots
+        self.stamps = [0.0] * self.slots
+        self.head = 0
+        self.size = 0
+        self.used = 0
+        self.evicted = 0
+        # Fair policy: slots of each device's queued readings, oldest first,
+        # devices by number of queued readings, and the highest such number
+        self.device_slots = {}
+        self.devices_by_count = {}
+        self.heaviest = 0
+        
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.all_tasks_done = threading.Condition(self.lock)
+        self.unfinished = 0
+        
+        # Statistics
+        self.put_count = 0
+        self.get_count = 0
+        self.dropped = dict.fromkeys(('timeout', 'oldest', 'newest', 'fair'), 0)
+        self.high_water = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        
+    @property
+    def dropped_count(self):
+        return sum(self.dropped.values())
+        
+    def put(self, item, block=True, timeout=None):
+        """Enqueue a reading; returns False if the overload policy dropped it"""
+        with self.lock:
+            if self.size >= self.capacity:
+                if self.policy == 'block':
+                    if timeout is None:
+                        timeout = self.block_timeout
+                    if not block or not self.not_full.wait_for(lambda: self.size < self.capacity, timeout):
+                        self.dropped['timeout'] += 1
+                        return False
+                elif self.policy == 'drop-newest':
+                    self.dropped['newest'] += 1
+                    return False
+                elif self.policy == 'drop-oldest':
+                    self.drop_oldest()
+                    self.dropped['oldest'] += 1
+                elif not self.make_fair_room(item['device_id']):
+                    self.dropped['fair'] += 1
+                    return False
+            
+            if self.used == self.slots:
+                self.compact()
+            slot = (self.head + self.used) % self.slots
+            self.items[slot] = item
+            self.stamps[slot] = time.monotonic()
+            self.size += 1
+            self.used += 1
+            self.unfinished += 1
+            self.put_count += 1
+            if self.policy == 'fair':
+                self.track(item['device_id'], slot)
+            if self.size > self.high_water:
+                self.high_water = self.size
+            if self.recorder is not None:
+                self.unrecorded.append(item)
+            if self.size == 1:
+                self.not_empty.notify()
+        if self.recorder is not None:
+            self.record_pending()
+        return True
+            
+    def put_nowait(self, item):
+        return self.put(item, block=False)
+        
+    def record_pending(self):
+        """Record the accepted readings not yet recorded, oldest first; by the time
+        it returns the caller's reading is recorded, here or by another producer"""
+        with self.record_lock:
+            while self.unrecorded:
+                self.recorder.record(self.unrecorded.popleft())
+        
+    def make_fair_room(self, device_id):
+        """Evict for a reading of device_id if it is under its share; False if it must be dropped"""
+        device_slots = self.device_slots
+        share = self.capacity // (len(device_slots) + (device_id not in device_slots))
+        if len(device_slots.get(device_id, ())) >= share:
+            return False
+        heaviest = next(iter(self.devices_by_count[self.heaviest]))
+        slot = self.untrack(heaviest)
+        self.items[slot] = None
+        self.size -= 1
+        self.evicted += 1
+        self.forget(1)
+        return True
+        
+    def drop_oldest(self):
+        """Drop the reading at the head (no slot is left empty without the fair policy)"""
+        self.items[self.head] = None
+        self.head = (self.head + 1) % self.slots
+        self.size -= 1
+        self.used -= 1
+        self.forget(1)
+        
+    def forget(self, count):
+        # Dropped readings will never be processed
+        self.unfinished -= count
+        if self.unfinished == 0:
+            self.all_tasks_done.notify_all()
+            
+    def track(self, device_id, slot):
+        """Add a queued reading of device_id at slot to the fair policy's books"""
+        slots = self.device_slots.get(device_id)
+        if slots is None:
+            slots = self.device_slots[device_id] = deque()
+        else:
+            devices = self.devices_by_count[len(slots)]
+            del devices[device_id]
+            if not devices:
+                del self.devices_by_count[len(slots)]
+        slots.append(slot)
+        count = len(slots)
+        self.devices_by_count.setdefault(count, {})[device_id] = None
+        if count > self.heaviest:
+            self.heaviest = count
+            
+    def untrack(self, device_id):
+        """Take the oldest queued reading of device_id off the books; returns its slot"""
+        slots = self.device_slots[device_id]
+        count = len(slots)
+        devices = self.devices_by_count[count]
+        del devices[device_id]
+        if not devices:
+            del self.devices_by_count[count]
+            if count == self.heaviest:
+                self.heaviest -= 1
+        slot = slots.popleft()
+        if slots:
+            self.devices_by_count.setdefault(count - 1, {})[device_id] = None
+        else:
+            del self.device_slots[device_id]
+        return slot
+        
+    def compact(self):
+        """Close the slots left empty by evictions, moving the readings to the front"""
+        order = [(self.head + i) % self.slots for i in range(self.used)]
+        kept = [i for i in order if self.items[i] is not None]
+        items = [self.items[i] for i in kept]
+        stamps = [self.stamps[i] for i in kept]
+        padding = self.slots - len(kept)
+        self.items = items + [None] * padding
+        self.stamps = stamps + [0.0] * padding
+        self.head = 0
+        self.used = len(kept)
+        self.evicted = 0
+        # Device counts are unchanged, only their slots move
+        for slots in self.device_slots.values():
+            slots.clear()
+        for slot, item in enumerate(items):
+            self.device_slots[item['device_id']].append(slot)
+            
+    def get_many(self, max_items, block=True, timeout=None):
+        """Dequeue up to max_items readings, oldest first; waits (up to timeout) for the first"""
+        with self.lock:
+            if not self.size:
+                if not block or not self.not_empty.wait_for(lambda: self.size, timeout):
+                    raise queue.Empty
+            count = min(max_items, self.size)
+            head, slots = self.head, self.slots
+            if self.evicted:
+                batch, stamps = self.take_skipping_evicted(count)
+            else:
+                end = head + count
+                if end <= slots:
+                    batch = self.items[head:end]
+                    stamps = self.stamps[head:end]
+                    self.items[head:end] = [None] * count
+                else:
+                    end -= slots
+                    batch = self.items[head:] + self.items[:end]
+                    stamps = self.stamps[head:] + self.stamps[:end]
+                    self.items[head:] = [None] * (slots - head)
+                    self.items[:end] = [None] * end
+                self.head = end % slots
+                self.used -= count
+            self.size -= count
+            self.get_count += count
+            if self.policy == 'fair':
+                for data in batch:
+                    self.untrack(data['device_id'])
+            
+            # Stamps are in enqueue order, so the first reading waited longest
+            now = time.monotonic()
+            self.latency_total += now * count - sum(stamps)
+            if now - stamps[0] > self.latency_max:
+                self.latency_max = now - stamps[0]
+            if self.policy == 'block':
+                # Producers only wait under the block policy
+                self.not_full.notify(count)
+        if self.stage_metrics is not None:
+            self.stage_metrics.record('queue', [now - stamp for stamp in stamps])
+            self.stage_metrics.record('enqueue', [stamp - data['generated_at']
+                                                  for data, stamp in zip(batch, stamps) if 'generated_at' in data])
+        return batch
+            
+    def take_skipping_evicted(self, count):
+        """Take count readings from the head, passing over evicted slots"""
+        items, slots = self.items, self.slots
+        batch, stamps = [], []
+        while len(batch) < count:
+            item = items[self.head]
+            if item is None:
+                self.evicted -= 1
+            else:
+                batch.append(item)
+                stamps.append(self.stamps[self.head])
+                items[self.head] = None
+            self.head = (self.head + 1) % slots
+            self.used -= 1
+        if self.size == count:
+            # Whatever is left are evicted slots
+            self.used = self.evicted = 0
+        return batch, stamps
+        
+    def get(self, block=True, timeout=None):
+        return self.get_many(1, block, timeout)[0]
+        
+    def get_nowait(self):
+        return self.get(block=False)
+        
+    def task_done(self, count=1):
+        """Mark count dequeued readings as processed"""
+        with self.lock:
+            self.unfinished -= count
+            if self.unfinished <= 0:
+                self.unfinished = 0
+                self.all_tasks_done.notify_all()
+                
+    def join(self):
+        """Wait until every accepted reading has been processed or dropped"""
+        with self.lock:
+            self.all_tasks_done.wait_for(lambda: self.unfinished == 0)
+            
+    def qsize(self):
+        return self.size
+        
+    def empty(self):
+        return not self.size
+        
+    def full(self):
+        return self.size >= self.capacity
+        
+    def metrics(self):
+        """Counters as a dict: throughput, drops by cause, depth and queueing latency"""
+        return {
+            'policy': self.policy,
+            'capacity': self.capacity,
+            'depth': self.size,
+            'high_water': self.high_water,
+            'put': self.put_count,
+            'got': self.get_count,
+            'dropped': dict(self.dropped),
+            'latency_avg': self.latency_total / self.get_count if self.get_count else 0.0,
+            'latency_max': self.latency_max,
+        }
+        
+    def summary(self):
+        """One-line overload report"""
+        m = self.metrics()
+        causes = ", ".join(f"{cause} {count}" for cause, count in m['dropped'].items() if count)
+        return (f"Queue ({m['policy']}): {m['put']} in, {m['got']} out, "
+                f"{self.dropped_count} dropped{f' ({causes})' if causes else ''}, "
+                f"high-water {m['high_water']}/{m['capacity']}, latency avg "
+                f"{m['latency_avg'] * 1000:.1f} ms, max {m['latency_max'] * 1000:.1f} ms")
+
+class DataProcessor(threading.Thread):
+    def __init__(self, data_queue, storage, batch_size=1, alert_sink=None, alert_manager=None,
+                 rules=None, stats_window=60.0, anomaly_detector=None, live_state=None, metrics=None,
+                 load=None):
+        super().__init__()
+        self.data_queue = data_queue
+        self.storage = storage
+        self.running = True
+        self.processed_count = 0
+        self.daemon = True
+        # Readings pulled from the queue and classified together per iteration
+        self.batch_size = batch_size
+        
+        # Compiled thresholds, swapped for a new version when the config file changes
+        self.rules = rules or ThresholdRules()
+        self.rules_checked = time.monotonic()
+        
+        # Rolling per-device statistics, published periodically for the dashboard
+        # and reports; updated after classification, so rules never see them
+        self.stats = RollingStats(window=stats_window)
+        self.stats_published = time.monotonic()
+        
+        # Ensure logs directory exists
+        os.makedirs('logs', exist_ok=True)
+        
+        # Alert output happens on a background sink, not the processing thread
+        self.alert_sink = alert_sink or AlertSink()
+        # Optional AlertManager; without one every non-Good reading is logged
+        self.alert_manager = alert_manager
+        # Optional AnomalyDetector flagging readings that drift from their baseline
+        self.anomaly_detector = anomaly_detector
+        # Counters and latest readings served to dashboards
+        self.live_state = live_state or LiveState()
+        # Optional PipelineMetrics; each batch adds its dequeued -> handled latency
+        self.metrics = metrics
+        # Optional BatchLoad (sensor simulator); when set, readings arrive from it
+        # as column batches through process_batch instead of from the queue
+        self.load = load
+        
+    def analyze_data(self, data):
+        """Analyze sensor data and determine status"""
+        flags = self.rules.flags(data)
+        return STATUSES[status_code_for(flags)], ALERT_TYPES[flags]
+    
+    def check_rules(self):
+        """Pick up threshold config changes between batches, so no queued reading is lost"""
+        now = time.monotonic()
+        if now - self.rules_checked >= RULES_RELOAD_INTERVAL:
+            self.rules_checked = now
+            self.rules = self.rules.reloaded()
+            
+    def publish_stats(self, force=False):
+        """Publish the rolling statistics every STATS_PUBLISH_INTERVAL seconds"""
+        now = time.monotonic()
+        if force or now - self.stats_published >= STATS_PUBLISH_INTERVAL:
+            self.stats_published = now
+            self.stats.publish()
+        
+    def analyze_batch(self, batch):
+        """Classify a list of readings at once, returning (status codes, alert bitmasks)"""
+        if np is None or len(batch) == 1:
+            flags = [self.rules.flags(data) for data in batch]
+            return [status_code_for(f) for f in flags], flags
+        
+        temperature, vibration, voltage = [
+            np.fromiter(map(operator.itemgetter(key), batch), np.float64, len(batch))
+            for key, _, _, _ in ALERT_BITS
+        ]
+        device_ids = list(map(operator.itemgetter('device_id'), batch))
+        return self.analyze_columns(temperature, vibration, voltage, device_ids)
+        
+    def analyze_columns(self, temperature, vibration, voltage, device_ids=None):
+        """Classify equally long NumPy columns, returning (status codes, alert bitmasks)"""
+        flags = self.rules.flag_columns(temperature, vibration, voltage, device_ids)
+        codes = np.where(flags & CRITICAL_BITS, 2, np.where(flags & WARNING_BITS, 1, 0))
+        return codes.tolist(), flags.tolist()
+        
+    def next_batch(self):
+        """Wait for one reading, then take whatever else is queued up to batch_size"""
+        if isinstance(self.data_queue, ReadingQueue):
+            return self.data_queue.get_many(self.batch_size, timeout=1)
+        batch = [self.data_queue.get(timeout=1)]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.data_queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+        
+    def process_batch(self, batch, columns=None):
+        """Analyze, log and store a list of readings; columns (e.g. from a
+        BatchGenerator) lets classification skip reading values out of the dicts"""
+        if columns is not None and np is not None:
+            codes, flags = self.analyze_columns(
+                columns['temperature'], columns['vibration'], columns['voltage'],
+                columns.get('device_id')
+            )
+        else:
+            codes, flags = self.analyze_batch(batch)
+        for data, code, alert_flags in zip(batch, codes, flags):
+            self.handle(data, STATUSES[code], ALERT_TYPES[alert_flags])
+        
+    def handle(self, data, status, alert_type):
+        """Log, store and account for one analyzed reading"""
+        if self.anomaly_detector is not None:
+            status, alert_type = self.anomaly_detector.classify(data, status, alert_type)
+        
+        # Add processing results to data
+        data['status'] = status
+        data['alert_type'] = alert_type
+        self.stats.record(data)
+        self.live_state.record(data)
+        
+        # Log alerts if needed
+        if self.alert_manager is not None:
+            self.alert_manager.process(data, status, self.rules, self.log_alert, self.log_summary)
+        elif status != "Good":
+            self.log_alert(data, status, alert_type)
+        
+        # Store in database
+        self.storage.store_sensor_data(data)
+        
+        # Update device health
+        error_increment = 1 if status == "Critical" else 0
+        self.storage.update_device_health(
+            data['device_id'], 
+            status, 
+            packets_increment=1,
+            error_increment=error_increment,
+            device_name=data.get('device_name')
+        )
+        
+        self.processed_count += 1
+        
+        # Print progress every 10 processed items
+        if self.processed_count % 10 == 0:
+            print(f"Total packets processed: {self.processed_count}")
+    
+    def log_alert(self, data, status, alert_type):
+        """Hand an alert to the alert sink for the log files and console"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        log_entry = f"[{timestamp}] {data['device_id']} - {alert_type}: "
+        log_entry += f"Temp={data['temperature']}°C, Vib={data['vibration']}, Volt={data['voltage']}V"
+        
+        # Console line with colors
+        if status == "Critical":
+            console = f"\033[91m CRITICAL: {log_entry}\033[0m"  # Red
+        elif status == "Warning":
+            console = f"\033[93m WARNING: {log_entry}\033[0m"  # Yellow
+        elif status == "Anomaly":
+            console = f"\033[96m ANOMALY: {log_entry}\033[0m"  # Cyan
+        else:
+            return
+            
+        # Simulate email alert for critical events
+        email = self.simulate_email_alert(data, alert_type) if status == "Critical" else None
+        self.alert_sink.emit(status, log_entry, console, email, alert_record(data, status, alert_type),
+                             data.get('generated_at'))
+    
+    def log_summary(self, status, entry, record=None):
+        """Hand an AlertManager summary line to the alert sink"""
+        color = SUMMARY_COLORS[status]
+        self.alert_sink.emit(status, entry, f"{color} {status.upper()} SUMMARY: {entry}\033[0m", record=record)
+    
+    def simulate_email_alert(self, data, alert_type):
+        """Build the simulated email for a critical alert"""
+        email_content = f"""
+        {'='*60}
+         CRITICAL ALERT - Immediate Attention Required 
+        
+        Device: {data['device_id']} ({data.get('device_name', 'Unknown')})
+        Alert Type: {alert_type}
+        Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        
+        Sensor Readings:
+        - Temperature: {data['temperature']}°C
+        - Vibration: {data['vibration']}
+        - Voltage: {data['voltage']}V
+        - Message ID: {data['message_id']}
+        
+        Action Required: Please inspect the device immediately!
+        
+        ---
+        Sensor Monitoring System
+        {'='*60}
+        """
+        return f"\033[91m📧 EMAIL ALERT SIMULATED:\033[0m\n{email_content}"
+        
+    def start(self):
+        """Start the alert sink, then the processor thread"""
+        self.alert_sink.start()
+        super().start()
+        
+    def run(self):
+        """Main processing loop"""
+        print("⚙️ Data processor started and waiting for data...")
+        
+        while self.running:
+            try:
+                self.check_rules()
+                self.publish_stats()
+                if self.load is not None:
+                    started = time.monotonic()
+                    count = self.load.dispatch(self, timeout=1)
+                    if count and self.metrics is not None:
+                        self.metrics.record('analyze', [time.monotonic() - started] * count)
+                    continue
+                if self.batch_size > 1:
+                    # Batch mode: classify everything queued in one pass
+                    batch = self.next_batch()
+                    dequeued = time.monotonic()
+                    self.process_batch(batch)
+                    if self.metrics is not None:
+                        self.metrics.record('analyze', [time.monotonic() - dequeued] * len(batch))
+                    for _ in batch:
+                        self.data_queue.task_done()
+                    continue
+                
+                # Get data from queue with timeout
+                data = self.data_queue.get(timeout=1)
+                dequeued = time.monotonic()
+                
+                # Process the data
+                status, alert_type = self.analyze_data(data)
+                self.handle(data, status, alert_type)
+                if self.metrics is not None:
+                    self.metrics.record('analyze', [time.monotonic() - dequeued])
+                self.data_queue.task_done()
+                
+            except queue.Empty:
+                # Nothing arrived within the timeout - this is normal, but
+                # summaries that came due meanwhile must not wait for the next reading
+                if self.alert_manager is not None:
+                    self.alert_manager.sweep(self.log_summary)
+                continue
+            except Exception as e:
+                print(f" Processing error: {e}")
+                time.sleep(0.1)
+                
+    def stop(self):
+        """Stop the processor thread and flush readings still buffered in storage"""
+        self.running = False
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=2)
+        self.storage.flush()
+        if self.stats.slots:
+            self.publish_stats(force=True)
+        if self.alert_manager is not None:
+            # Repeats still held back would otherwise be lost
+            self.alert_manager.flush(self.log_summary)
+        self.alert_sink.close()
         print(f"⏹️  Data processor stopped. Total processed: {self.processed_count}")
\ No newline at end of file
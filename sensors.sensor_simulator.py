@@ -1,86 +1,357 @@
- # sensors/sensor_simulator.py
-import threading
-import time
-import random
-import json
-from datetime import datetime
-
-class DeviceSimulator(threading.Thread):
-    def __init__(self, device_id: str, data_queue, device_name="Device"):
-        super().__init__()
-        self.device_id = device_id
-        self.device_name = device_name
-        self.data_queue = data_queue
-        self.running = True
-        self.message_id = 0
-        self.daemon = True  # Thread will exit when main program exits
-        
-        # Device characteristics - different for each device
-        self.base_temp = random.uniform(25.0, 40.0)
-        self.base_vibration = random.uniform(0.5, 3.0)
-        self.base_voltage = random.uniform(210.0, 240.0)
-        
-        # Statistics
-        self.packets_sent = 0
-        
-    def generate_sensor_data(self):
-        """Generate realistic sensor readings with occasional anomalies"""
-        self.message_id += 1
-        
-        # Normal variations
-        temp_variation = random.uniform(-3.0, 3.0)
-        vibration_variation = random.uniform(-0.5, 0.5)
-        voltage_variation = random.uniform(-5.0, 5.0)
-        
-        # Occasionally add anomalies (5% chance for each sensor)
-        if random.random() < 0.05:  # 5% chance of abnormal temperature
-            temp_variation = random.uniform(20.0, 50.0)  # High temperature
-            
-        if random.random() < 0.03:  # 3% chance of high vibration
-            vibration_variation = random.uniform(5.0, 15.0)
-            
-        if random.random() < 0.02:  # 2% chance of low voltage
-            voltage_variation = random.uniform(-50.0, -30.0)
-        
-        # Create sensor data
-        sensor_data = {
-            "device_id": self.device_id,
-            "device_name": self.device_name,
-            "message_id": self.message_id,
-            "timestamp": datetime.now().isoformat(),
-            "temperature": round(self.base_temp + temp_variation, 2),
-            "vibration": round(max(0.1, self.base_vibration + vibration_variation), 2),
-            "voltage": round(self.base_voltage + voltage_variation, 2)
-        }
-        
-        return sensor_data
-    
-    def run(self):
-        """Main thread loop - generates data every 1-2 seconds"""
-        print(f"📡 Device {self.device_id} ({self.device_name}) started")
-        
-        while self.running:
-            try:
-                # Generate sensor data
-                sensor_data = self.generate_sensor_data()
-                
-                # Put data in queue for processing
-                self.data_queue.put(sensor_data)
-                self.packets_sent += 1
-                
-                # Print status every 5 packets
-                if self.packets_sent % 5 == 0:
-                    print(f"📤 {self.device_id}: Sent {self.packets_sent} packets")
-                
-                # Wait 1-2 seconds
-                wait_time = random.uniform(1.0, 2.0)
-                time.sleep(wait_time)
-                
-            except Exception as e:
-                print(f" Error in {self.device_id}: {e}")
-                time.sleep(1)
-    
-    def stop(self):
-        """Stop the device thread"""
-        self.running = False
-        print(f"⏹️  Device {self.device_id} stopped. Total packets: {self.packets_sent}")
\ No newline at end of file
+ # sensors/sensor_simulator.py
+import threading
+import time
+import random
+import json
+import heapq
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    # Only BatchGenerator needs NumPy
+    np = None
+
+# Chance per reading of an anomalous value for each sensor
+DEFAULT_ANOMALY_RATES = {'temperature': 0.05, 'vibration': 0.03, 'voltage': 0.02}
+
+class SensorModel:
+    """One device's characteristics and reading generator, without a thread of its own"""
+    def __init__(self, device_id, device_name="Device", anomaly_rates=None):
+        self.device_id = device_id
+        self.device_name = device_name
+        self.message_id = 0
+        self.anomaly_rates = dict(DEFAULT_ANOMALY_RATES, **(anomaly_rates or {}))
+        
+        # Device characteristics - different for each device
+        self.base_temp = random.uniform(25.0, 40.0)
+        self.base_vibration = random.uniform(0.5, 3.0)
+        self.base_voltage = random.uniform(210.0, 240.0)
+        
+    def generate_sensor_data(self):
+        """Generate realistic sensor readings with occasional anomalies"""
+        self.message_id += 1
+        
+        # Normal variations
+        temp_variation = random.uniform(-3.0, 3.0)
+        vibration_variation = random.uniform(-0.5, 0.5)
+        voltage_variation = random.uniform(-5.0, 5.0)
+        
+        # Occasionally add anomalies (by default 5% / 3% / 2% per sensor)
+        if random.random() < self.anomaly_rates['temperature']:
+            temp_variation = random.uniform(20.0, 50.0)  # High temperature
+            
+        if random.random() < self.anomaly_rates['vibration']:
+            vibration_variation = random.uniform(5.0, 15.0)
+            
+        if random.random() < self.anomaly_rates['voltage']:
+            voltage_variation = random.uniform(-50.0, -30.0)
+        
+        # Create sensor data
+        sensor_data = {
+            "device_id": self.device_id,
+            "device_name": self.device_name,
+            "message_id": self.message_id,
+            "timestamp": datetime.now().isoformat(),
+            "temperature": round(self.base_temp + temp_variation, 2),
+            "vibration": round(max(0.1, self.base_vibration + vibration_variation), 2),
+            "voltage": round(self.base_voltage + voltage_variation, 2),
+            # Monotonic stamp for the pipeline latency metrics; not stored
+            "generated_at": time.monotonic()
+        }
+        
+        return sensor_data
+
+class DeviceSimulator(SensorModel, threading.Thread):
+    def __init__(self, device_id: str, data_queue, device_name="Device", anomaly_rates=None):
+        threading.Thread.__init__(self)
+        SensorModel.__init__(self, device_id, device_name, anomaly_rates)
+        self.data_queue = data_queue
+        self.running = True
+        self.daemon = True  # Thread will exit when main program exits
+        
+        # Statistics
+        self.packets_sent = 0
+        
+    def run(self):
+        """Main thread loop - generates data every 1-2 seconds"""
+        print(f"📡 Device {self.device_id} ({self.device_name}) started")
+        
+        while self.running:
+            try:
+                # Generate sensor data
+                sensor_data = self.generate_sensor_data()
+                
+                # Put data in queue for processing
+                self.data_queue.put(sensor_data)
+                self.packets_sent += 1
+                
+                # Print status every 5 packets
+                if self.packets_sent % 5 == 0:
+                    print(f"📤 {self.device_id}: Sent {self.packets_sent} packets")
+                
+                # Wait 1-2 seconds
+                wait_time = random.uniform(1.0, 2.0)
+                time.sleep(wait_time)
+                
+            except Exception as e:
+                print(f" Error in {self.device_id}: {e}")
+                time.sleep(1)
+    
+    def stop(self):
+        """Stop the device thread"""
+        self.running = False
+        print(f"⏹️  Device {self.device_id} stopped. Total packets: {self.packets_sent}")
+
+class EmitterThread(threading.Thread):
+    """Emits readings for a slice of virtual devices on a shared schedule"""
+    def __init__(self, devices, intervals, data_queue, jitter=0.1):
+        super().__init__()
+        self.devices = devices
+        self.intervals = intervals
+        self.data_queue = data_queue
+        self.jitter = jitter
+        self.running = True
+        self.daemon = True
+        
+        # Statistics
+        self.packets_sent = 0
+        self.max_lag = 0.0
+        
+    def run(self):
+        """Pop the next due device, wait for its slot, emit and reschedule it"""
+        # Spread first emissions over one interval so devices do not fire together
+        start = time.monotonic()
+        schedule = [(start + random.uniform(0, interval), i) for i, interval in enumerate(self.intervals)]
+        heapq.heapify(schedule)
+        
+        while self.running and schedule:
+            due, i = schedule[0]
+            wait = due - time.monotonic()
+            if wait > 0:
+                # Short sleeps keep stop() responsive on slow schedules
+                time.sleep(min(wait, 0.1))
+                continue
+            self.max_lag = max(self.max_lag, -wait)
+            
+            try:
+                self.data_queue.put(self.devices[i].generate_sensor_data())
+                self.packets_sent += 1
+            except Exception as e:
+                print(f" Error in {self.devices[i].device_id}: {e}")
+                
+            # Next slot follows the timeline, not the send time, so a
+            # blocked queue is caught up on rather than lowering the rate
+            interval = self.intervals[i]
+            heapq.heapreplace(schedule, (due + interval * random.uniform(1 - self.jitter, 1 + self.jitter), i))
+            
+    def stop(self):
+        self.running = False
+
+class LoadGenerator:
+    """Drives many virtual devices from a few emitter threads"""
+    def __init__(self, data_queue, devices=1000, rate=1.0, threads=2, anomaly_rates=None,
+                 jitter=0.1, prefix="DEV"):
+        # rate is readings per second per device: one number, or one per device
+        rates = list(rate) if isinstance(rate, (list, tuple)) else [rate] * devices
+        if len(rates) != devices:
+            raise ValueError(f"Expected {devices} device rates, got {len(rates)}")
+        self.devices = [
+            SensorModel(f"{prefix}{i + 1:04d}", f"Virtual Device {i + 1}", anomaly_rates)
+            for i in range(devices)
+        ]
+        
+        # Device i is emitted by thread i % threads
+        threads = max(1, min(threads, devices))
+        self.emitters = [
+            EmitterThread(self.devices[t::threads], [1.0 / r for r in rates[t::threads]],
+                          data_queue, jitter)
+            for t in range(threads)
+        ]
+        
+    @property
+    def packets_sent(self):
+        return sum(emitter.packets_sent for emitter in self.emitters)
+        
+    @property
+    def max_lag(self):
+        """Worst delay (seconds) between a scheduled slot and its emission"""
+        return max(emitter.max_lag for emitter in self.emitters)
+        
+    def start(self):
+        """Start all emitter threads"""
+        for emitter in self.emitters:
+            emitter.start()
+        print(f"📡 Load generator started: {len(self.devices)} devices on {len(self.emitters)} threads")
+        
+    def stop(self):
+        """Stop the emitter threads"""
+        for emitter in self.emitters:
+            emitter.stop()
+        for emitter in self.emitters:
+            if emitter.is_alive():
+                emitter.join(timeout=1)
+        print(f"⏹️  Load generator stopped. Total packets: {self.packets_sent}, "
+              f"max lag: {self.max_lag:.3f}s")
+
+# BatchGenerator timestamps are microseconds since this naive epoch, so
+# they read as the same local wall time as generate_sensor_data's
+EPOCH = datetime(1970, 1, 1)
+
+# Bits of the BatchGenerator 'anomalies' column
+ANOMALY_BITS = {'temperature': 0x01, 'vibration': 0x02, 'voltage': 0x04}
+
+class BatchGenerator:
+    """Generates readings for many devices at once as NumPy columns (seeded, reproducible)"""
+    def __init__(self, devices=1000, anomaly_rates=None, seed=None, prefix="DEV", interval=(1.0, 2.0)):
+        if np is None:
+            raise RuntimeError("BatchGenerator requires numpy")
+        self.rng = np.random.default_rng(seed)
+        self.anomaly_rates = dict(DEFAULT_ANOMALY_RATES, **(anomaly_rates or {}))
+        # Seconds between two readings of a device, like DeviceSimulator's sleep
+        self.interval = interval
+        self.device_ids = np.array([f"{prefix}{i + 1:04d}" for i in range(devices)], dtype=object)
+        self.device_names = np.array([f"Virtual Device {i + 1}" for i in range(devices)], dtype=object)
+        
+        # Device characteristics, same ranges as SensorModel
+        self.base_temp = self.rng.uniform(25.0, 40.0, devices)
+        self.base_vibration = self.rng.uniform(0.5, 3.0, devices)
+        self.base_voltage = self.rng.uniform(210.0, 240.0, devices)
+        self.message_ids = np.zeros(devices, dtype=np.int64)
+        # Per-device clock in epoch microseconds, continued across batches
+        self.clock = None
+        
+    def anomaly(self, shape, sensor, low, high):
+        """Return (mask, values): where mask is set a sensor reading is anomalous"""
+        mask = self.rng.random(shape) < self.anomaly_rates[sensor]
+        return mask, self.rng.uniform(low, high, shape)
+        
+    def generate(self, count, start=None):
+        """Generate count readings for every device, as columns sorted by timestamp.
+        
+        Each device's clock continues after its last reading; start (a naive
+        local datetime) restarts every clock there, the first call starts now.
+        """
+        if count < 1:
+            raise ValueError(f"count must be at least 1, got {count}")
+        devices = len(self.device_ids)
+        shape = (count, devices)
+        if self.clock is None or start is not None:
+            start = datetime.now() if start is None else start
+            self.clock = np.full(devices, (start - EPOCH) // timedelta(microseconds=1), dtype=np.int64)
+        
+        # Readings of one device are interval apart, starting after its last one
+        low, high = self.interval
+        steps = self.rng.uniform(low * 1_000_000, high * 1_000_000, shape).astype(np.int64)
+        timestamps = self.clock + np.cumsum(steps, axis=0)
+        self.clock = timestamps[-1]
+        message_ids = self.message_ids + np.arange(1, count + 1)[:, None]
+        self.message_ids = message_ids[-1]
+        
+        # Normal variations, replaced by an anomaly with the configured probability
+        temp_variation = self.rng.uniform(-3.0, 3.0, shape)
+        vibration_variation = self.rng.uniform(-0.5, 0.5, shape)
+        voltage_variation = self.rng.uniform(-5.0, 5.0, shape)
+        anomalies = np.zeros(shape, dtype=np.uint8)
+        for sensor, variation, low, high in (
+            ('temperature', temp_variation, 20.0, 50.0),
+            ('vibration', vibration_variation, 5.0, 15.0),
+            ('voltage', voltage_variation, -50.0, -30.0),
+        ):
+            mask, values = self.anomaly(shape, sensor, low, high)
+            np.copyto(variation, values, where=mask)
+            anomalies |= mask.astype(np.uint8) * ANOMALY_BITS[sensor]
+        
+        # Interleave devices by time; each device's readings stay in message_id order
+        order = np.argsort(timestamps, axis=None, kind='stable')
+        device_index = np.broadcast_to(np.arange(devices), shape).ravel()[order]
+        return {
+            'device_id': self.device_ids[device_index],
+            'device_name': self.device_names[device_index],
+            'message_id': message_ids.ravel()[order],
+            'timestamp': timestamps.ravel()[order].astype('datetime64[us]'),
+            'temperature': np.round(self.base_temp + temp_variation, 2).ravel()[order],
+            'vibration': np.round(np.maximum(0.1, self.base_vibration + vibration_variation), 2).ravel()[order],
+            'voltage': np.round(self.base_voltage + voltage_variation, 2).ravel()[order],
+            'anomalies': anomalies.ravel()[order],
+        }
+        
+    @staticmethod
+    def rows(columns):
+        """Turn a column batch into generate_sensor_data payload dicts"""
+        # Format each distinct second once; datetime_as_string per reading is slow
+        seconds, micros = np.divmod(columns['timestamp'].astype(np.int64), 1_000_000)
+        unique, index = np.unique(seconds, return_inverse=True)
+        prefixes = np.datetime_as_string(unique.astype('datetime64[s]')).tolist()
+        timestamps = [f"{prefixes[i]}.{us:06d}" for i, us in zip(index.tolist(), micros.tolist())]
+        # The whole batch is generated at once
+        generated_at = time.monotonic()
+        return [
+            {
+                "device_id": device_id,
+                "device_name": device_name,
+                "message_id": message_id,
+                "timestamp": timestamp,
+                "temperature": temperature,
+                "vibration": vibration,
+                "voltage": voltage,
+                "generated_at": generated_at
+            }
+            for device_id, device_name, message_id, timestamp, temperature, vibration, voltage in zip(
+                columns['device_id'].tolist(), columns['device_name'].tolist(),
+                columns['message_id'].tolist(), timestamps, columns['temperature'].tolist(),
+                columns['vibration'].tolist(), columns['voltage'].tolist()
+            )
+        ]
+        
+    def feed(self, data_queue, count, start=None):
+        """Generate count readings per device and put them on a data queue"""
+        for row in self.rows(self.generate(count, start)):
+            data_queue.put(row)
+            
+    def dispatch(self, processor, count, start=None):
+        """Generate a batch and hand its columns straight to a batch-aware DataProcessor"""
+        columns = self.generate(count, start)
+        processor.process_batch(self.rows(columns), columns)
+
+# Largest batch BatchLoad hands over at once, in readings; a processor that
+# falls behind catches up over several batches
+BATCH_LOAD_MAX_ROWS = 65536
+
+class BatchLoad:
+    """Paces a BatchGenerator at rate readings per second per device for the processor thread.
+    
+    Nothing runs on its own: the processor calls dispatch, which hands the
+    readings due by now to it as one column batch.
+    """
+    def __init__(self, devices=1000, rate=1.0, anomaly_rates=None, jitter=0.1, seed=None, prefix="DEV"):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        interval = 1.0 / rate
+        self.generator = BatchGenerator(devices, anomaly_rates, seed, prefix,
+                                        (interval * (1 - jitter), interval * (1 + jitter)))
+        self.devices = devices
+        self.max_count = max(1, BATCH_LOAD_MAX_ROWS // devices)
+        self.started = None
+        # Readings generated per device so far
+        self.generated = 0
+        
+        # Statistics
+        self.packets_sent = 0
+        
+    def dispatch(self, processor, timeout=1.0):
+        """Hand the readings due by now to processor.process_batch, waiting up to timeout
+        for the next ones; returns the number of readings dispatched"""
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        due = int((now - self.started) * self.rate) + 1 - self.generated
+        if due < 1:
+            time.sleep(min(timeout, (self.generated / self.rate) - (now - self.started)))
+            return 0
+        count = min(due, self.max_count)
+        self.generator.dispatch(processor, count)
+        self.generated += count
+        self.packets_sent += count * self.devices
+        return count * self.devices
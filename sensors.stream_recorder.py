@@ -0,0 +1,181 @@
+ # sensors/stream_recorder.py
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+
+# File layout: MAGIC, then records. Each record starts with a one byte type:
+#   b'D' device:  index (uint32), id and name as uint16-length-prefixed UTF-8
+#   b'R' reading: arrival offset in seconds (double), device index (uint32),
+#                 message_id (int64), timestamp in epoch microseconds (int64),
+#                 temperature, vibration, voltage (doubles)
+# Values are stored as doubles so replayed readings are bit-for-bit identical.
+MAGIC = b"SSTREAM1"
+DEVICE = struct.Struct("<cI")
+LENGTH = struct.Struct("<H")
+READING = struct.Struct("<cdIqqddd")
+EPOCH = datetime(1970, 1, 1)
+
+def to_epoch_us(timestamp):
+    """Naive ISO timestamp -> integer microseconds since the epoch"""
+    return (datetime.fromisoformat(timestamp) - EPOCH) // timedelta(microseconds=1)
+
+def from_epoch_us(micros):
+    """Integer microseconds since the epoch -> ISO timestamp as produced by isoformat()"""
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+class StreamRecorder:
+    """Appends every reading put on the data queue to a compact binary file"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.device_index = {}
+        self.recorded_count = 0
+        
+        # Offsets continue after the last reading of an earlier session
+        self.offset_base = 0.0
+        
+        # Append-only; a new file starts with the magic header
+        existing = os.path.exists(path) and os.path.getsize(path) > 0
+        if existing:
+            # Keep the device numbering of the earlier sessions
+            replayer = StreamReplayer(path)
+            for kind, fields in replayer.records():
+                if kind == 'D':
+                    self.device_index[fields[1]] = fields[0]
+                else:
+                    self.offset_base = fields[0]
+            # Drop a record cut off by a crash so appended records stay readable
+            with open(path, "r+b") as f:
+                f.truncate(replayer.valid_end)
+        self.file = open(path, "ab")
+        if not existing:
+            self.file.write(MAGIC)
+        self.start = time.monotonic()
+    
+    def record(self, data):
+        """Append one reading"""
+        with self.lock:
+            index = self.device_index.get(data['device_id'])
+            if index is None:
+                index = self.device_index[data['device_id']] = len(self.device_index)
+                self.file.write(DEVICE.pack(b'D', index))
+                for text in (data['device_id'], data.get('device_name', 'Unknown')):
+                    encoded = text.encode('utf-8')
+                    self.file.write(LENGTH.pack(len(encoded)) + encoded)
+            self.file.write(READING.pack(
+                b'R',
+                self.offset_base + time.monotonic() - self.start,
+                index,
+                data['message_id'],
+                to_epoch_us(data['timestamp']),
+                data['temperature'],
+                data['vibration'],
+                data['voltage']
+            ))
+            self.recorded_count += 1
+    
+    def close(self):
+        """Flush and close the recording"""
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+        print(f" Recorded {self.recorded_count} readings to {self.path}")
+
+class StreamReplayer:
+    """Reads a recording back as (arrival offset, reading) pairs"""
+    def __init__(self, path):
+        self.path = path
+        # File position after the last complete record read
+        self.valid_end = len(MAGIC)
+    
+    def records(self):
+        """Yield ('D', (index, device_id, name)) and ('R', fields) records; stops at a truncated tail"""
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a sensor stream recording")
+            while True:
+                kind = f.read(1)
+                if kind == b'R':
+                    chunk = f.read(READING.size - 1)
+                    if len(chunk) < READING.size - 1:
+                        return
+                    self.valid_end = f.tell()
+                    yield 'R', READING.unpack(kind + chunk)[1:]
+                elif kind == b'D':
+                    chunk = f.read(DEVICE.size - 1)
+                    if len(chunk) < DEVICE.size - 1:
+                        return
+                    index = DEVICE.unpack(kind + chunk)[1]
+                    texts = []
+                    for _ in range(2):
+                        length = f.read(LENGTH.size)
+                        if len(length) < LENGTH.size:
+                            return
+                        size = LENGTH.unpack(length)[0]
+                        text = f.read(size)
+                        if len(text) < size:
+                            return
+                        texts.append(text.decode('utf-8'))
+                    self.valid_end = f.tell()
+                    yield 'D', (index, *texts)
+                else:
+                    # End of file, or a record cut off by a crash
+                    return
+    
+    def readings(self):
+        """Yield (arrival offset, reading) in recorded order, with the generate_sensor_data shape"""
+        devices = {}
+        for kind, fields in self.records():
+            if kind == 'D':
+                devices[fields[0]] = fields[1:]
+                continue
+            offset, index, message_id, micros, temperature, vibration, voltage = fields
+            device_id, device_name = devices[index]
+            yield offset, {
+                "device_id": device_id,
+                "device_name": device_name,
+                "message_id": message_id,
+                "timestamp": from_epoch_us(micros),
+                "temperature": temperature,
+                "vibration": vibration,
+                "voltage": voltage
+            }
+
+class ReplayThread(threading.Thread):
+    """Feeds a recording into a data queue at original timing (speed) or as fast as possible"""
+    def __init__(self, path, data_queue, speed=1.0):
+        super().__init__()
+        self.replayer = StreamReplayer(path)
+        self.data_queue = data_queue
+        # speed 1.0 replays at recorded timing, 2.0 twice as fast, 0 as fast as possible
+        self.speed = speed
+        self.running = True
+        self.daemon = True
+        
+        # Statistics
+        self.packets_sent = 0
+        self.elapsed = 0.0
+    
+    def run(self):
+        print(f"▶️  Replaying {self.replayer.path}")
+        start = time.monotonic()
+        first = None
+        for offset, data in self.replayer.readings():
+            if not self.running:
+                break
+            if self.speed > 0:
+                first = offset if first is None else first
+                wait = (offset - first) / self.speed - (time.monotonic() - start)
+                if wait > 0:
+                    time.sleep(wait)
+            # Replayed readings are generated when they are fed in again
+            data['generated_at'] = time.monotonic()
+            self.data_queue.put(data)
+            self.packets_sent += 1
+        self.elapsed = time.monotonic() - start
+        print(f"⏹️  Replay finished: {self.packets_sent} readings in {self.elapsed:.2f}s")
+    
+    def stop(self):
+        self.running = False
@@ -1,154 +1,1527 @@
- # storage/database.py
-import sqlite3
-import json
-from datetime import datetime
-import os
-
-class DataStorage:
-    def __init__(self, db_path="sensor_data.db"):
-        self.db_path = db_path
-        self.init_database()
-        
-    def init_database(self):
-        """Initialize SQLite database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Raw sensor data table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sensor_readings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                device_id TEXT,
-                device_name TEXT,
-                message_id INTEGER,
-                timestamp DATETIME,
-                temperature REAL,
-                vibration REAL,
-                voltage REAL,
-                status TEXT,
-                alert_type TEXT,
-                processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Device health table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS device_health (
-                device_id TEXT PRIMARY KEY,
-                device_name TEXT,
-                status TEXT DEFAULT 'Good',
-                uptime_seconds INTEGER DEFAULT 0,
-                packets_received INTEGER DEFAULT 0,
-                error_count INTEGER DEFAULT 0,
-                last_active DATETIME,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        print(f" Database initialized: {self.db_path}")
-        
-    def store_sensor_data(self, data):
-        """Store processed sensor data"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO sensor_readings 
-                (device_id, device_name, message_id, timestamp, temperature, 
-                 vibration, voltage, status, alert_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data['device_id'],
-                data.get('device_name', 'Unknown'),
-                data['message_id'],
-                data['timestamp'],
-                data['temperature'],
-                data['vibration'],
-                data['voltage'],
-                data.get('status', 'Good'),
-                data.get('alert_type', 'None')
-            ))
-            
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f" Database error (store_sensor_data): {e}")
-            return False
-        
-    def update_device_health(self, device_id, status, packets_increment=1, error_increment=0):
-        """Update device health metrics"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get device name if available
-            cursor.execute('SELECT device_name FROM sensor_readings WHERE device_id = ? LIMIT 1', (device_id,))
-            result = cursor.fetchone()
-            device_name = result[0] if result else device_id
-            
-            # Check if device exists in health table
-            cursor.execute('SELECT * FROM device_health WHERE device_id = ?', (device_id,))
-            exists = cursor.fetchone()
-            
-            current_time = datetime.now().isoformat()
-            
-            if exists:
-                # Update existing record
-                cursor.execute('''
-                    UPDATE device_health 
-                    SET status = ?,
-                        packets_received = packets_received + ?,
-                        error_count = error_count + ?,
-                        last_active = ?,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE device_id = ?
-                ''', (status, packets_increment, error_increment, current_time, device_id))
-            else:
-                # Insert new record
-                cursor.execute('''
-                    INSERT INTO device_health 
-                    (device_id, device_name, status, packets_received, error_count, last_active)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (device_id, device_name, status, packets_increment, error_increment, current_time))
-            
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f" Database error (update_device_health): {e}")
-            return False
-        
-    def close(self):
-        """Close database connection"""
-        # SQLite handles connections automatically
-        pass
-        
-    def get_stats(self):
-        """Get basic statistics from database"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) FROM sensor_readings')
-            total_readings = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(DISTINCT device_id) FROM sensor_readings')
-            active_devices = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM sensor_readings WHERE status != "Good"')
-            alerts_count = cursor.fetchone()[0]
-            
-            conn.close()
-            
-            return {
-                'total_readings': total_readings,
-                'active_devices': active_devices,
-                'alerts_count': alerts_count
-            }
-        except Exception as e:
-            print(f" Error getting stats: {e}")
+ # storage/database.py
+import sqlite3
+import json
+from datetime import datetime, timedelta
+import os
+import threading
+import time
+import math
+import calendar
+from urllib.parse import quote
+
+# Connection settings per durability profile. Both run the database in WAL
+# mode so dashboard readers never block the ingest writer; "strict" syncs
+# every commit, "throughput" only syncs at checkpoints.
+STORAGE_PROFILES = {
+    'strict': {
+        'synchronous': 'FULL',
+        'cache_size': -16000,          # KiB
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'checkpoint_interval': 30.0,   # seconds
+    },
+    'throughput': {
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'checkpoint_interval': 10.0,
+    }
+}
+DEFAULT_PROFILE = 'strict'
+
+def apply_pragmas(conn, profile=DEFAULT_PROFILE):
+    """Apply the connection pragmas of a storage profile"""
+    settings = STORAGE_PROFILES[profile]
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {settings['cache_size']}")
+    conn.execute(f"PRAGMA mmap_size = {settings['mmap_size']}")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+    # Checkpoints run on the WalCheckpointer thread, not inside writer commits
+    conn.execute("PRAGMA wal_autocheckpoint = 0")
+    return conn
+
+def connect_writer(db_path, profile=DEFAULT_PROFILE):
+    """Open a read-write connection tuned for the given profile"""
+    # Generous busy timeout so background index builds do not fail inserts
+    conn = sqlite3.connect(db_path, timeout=30)
+    return apply_pragmas(conn, profile)
+
+def connect_reader(db_path, profile=DEFAULT_PROFILE):
+    """Open a read-only connection that never takes the write lock"""
+    uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    settings = STORAGE_PROFILES[profile]
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA cache_size = {settings['cache_size']}")
+    conn.execute(f"PRAGMA mmap_size = {settings['mmap_size']}")
+    return conn
+
+class WalCheckpointer(threading.Thread):
+    """Background thread that checkpoints the WAL so it does not grow unbounded"""
+    def __init__(self, db_path, interval=30.0):
+        super().__init__()
+        self.db_path = db_path
+        self.interval = interval
+        self.daemon = True
+        self.stop_event = threading.Event()
+        self.checkpoints = 0
+        
+    def checkpoint(self, conn, mode="PASSIVE"):
+        """Copy committed WAL frames back into the database file"""
+        try:
+            conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            self.checkpoints += 1
+        except Exception as e:
+            print(f" Database error (wal_checkpoint): {e}")
+            
+    def run(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # PASSIVE never waits on readers or the writer
+            while not self.stop_event.wait(self.interval):
+                self.checkpoint(conn)
+            # Writer is closed by now, so the WAL can be truncated
+            self.checkpoint(conn, "TRUNCATE")
+        finally:
+            conn.close()
+            
+    def stop(self):
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout=5)
+
+# ========== ROLLUPS ==========
+# Per-device 1-minute and 1-hour aggregates, kept up to date as readings are
+# stored, so reports never have to scan raw readings.
+ROLLUP_RESOLUTIONS = {'1m': 60, '1h': 3600}
+
+# Per device and bucket: reading and status counts plus sum/min/max per metric
+ROLLUP_SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        device_id TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        readings INTEGER NOT NULL,
+        good INTEGER NOT NULL,
+        warning INTEGER NOT NULL,
+        critical INTEGER NOT NULL,
+        temp_sum REAL, temp_min REAL, temp_max REAL,
+        vib_sum REAL, vib_min REAL, vib_max REAL,
+        volt_sum REAL, volt_min REAL, volt_max REAL,
+        PRIMARY KEY (device_id, bucket)
+    ) WITHOUT ROWID
+'''
+
+# Merge freshly aggregated buckets into a rollup table
+ROLLUP_MERGE_SQL = '''
+    ON CONFLICT(device_id, bucket) DO UPDATE SET
+        readings = readings + excluded.readings,
+        good = good + excluded.good,
+        warning = warning + excluded.warning,
+        critical = critical + excluded.critical,
+        temp_sum = temp_sum + excluded.temp_sum,
+        temp_min = MIN(temp_min, excluded.temp_min),
+        temp_max = MAX(temp_max, excluded.temp_max),
+        vib_sum = vib_sum + excluded.vib_sum,
+        vib_min = MIN(vib_min, excluded.vib_min),
+        vib_max = MAX(vib_max, excluded.vib_max),
+        volt_sum = volt_sum + excluded.volt_sum,
+        volt_min = MIN(volt_min, excluded.volt_min),
+        volt_max = MAX(volt_max, excluded.volt_max)
+'''
+
+ROLLUP_COLUMNS = 15
+
+def rollup_upsert_sql(resolution):
+    """INSERT ... ON CONFLICT statement merging rows into a rollup table"""
+    placeholders = ', '.join('?' * ROLLUP_COLUMNS)
+    return f"INSERT INTO rollup_{resolution} VALUES ({placeholders})" + ROLLUP_MERGE_SQL
+
+def merge_rollup(entry, other):
+    """Merge two in-memory rollup entries (counts and sum/min/max triples)"""
+    for i in range(4):
+        entry[i] += other[i]
+    for i in range(4, 13, 3):
+        entry[i] += other[i]
+        entry[i + 1] = min(entry[i + 1], other[i + 1])
+        entry[i + 2] = max(entry[i + 2], other[i + 2])
+
+class RollupAggregator:
+    """Accumulates 1-minute and 1-hour rollups in memory between writer flushes"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (device_id, 'YYYY-MM-DDTHH:MM') -> [readings, good, warning, critical,
+        #  temp sum/min/max, vibration sum/min/max, voltage sum/min/max]
+        self.pending = {}
+        
+    def record(self, data):
+        """Add one processed reading to its device's minute bucket"""
+        # Slicing the ISO timestamp is much cheaper than parsing it per reading
+        key = (data['device_id'], data['timestamp'][:16])
+        status = data.get('status', 'Good')
+        temperature, vibration, voltage = data['temperature'], data['vibration'], data['voltage']
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is None:
+                self.pending[key] = [
+                    1, int(status == 'Good'), int(status == 'Warning'), int(status == 'Critical'),
+                    temperature, temperature, temperature,
+                    vibration, vibration, vibration,
+                    voltage, voltage, voltage
+                ]
+                return
+            entry[0] += 1
+            if status == 'Good':
+                entry[1] += 1
+            elif status == 'Warning':
+                entry[2] += 1
+            elif status == 'Critical':
+                entry[3] += 1
+            for i, value in ((4, temperature), (7, vibration), (10, voltage)):
+                entry[i] += value
+                if value < entry[i + 1]:
+                    entry[i + 1] = value
+                if value > entry[i + 2]:
+                    entry[i + 2] = value
+                    
+    def drain(self):
+        """Take the accumulated buckets as 1-minute and 1-hour upserts"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        minutes = []
+        hours = {}
+        for (device_id, minute), entry in pending.items():
+            bucket = calendar.timegm(datetime.strptime(minute.replace(' ', 'T'), "%Y-%m-%dT%H:%M").timetuple())
+            minutes.append((device_id, bucket, *entry))
+            hour_key = (device_id, bucket - bucket % 3600)
+            if hour_key in hours:
+                merge_rollup(hours[hour_key], entry)
+            else:
+                hours[hour_key] = list(entry)
+        if not minutes:
+            return []
+        return [
+            (rollup_upsert_sql('1m'), minutes),
+            (rollup_upsert_sql('1h'), [key + tuple(entry) for key, entry in hours.items()])
+        ]
+
+ROLLUP_SUMMARY_SQL = '''
+    SELECT SUM(readings), SUM(good), SUM(warning), SUM(critical),
+           SUM(temp_sum), MIN(temp_min), MAX(temp_max),
+           SUM(vib_sum), MIN(vib_min), MAX(vib_max),
+           SUM(volt_sum), MIN(volt_min), MAX(volt_max)
+    FROM ({parts})
+'''
+
+# Same summary straight from raw readings, used while rollups are still backfilling
+RAW_SUMMARY_SQL = '''
+    SELECT COUNT(*), SUM(status = 'Good'), SUM(status = 'Warning'), SUM(status = 'Critical'),
+           SUM(temperature), MIN(temperature), MAX(temperature),
+           SUM(vibration), MIN(vibration), MAX(vibration),
+           SUM(voltage), MIN(voltage), MAX(voltage)
+    FROM sensor_readings
+    WHERE {time} >= ? AND {time} < ?
+'''
+
+# summarize_range bounds covering every reading, e.g. for dashboard totals
+ALL_TIME = (0, 2 ** 53)
+
+def summarize_range(conn, start, end, device_id=None):
+    """Summarize readings with start <= ts_epoch < end from the rollups (minute resolution)"""
+    if schema_version(conn) < SCHEMA_VERSION:
+        sql = RAW_SUMMARY_SQL.format(time=EPOCH_SQL.format('timestamp'))
+        params = [start, end]
+        if device_id is not None:
+            sql += " AND device_id = ?"
+            params.append(device_id)
+    else:
+        # Whole hours come from rollup_1h, the ragged edges from rollup_1m
+        hour_start = -(-start // 3600) * 3600
+        hour_end = end - end % 3600
+        if hour_start < hour_end:
+            ranges = [('1m', start, hour_start), ('1h', hour_start, hour_end), ('1m', hour_end, end)]
+        else:
+            ranges = [('1m', start, end)]
+        parts = []
+        params = []
+        for resolution, low, high in ranges:
+            part = f"SELECT * FROM rollup_{resolution} WHERE bucket >= ? AND bucket < ?"
+            params += [low, high]
+            if device_id is not None:
+                part += " AND device_id = ?"
+                params.append(device_id)
+            parts.append(part)
+        sql = ROLLUP_SUMMARY_SQL.format(parts=" UNION ALL ".join(parts))
+    row = conn.execute(sql, params).fetchone()
+    readings = row[0] or 0
+    summary = {'readings': readings, 'good': row[1] or 0, 'warning': row[2] or 0, 'critical': row[3] or 0}
+    # Rollups have no anomaly column; anomalies are the readings left over
+    summary['anomaly'] = readings - summary['good'] - summary['warning'] - summary['critical']
+    for i, metric in ((4, 'temperature'), (7, 'vibration'), (10, 'voltage')):
+        summary[metric] = {
+            'avg': row[i] / readings if readings else None,
+            'min': row[i + 1],
+            'max': row[i + 2]
+        }
+    return summary
+
+# ========== STREAMING REPORTS ==========
+# Reports over raw readings read them in time index order through a
+# fetchmany cursor and keep only per-device aggregates, so memory does not
+# grow with the number of readings. Percentiles come from value histograms:
+# readings are stored rounded to REPORT_DIGITS decimals, which makes them
+# exact, and a histogram is bounded by the sensor's value range.
+REPORT_METRICS = ('temperature', 'vibration', 'voltage')
+REPORT_PERCENTILES = (50, 95, 99)
+REPORT_DIGITS = 2
+REPORT_FETCH_SIZE = 5000
+
+# Longest silence (seconds) between two readings still counted as uptime
+UPTIME_MAX_GAP = 10
+
+REPORT_COLUMNS = "device_id, message_id, ts_epoch, temperature, vibration, voltage, status, alert_type"
+
+def percentiles(histogram, count, points=REPORT_PERCENTILES):
+    """Nearest-rank percentiles of a {value: count} histogram holding count values"""
+    ranks = [(point, max(1, math.ceil(point * count / 100))) for point in points]
+    result = {}
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        while ranks and seen >= ranks[0][1]:
+            result[f"p{ranks.pop(0)[0]}"] = value
+        if not ranks:
+            break
+    return result
+
+class DeviceReport:
+    """Running aggregates of one device's readings in a report"""
+    def __init__(self, first_seen):
+        self.statuses = {}
+        self.alerts = {}
+        # {rounded value: count} per metric
+        self.temperature = {}
+        self.vibration = {}
+        self.voltage = {}
+        self.first_seen = self.last_seen = first_seen
+        self.uptime = 0
+        self.outages = 0
+        self.last_message = None
+        self.message_gaps = 0
+        self.missing_messages = 0
+        self.message_resets = 0
+        
+    def summary(self, period):
+        """JSON-ready results; period is the length (seconds) of the part of the
+        reported range that has passed, which uptime_percent is relative to"""
+        readings = sum(self.statuses.values())
+        metrics = {}
+        for metric in REPORT_METRICS:
+            histogram = getattr(self, metric)
+            values = {'min': min(histogram), 'max': max(histogram),
+                      'mean': round(sum(value * n for value, n in histogram.items()) / readings, 4)}
+            values.update(percentiles(histogram, readings))
+            metrics[metric] = values
+        # Alert types are counted as stored ("High Temperature, High Vibration Warning")
+        # and only split into single alerts here
+        alerts = {}
+        for alert_type, count in self.alerts.items():
+            for alert in alert_type.split(', '):
+                alerts[alert] = alerts.get(alert, 0) + count
+        return {
+            'readings': readings,
+            'statuses': dict(sorted(self.statuses.items())),
+            'alerts': dict(sorted(alerts.items())),
+            'metrics': metrics,
+            'first_seen': epoch_timestamp(self.first_seen),
+            'last_seen': epoch_timestamp(self.last_seen),
+            'uptime_seconds': self.uptime,
+            'uptime_percent': round(100.0 * self.uptime / period, 2) if period > 0 else 0.0,
+            'outages': self.outages,
+            'message_gaps': self.message_gaps,
+            'missing_messages': self.missing_messages,
+            'message_resets': self.message_resets,
+        }
+
+class StreamingReport:
+    """Per-device percentiles, alert counts, uptime and message_id gaps of a reading stream.
+    
+    Rows must arrive in time order (as stream_readings yields them) for
+    uptime and gaps to be meaningful; the rest does not depend on order.
+    """
+    def __init__(self, start, end, max_gap=UPTIME_MAX_GAP):
+        self.start = start
+        self.end = end
+        self.max_gap = max_gap
+        self.devices = {}
+        self.rows = 0
+        
+    def add(self, rows):
+        """Account for a chunk of REPORT_COLUMNS rows"""
+        devices = self.devices
+        max_gap = self.max_gap
+        for device_id, message_id, ts, temperature, vibration, voltage, status, alert_type in rows:
+            device = devices.get(device_id)
+            if device is None:
+                device = devices[device_id] = DeviceReport(ts)
+            statuses = device.statuses
+            statuses[status] = statuses.get(status, 0) + 1
+            if alert_type is not None and alert_type != 'None':
+                alerts = device.alerts
+                alerts[alert_type] = alerts.get(alert_type, 0) + 1
+            
+            histogram = device.temperature
+            value = round(temperature, REPORT_DIGITS)
+            histogram[value] = histogram.get(value, 0) + 1
+            histogram = device.vibration
+            value = round(vibration, REPORT_DIGITS)
+            histogram[value] = histogram.get(value, 0) + 1
+            histogram = device.voltage
+            value = round(voltage, REPORT_DIGITS)
+            histogram[value] = histogram.get(value, 0) + 1
+            
+            # A device is up between readings that are at most max_gap apart
+            silence = ts - device.last_seen
+            if silence <= max_gap:
+                device.uptime += silence
+            else:
+                device.outages += 1
+            device.last_seen = ts
+            
+            # message_id counts up by one per reading; it starts over when a device restarts
+            if message_id is not None:
+                last = device.last_message
+                if last is not None:
+                    if message_id > last + 1:
+                        device.message_gaps += 1
+                        device.missing_messages += message_id - last - 1
+                    elif message_id <= last:
+                        device.message_resets += 1
+                device.last_message = message_id
+        self.rows += len(rows)
+        
+    def result(self, now=None):
+        """The report as a JSON-ready dict; now (ts_epoch seconds) defaults to the current time"""
+        # Uptime is relative to the part of the range that has already passed:
+        # a range ending today counts up to now, one not begun yet is empty
+        if now is None:
+            now = calendar.timegm(datetime.now().timetuple())
+        period = min(self.end, max(now, self.start)) - self.start
+        devices = {device_id: device.summary(period) for device_id, device in sorted(self.devices.items())}
+        statuses = {}
+        alerts = {}
+        for device in devices.values():
+            for totals, counts in ((statuses, device['statuses']), (alerts, device['alerts'])):
+                for key, count in counts.items():
+                    totals[key] = totals.get(key, 0) + count
+        return {
+            'start': epoch_timestamp(self.start),
+            'end': epoch_timestamp(self.end),
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'readings': self.rows,
+            'statuses': dict(sorted(statuses.items())),
+            'alerts': dict(sorted(alerts.items())),
+            'devices': devices,
+        }
+
+def stream_readings(conn, start, end, device_id=None, fetch_size=REPORT_FETCH_SIZE):
+    """Yield chunks of REPORT_COLUMNS rows with start <= ts_epoch < end, oldest first"""
+    sources, time_column = reading_sources(conn, start, end)
+    columns = REPORT_COLUMNS
+    if time_column != "ts_epoch":
+        columns = columns.replace("ts_epoch", f"{time_column} AS ts_epoch")
+    # Walk the time index (or, for one device, the device index) so SQLite
+    # never has to sort the range
+    order = "id" if device_id is not None or time_column != "ts_epoch" else "ts_epoch, id"
+    for source in sources:
+        sql = f"SELECT {columns} FROM {source} WHERE {time_column} >= ? AND {time_column} < ?"
+        params = [start, end]
+        if device_id is not None:
+            sql += " AND device_id = ?"
+            params.append(device_id)
+        cursor = conn.execute(f"{sql} ORDER BY {order}", params)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield rows
+
+def stream_report(conn, start, end, device_id=None, max_gap=UPTIME_MAX_GAP, fetch_size=REPORT_FETCH_SIZE,
+                  now=None):
+    """Build a StreamingReport result for start <= ts_epoch < end from raw readings"""
+    report = StreamingReport(start, end, max_gap)
+    for rows in stream_readings(conn, start, end, device_id, fetch_size):
+        report.add(rows)
+    return report.result(now)
+
+# ========== SCHEMA MIGRATIONS ==========
+# ts_epoch holds the reading timestamp as whole seconds, treating the naive
+# ISO timestamp as UTC (same as strftime('%s') and calendar.timegm)
+EPOCH_SQL = "CAST(strftime('%s', {}) AS INTEGER)"
+EPOCH = datetime(1970, 1, 1)
+
+def backfill_ts_epoch(conn, chunk_size=5000, stop=None):
+    """Fill ts_epoch for rows written before the column existed; stops between chunks once stop is set"""
+    max_id = conn.execute("SELECT MAX(id) FROM sensor_readings").fetchone()[0] or 0
+    # Short transactions so the ingest writer is never locked out for long.
+    # Only rows still missing ts_epoch are touched, so a rerun resumes
+    for start in range(0, max_id, chunk_size):
+        if stop is not None and stop.is_set():
+            return
+        with conn:
+            conn.execute(f'''
+                UPDATE sensor_readings SET ts_epoch = {EPOCH_SQL.format('timestamp')}
+                WHERE id > ? AND id <= ? AND ts_epoch IS NULL
+            ''', (start, start + chunk_size))
+
+def ensure_rollups(conn):
+    """Create the rollup tables, remembering which existing readings still need rolling up"""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'rollup_1m'").fetchone():
+        return
+    for resolution in ROLLUP_RESOLUTIONS:
+        conn.execute(ROLLUP_SCHEMA_SQL.format(table=f"rollup_{resolution}"))
+    # Readings after this id are rolled up as they are stored; the ones
+    # before it are left to the background backfill migration
+    max_id = conn.execute("SELECT MAX(id) FROM sensor_readings").fetchone()[0]
+    if max_id:
+        conn.execute("CREATE TABLE rollup_backfill (max_id INTEGER, done_id INTEGER NOT NULL DEFAULT 0)")
+        conn.execute("INSERT INTO rollup_backfill (max_id) VALUES (?)", (max_id,))
+    conn.commit()
+
+def backfill_rollups(conn, chunk_size=5000, stop=None):
+    """Roll up readings stored before continuous rollups existed; stops between chunks once stop is set.
+    
+    The rollups are merged into, so a chunk must never be rolled up twice:
+    each chunk commits together with the id it ends at (done_id), in a
+    transaction that first reads that id, so an interrupted run resumes
+    where it stopped and an overlapping migrator picks up the next chunk.
+    """
+    while not (stop is not None and stop.is_set()):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'rollup_backfill'").fetchone():
+                return
+            # Tables created before done_id existed start over
+            if 'done_id' not in [row[1] for row in conn.execute("PRAGMA table_info(rollup_backfill)")]:
+                conn.execute("ALTER TABLE rollup_backfill ADD COLUMN done_id INTEGER NOT NULL DEFAULT 0")
+            max_id, done_id = conn.execute("SELECT max_id, done_id FROM rollup_backfill").fetchone()
+            if done_id >= (max_id or 0):
+                conn.execute("DROP TABLE rollup_backfill")
+                return
+            end = min(done_id + chunk_size, max_id)
+            for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+                conn.execute(f'''
+                    INSERT INTO rollup_{resolution}
+                    SELECT device_id, ts_epoch / {seconds} * {seconds}, COUNT(*),
+                           SUM(status = 'Good'), SUM(status = 'Warning'), SUM(status = 'Critical'),
+                           SUM(temperature), MIN(temperature), MAX(temperature),
+                           SUM(vibration), MIN(vibration), MAX(vibration),
+                           SUM(voltage), MIN(voltage), MAX(voltage)
+                    FROM sensor_readings
+                    WHERE id > ? AND id <= ?
+                    GROUP BY device_id, ts_epoch / {seconds}
+                ''' + ROLLUP_MERGE_SQL, (done_id, end))
+            conn.execute("UPDATE rollup_backfill SET done_id = ?", (end,))
+
+# (version, description, SQL statement or callable, run in background)
+# Applied in order; the database records its version in PRAGMA user_version.
+MIGRATIONS = [
+    (1, "add epoch timestamp column",
+     "ALTER TABLE sensor_readings ADD COLUMN ts_epoch INTEGER", False),
+    (2, "backfill epoch timestamps", backfill_ts_epoch, True),
+    (3, "index readings by device",
+     "CREATE INDEX IF NOT EXISTS idx_readings_device ON sensor_readings (device_id, id)", True),
+    (4, "index readings by status and time",
+     "CREATE INDEX IF NOT EXISTS idx_readings_status ON sensor_readings (status, ts_epoch)", True),
+    (5, "index readings by time",
+     "CREATE INDEX IF NOT EXISTS idx_readings_time ON sensor_readings (ts_epoch)", True),
+    (6, "backfill rollups", backfill_rollups, True),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn):
+    """Return the migration version recorded in the database"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn, foreground_only=False, stop=None):
+    """Apply pending migrations in order, stopping at the first background one if asked.
+    
+    Once the stop event is set, backfills return between chunks and no
+    further migration starts; an interrupted backfill is not recorded as
+    applied and resumes on the next run.
+    """
+    for version, description, step, background in MIGRATIONS:
+        if version <= schema_version(conn):
+            continue
+        if foreground_only and background:
+            break
+        if stop is not None and stop.is_set():
+            break
+        print(f" Migrating database to v{version}: {description}")
+        if callable(step):
+            step(conn, stop=stop)
+            if stop is not None and stop.is_set():
+                break
+            conn.execute(f"PRAGMA user_version = {version}")
+        else:
+            # DDL and the version bump commit together
+            conn.execute("BEGIN")
+            conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+    return schema_version(conn)
+
+def day_bounds(day):
+    """Return the [start, end) ts_epoch range of a YYYY-MM-DD day"""
+    start = calendar.timegm(datetime.strptime(day, "%Y-%m-%d").timetuple())
+    return start, start + 86400
+
+def epoch_day(seconds):
+    """Return the YYYY-MM-DD day containing a ts_epoch value"""
+    return (EPOCH + timedelta(seconds=seconds)).strftime("%Y-%m-%d")
+
+def epoch_timestamp(seconds):
+    """Return the ISO timestamp of a ts_epoch value"""
+    return (EPOCH + timedelta(seconds=seconds)).isoformat()
+
+class SchemaMigrator(threading.Thread):
+    """Applies slow migrations (backfills, index builds) while ingest keeps running"""
+    def __init__(self, db_path):
+        super().__init__()
+        self.db_path = db_path
+        self.daemon = True
+        self.version = None
+        self.stop_event = threading.Event()
+        
+    def run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                self.version = apply_migrations(conn, stop=self.stop_event)
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f" Database error (migration): {e}")
+            
+    def stop(self, timeout=30):
+        """Stop after the running chunk or index build; what is left resumes on the next start"""
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout=timeout)
+
+INSERT_READING_SQL = f'''
+    INSERT INTO sensor_readings 
+    (device_id, device_name, message_id, timestamp, temperature, 
+     vibration, voltage, status, alert_type, ts_epoch)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {EPOCH_SQL.format('?4')})
+'''
+
+# Distinct devices as a loose index scan over idx_readings_device:
+# O(devices * log n) instead of grouping the whole table
+DEVICES_CTE = '''
+    WITH RECURSIVE devices(device_id) AS (
+        SELECT MIN(device_id) FROM sensor_readings
+        UNION ALL
+        SELECT (SELECT MIN(device_id) FROM sensor_readings WHERE device_id > devices.device_id)
+        FROM devices WHERE devices.device_id IS NOT NULL
+    )
+'''
+
+COUNT_DEVICES_SQL = DEVICES_CTE + "SELECT COUNT(device_id) FROM devices"
+
+LATEST_READINGS_SQL = DEVICES_CTE + '''
+    SELECT r.device_id, r.temperature, r.vibration, r.voltage, r.status, r.timestamp
+    FROM devices d
+    JOIN sensor_readings r ON r.id = (
+        SELECT MAX(id) FROM sensor_readings WHERE device_id = d.device_id
+    )
+    ORDER BY r.device_id
+'''
+
+# Same result without relying on the device index (databases still migrating)
+LATEST_READINGS_SCAN_SQL = '''
+    SELECT device_id, temperature, vibration, voltage, status, timestamp
+    FROM sensor_readings 
+    WHERE id IN (
+        SELECT MAX(id) FROM sensor_readings GROUP BY device_id
+    )
+    ORDER BY device_id
+'''
+
+# ========== COMPACT LAYOUT ==========
+# Optional layout for new databases: integer epoch-microsecond timestamps,
+# a devices dimension table and integer status / alert-flag codes. A view
+# named sensor_readings keeps the standard column names for readers.
+LAYOUTS = ('standard', 'compact', 'partitioned')
+
+STATUS_CODES = {'Good': 0, 'Warning': 1, 'Critical': 2, 'Anomaly': 3}
+
+# (sensor alert name, warning bit, critical bit), in analyze_data check order
+ALERT_FLAGS = [
+    ('High Temperature', 0x01, 0x02),
+    ('High Vibration', 0x04, 0x08),
+    ('Low Voltage', 0x10, 0x20),
+]
+
+# (anomaly alert name, bit) of readings with status Anomaly
+ANOMALY_FLAGS = [
+    ('Temperature Anomaly', 0x40),
+    ('Vibration Anomaly', 0x80),
+    ('Voltage Anomaly', 0x100),
+]
+
+def to_epoch_us(timestamp):
+    """Convert a naive ISO timestamp to integer microseconds since the epoch"""
+    return (datetime.fromisoformat(timestamp) - EPOCH) // timedelta(microseconds=1)
+
+def encode_alert_type(alert_type):
+    """Encode an analyze_data alert_type string as a bitmask"""
+    flags = 0
+    if not alert_type or alert_type == 'None':
+        return flags
+    for position, token in enumerate(alert_type.split(', ')):
+        # Only the first entry can be critical; later ones are always warnings
+        warning = position > 0 or token.endswith(' Warning')
+        name = token[:-len(' Warning')] if token.endswith(' Warning') else token
+        for sensor, warning_bit, critical_bit in ALERT_FLAGS:
+            if sensor == name:
+                flags |= warning_bit if warning else critical_bit
+        for anomaly, bit in ANOMALY_FLAGS:
+            if anomaly == token:
+                flags |= bit
+    return flags
+
+def decode_alert_flags(flags):
+    """Rebuild the analyze_data alert_type string from a bitmask"""
+    parts = []
+    for sensor, warning_bit, critical_bit in ALERT_FLAGS:
+        if flags & critical_bit:
+            parts = [sensor]
+        elif flags & warning_bit:
+            parts.append(sensor if parts else f"{sensor} Warning")
+    parts.extend(anomaly for anomaly, bit in ANOMALY_FLAGS if flags & bit)
+    return ', '.join(parts) if parts else 'None'
+
+COMPACT_SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS devices (
+        device_key INTEGER PRIMARY KEY,
+        device_id TEXT UNIQUE NOT NULL,
+        device_name TEXT
+    );
+    CREATE TABLE IF NOT EXISTS statuses (
+        code INTEGER PRIMARY KEY,
+        status TEXT UNIQUE NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS alert_types (
+        flags INTEGER PRIMARY KEY,
+        alert_type TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS readings_compact (
+        id INTEGER PRIMARY KEY,
+        device_key INTEGER NOT NULL,
+        message_id INTEGER,
+        ts_us INTEGER NOT NULL,
+        temperature REAL,
+        vibration REAL,
+        voltage REAL,
+        status_code INTEGER NOT NULL,
+        alert_flags INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_compact_device ON readings_compact (device_key, id);
+    CREATE INDEX IF NOT EXISTS idx_compact_status ON readings_compact (status_code, (ts_us / 1000000));
+    CREATE INDEX IF NOT EXISTS idx_compact_time ON readings_compact ((ts_us / 1000000));
+    
+    CREATE VIEW IF NOT EXISTS sensor_readings AS
+    SELECT r.id, d.device_id, d.device_name, r.message_id,
+           strftime('%Y-%m-%dT%H:%M:%S', r.ts_us / 1000000, 'unixepoch')
+               || printf('.%06d', r.ts_us % 1000000) AS timestamp,
+           r.temperature, r.vibration, r.voltage, s.status, a.alert_type,
+           NULL AS processed_at, r.ts_us / 1000000 AS ts_epoch
+    FROM readings_compact r
+    LEFT JOIN devices d ON d.device_key = r.device_key
+    LEFT JOIN statuses s ON s.code = r.status_code
+    LEFT JOIN alert_types a ON a.flags = r.alert_flags;
+'''
+
+INSERT_COMPACT_SQL = '''
+    INSERT INTO readings_compact 
+    (device_key, message_id, ts_us, temperature, vibration, voltage, status_code, alert_flags)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+COMPACT_LATEST_READINGS_SQL = '''
+    SELECT v.device_id, v.temperature, v.vibration, v.voltage, v.status, v.timestamp
+    FROM devices d
+    JOIN sensor_readings v ON v.id = (
+        SELECT MAX(id) FROM readings_compact WHERE device_key = d.device_key
+    )
+    ORDER BY v.device_id
+'''
+
+def storage_layout(conn):
+    """Return the layout ('standard', 'compact' or 'partitioned') of a database"""
+    tables = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE name IN ('readings_compact', 'partitions')"
+    )}
+    if 'readings_compact' in tables:
+        return 'compact'
+    if 'partitions' in tables:
+        return 'partitioned'
+    return 'standard'
+
+def reader_queries(conn):
+    """Pick the (latest readings, device count) queries that suit this database"""
+    layout = storage_layout(conn)
+    if layout == 'compact':
+        return COMPACT_LATEST_READINGS_SQL, "SELECT COUNT(*) FROM devices"
+    if layout == 'partitioned':
+        return partitioned_reader_queries(conn)
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return LATEST_READINGS_SQL, COUNT_DEVICES_SQL
+    return LATEST_READINGS_SCAN_SQL, "SELECT COUNT(DISTINCT device_id) FROM sensor_readings"
+
+def day_filter(conn, day):
+    """Return a WHERE fragment and parameters selecting one YYYY-MM-DD day"""
+    if storage_layout(conn) != 'standard' or schema_version(conn) >= SCHEMA_VERSION:
+        return "ts_epoch >= ? AND ts_epoch < ?", day_bounds(day)
+    # Still migrating: ts_epoch is not fully backfilled yet
+    return "DATE(timestamp) = ?", (day,)
+
+class CompactEncoder:
+    """Turns sensor_readings rows into readings_compact rows on the writer thread"""
+    def __init__(self):
+        self.device_keys = {}
+        self.alert_flags = {}
+        
+    def device_key(self, conn, device_id, device_name):
+        key = self.device_keys.get(device_id)
+        if key is None:
+            conn.execute("INSERT OR IGNORE INTO devices (device_id, device_name) VALUES (?, ?)",
+                         (device_id, device_name))
+            key = conn.execute("SELECT device_key FROM devices WHERE device_id = ?",
+                               (device_id,)).fetchone()[0]
+            self.device_keys[device_id] = key
+        return key
+        
+    def insert(self, conn, batch):
+        conn.executemany(INSERT_COMPACT_SQL, [self.encode(conn, row) for row in batch])
+        
+    def encode(self, conn, row):
+        device_id, device_name, message_id, timestamp, temperature, vibration, voltage, status, alert_type = row
+        flags = self.alert_flags.get(alert_type)
+        if flags is None:
+            flags = self.alert_flags[alert_type] = encode_alert_type(alert_type)
+        return (
+            self.device_key(conn, device_id, device_name),
+            message_id,
+            to_epoch_us(timestamp),
+            temperature,
+            vibration,
+            voltage,
+            STATUS_CODES.get(status, 0),
+            flags
+        )
+        
+    def reset(self):
+        """Forget cached device keys after a rolled back transaction"""
+        self.device_keys.clear()
+
+# ========== PARTITIONED LAYOUT ==========
+# Optional layout for new databases: one sensor_readings_pYYYYMMDD table per
+# reading day, a partitions catalog and a sensor_readings UNION ALL view.
+# Raw partitions older than the retention period are dropped; the rollups
+# keep covering those days.
+PARTITIONED_SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS partitions (
+        day TEXT PRIMARY KEY,
+        table_name TEXT NOT NULL
+    );
+'''
+
+PARTITION_COLUMNS = '''
+    id INTEGER PRIMARY KEY,
+    device_id TEXT,
+    device_name TEXT,
+    message_id INTEGER,
+    timestamp DATETIME,
+    temperature REAL,
+    vibration REAL,
+    voltage REAL,
+    status TEXT,
+    alert_type TEXT,
+    processed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    ts_epoch INTEGER
+'''
+
+READING_COLUMNS = [
+    'id', 'device_id', 'device_name', 'message_id', 'timestamp', 'temperature',
+    'vibration', 'voltage', 'status', 'alert_type', 'processed_at', 'ts_epoch'
+]
+
+def partition_table(day):
+    """Return the partition table name of a YYYY-MM-DD day"""
+    # Validates the day, since it ends up inside SQL text
+    return "sensor_readings_p" + datetime.strptime(day, "%Y-%m-%d").strftime("%Y%m%d")
+
+def partition_tables(conn):
+    """Return (day, table_name) of every partition, oldest first"""
+    return conn.execute("SELECT day, table_name FROM partitions ORDER BY day").fetchall()
+
+def rebuild_partition_view(conn):
+    """Point the sensor_readings view at the current set of partitions"""
+    tables = [table for day, table in partition_tables(conn)]
+    conn.execute("DROP VIEW IF EXISTS sensor_readings")
+    if tables:
+        body = "\n    UNION ALL ".join(f"SELECT * FROM {table}" for table in tables)
+    else:
+        # No partitions yet: an empty view with the standard columns
+        body = f"SELECT * FROM (SELECT NULL AS {', NULL AS '.join(READING_COLUMNS)}) WHERE 0"
+    conn.execute(f"CREATE VIEW sensor_readings AS {body}")
+
+def reading_sources(conn, start, end):
+    """Return (tables, time column) holding readings with start <= ts_epoch < end"""
+    layout = storage_layout(conn)
+    if layout == 'partitioned':
+        first_day, last_day = epoch_day(start), epoch_day(end - 1)
+        return [table for day, table in partition_tables(conn) if first_day <= day <= last_day], "ts_epoch"
+    if layout == 'standard' and schema_version(conn) < SCHEMA_VERSION:
+        # Still migrating: ts_epoch is not fully backfilled yet
+        return ["sensor_readings"], EPOCH_SQL.format('timestamp')
+    return ["sensor_readings"], "ts_epoch"
+
+def partitioned_reader_queries(conn):
+    """Latest-reading and device-count queries probing each partition's device index"""
+    probes = []
+    for day, table in partition_tables(conn):
+        probes.append(f'''
+            SELECT * FROM (
+                WITH RECURSIVE devices(device_id) AS (
+                    SELECT MIN(device_id) FROM {table}
+                    UNION ALL
+                    SELECT (SELECT MIN(device_id) FROM {table} WHERE device_id > devices.device_id)
+                    FROM devices WHERE devices.device_id IS NOT NULL
+                )
+                SELECT r.id, r.device_id, r.temperature, r.vibration, r.voltage, r.status, r.timestamp
+                FROM devices d
+                JOIN {table} r ON r.id = (SELECT MAX(id) FROM {table} WHERE device_id = d.device_id)
+            )''')
+    if not probes:
+        return LATEST_READINGS_SCAN_SQL, "SELECT COUNT(DISTINCT device_id) FROM sensor_readings"
+    latest = "WITH latest AS (" + " UNION ALL ".join(probes) + ")"
+    return (
+        latest + '''
+            SELECT device_id, temperature, vibration, voltage, status, timestamp
+            FROM latest
+            WHERE id IN (SELECT MAX(id) FROM latest GROUP BY device_id)
+            ORDER BY device_id''',
+        latest + " SELECT COUNT(DISTINCT device_id) FROM latest"
+    )
+
+class PartitionRouter:
+    """Routes rows into per-day partition tables on the writer thread"""
+    def __init__(self):
+        self.known_days = None
+        self.next_id = None
+        
+    def load(self, conn):
+        """Read the partition catalog and the next free reading id"""
+        self.known_days = set()
+        max_id = 0
+        for day, table in partition_tables(conn):
+            self.known_days.add(day)
+            max_id = max(max_id, conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0)
+        # Ids are assigned here so they stay unique and ordered across partitions
+        self.next_id = max_id + 1
+        
+    def ensure_partition(self, conn, day):
+        """Create the partition of a day (and refresh the view) if it is new"""
+        table = partition_table(day)
+        if day in self.known_days:
+            return table
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({PARTITION_COLUMNS})")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_device ON {table} (device_id, id)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_status ON {table} (status, ts_epoch)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_time ON {table} (ts_epoch)")
+        conn.execute("INSERT OR IGNORE INTO partitions (day, table_name) VALUES (?, ?)", (day, table))
+        rebuild_partition_view(conn)
+        self.known_days.add(day)
+        return table
+        
+    def insert(self, conn, batch):
+        if self.known_days is None:
+            self.load(conn)
+        by_day = {}
+        for row in batch:
+            by_day.setdefault(row[3][:10], []).append((self.next_id,) + row)
+            self.next_id += 1
+        for day, rows in by_day.items():
+            table = self.ensure_partition(conn, day)
+            conn.executemany(f'''
+                INSERT INTO {table}
+                (id, device_id, device_name, message_id, timestamp, temperature,
+                 vibration, voltage, status, alert_type, ts_epoch)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {EPOCH_SQL.format('?5')})
+            ''', rows)
+            
+    def reset(self):
+        """Reload the catalog after a rolled back transaction"""
+        self.known_days = None
+
+class RetentionManager(threading.Thread):
+    """Drops raw partitions past the retention period"""
+    def __init__(self, db_path, retention_days=7, interval=60.0):
+        super().__init__()
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.interval = interval
+        self.daemon = True
+        self.stop_event = threading.Event()
+        self.dropped = 0
+        
+    def run_once(self, conn, today=None):
+        """One maintenance pass; today defaults to the current local date"""
+        today = today or datetime.now().strftime("%Y-%m-%d")
+        cutoff = (datetime.strptime(today, "%Y-%m-%d") - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        for day, table in conn.execute(
+            "SELECT day, table_name FROM partitions WHERE day < ? ORDER BY day", (cutoff,)
+        ).fetchall():
+            # Each partition is dropped in its own short transaction
+            with conn:
+                conn.execute("DELETE FROM partitions WHERE day = ?", (day,))
+                rebuild_partition_view(conn)
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self.dropped += 1
+            print(f" Retention: dropped raw partition {day}")
+                    
+    def run(self):
+        conn = connect_writer(self.db_path)
+        try:
+            while True:
+                try:
+                    self.run_once(conn)
+                except Exception as e:
+                    print(f" Database error (retention): {e}")
+                if self.stop_event.wait(self.interval):
+                    break
+        finally:
+            conn.close()
+            
+    def stop(self):
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout=5)
+
+UPSERT_HEALTH_SQL = '''
+    INSERT INTO device_health 
+    (device_id, device_name, status, packets_received, error_count, last_active)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(device_id) DO UPDATE SET
+        status = excluded.status,
+        packets_received = packets_received + excluded.packets_received,
+        error_count = error_count + excluded.error_count,
+        last_active = excluded.last_active,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+class DeviceHealthAggregator:
+    """Keeps device health counters in memory between writer flushes"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        # device_id -> [device_name, status, packets, errors, last_active]
+        self.pending = {}
+        
+    def record(self, device_id, device_name, status, packets_increment=1, error_increment=0):
+        """Add one packet worth of health counters for a device"""
+        now = time.time()
+        with self.lock:
+            entry = self.pending.get(device_id)
+            if entry is None:
+                self.pending[device_id] = [device_name, status, packets_increment, error_increment, now]
+            else:
+                entry[1] = status
+                entry[2] += packets_increment
+                entry[3] += error_increment
+                entry[4] = now
+                
+    def drain(self):
+        """Take the accumulated counters as one upsert row per device"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return []
+        return [(UPSERT_HEALTH_SQL, [
+            (device_id, name, status, packets, errors, datetime.fromtimestamp(last_active).isoformat())
+            for device_id, (name, status, packets, errors, last_active) in pending.items()
+        ])]
+
+class UpsertBuffer:
+    """Holds upserts aggregated outside this process (shard workers) until the next batch"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+        
+    def add(self, upserts):
+        """Queue (sql, rows) upserts for the writer"""
+        with self.lock:
+            self.pending.extend(upserts)
+            
+    def drain(self):
+        """Take the queued upserts"""
+        with self.lock:
+            pending, self.pending = self.pending, []
+        return pending
+
+def reading_row(data):
+    """Build the sensor_readings row the writer inserts for a processed reading"""
+    return (
+        data['device_id'],
+        data.get('device_name', 'Unknown'),
+        data['message_id'],
+        data['timestamp'],
+        data['temperature'],
+        data['vibration'],
+        data['voltage'],
+        data.get('status', 'Good'),
+        data.get('alert_type', 'None')
+    )
+
+class StorageWriter(threading.Thread):
+    """Dedicated writer thread that batches readings over one long-lived connection"""
+    def __init__(self, db_path, batch_size=500, max_latency=0.05, profile=DEFAULT_PROFILE,
+                 aggregators=(), layout='standard', metrics=None):
+        super().__init__()
+        self.db_path = db_path
+        self.profile = profile
+        # Layout-specific row insertion; None means plain sensor_readings inserts
+        self.layout_writer = {'compact': CompactEncoder, 'partitioned': PartitionRouter}.get(layout)
+        if self.layout_writer is not None:
+            self.layout_writer = self.layout_writer()
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.running = True
+        self.daemon = True
+        
+        # In-memory aggregators (device health, rollups) upserted with every batch
+        self.aggregators = list(aggregators)
+        
+        # Rows waiting for the next batch, guarded by the condition
+        self.condition = threading.Condition()
+        self.pending = []
+        self.oldest_pending = None
+        self.flush_requests = 0
+        self.flushes_done = 0
+        
+        # Optional pipeline metrics (anything with record(stage, latencies)); committed
+        # rows add their store and total latencies. pending_stamps holds
+        # (handed over, generated_at or None) per pending row, only while metrics are on
+        self.metrics = metrics
+        self.pending_stamps = []
+        
+        # Statistics
+        self.enqueued_count = 0
+        self.written_count = 0
+        self.failed_count = 0
+        self.batches_written = 0
+        
+    def write(self, row, generated_at=None):
+        """Queue one sensor_readings row for the next batch"""
+        with self.condition:
+            self.pending.append(row)
+            if self.metrics is not None:
+                self.pending_stamps.append((time.monotonic(), generated_at))
+            self.enqueued_count += 1
+            # Wake the writer to start the latency clock, or when a batch is full
+            if len(self.pending) == 1:
+                self.oldest_pending = time.monotonic()
+                self.condition.notify_all()
+            elif len(self.pending) >= self.batch_size:
+                self.condition.notify_all()
+                
+    def write_many(self, rows, generated=None):
+        """Queue several sensor_readings rows, keeping their order; generated lists their generated_at stamps"""
+        if not rows:
+            return
+        with self.condition:
+            if not self.pending:
+                self.oldest_pending = time.monotonic()
+            self.pending.extend(rows)
+            if self.metrics is not None:
+                now = time.monotonic()
+                generated = generated or [None] * len(rows)
+                self.pending_stamps.extend((now, generated_at) for generated_at in generated)
+            self.enqueued_count += len(rows)
+            self.condition.notify_all()
+                
+    def _batch_due(self):
+        if self.flush_requests > self.flushes_done:
+            return True
+        if not self.pending:
+            return False
+        if len(self.pending) >= self.batch_size:
+            return True
+        return time.monotonic() - self.oldest_pending >= self.max_latency
+        
+    def _next_batch(self):
+        """Wait until a batch is due (or the writer is stopping) and take it"""
+        with self.condition:
+            while self.running and not self._batch_due():
+                timeout = None
+                if self.pending:
+                    timeout = max(0, self.max_latency - (time.monotonic() - self.oldest_pending))
+                self.condition.wait(timeout=timeout)
+            batch = self.pending[:self.batch_size]
+            del self.pending[:self.batch_size]
+            stamps = None
+            if self.metrics is not None:
+                stamps = self.pending_stamps[:len(batch)]
+                del self.pending_stamps[:len(batch)]
+            # A flush is complete once the batch that empties the buffer is written
+            flush_ticket = None
+            if self.pending:
+                self.oldest_pending = time.monotonic()
+            else:
+                self.oldest_pending = None
+                flush_ticket = self.flush_requests
+            return batch, flush_ticket, stamps
+        
+    def write_batch(self, conn, batch, upserts=(), retry=True):
+        """Write one batch and the aggregator upserts inside a single transaction"""
+        try:
+            with conn:
+                # Take the write lock up front (waiting out other writers), and
+                # keep partition DDL inside the same transaction
+                conn.execute("BEGIN IMMEDIATE")
+                if batch and self.layout_writer is not None:
+                    self.layout_writer.insert(conn, batch)
+                elif batch:
+                    conn.executemany(INSERT_READING_SQL, batch)
+                for sql, rows in upserts:
+                    conn.executemany(sql, rows)
+            self.batches_written += 1
+            return True
+        except Exception as e:
+            if self.layout_writer is not None:
+                # Cached layout state (device keys, partitions) may be stale; retry once
+                self.layout_writer.reset()
+                if retry:
+                    return self.write_batch(conn, batch, upserts, retry=False)
+            print(f" Database error (StorageWriter): {e}")
+            return False
+        
+    def run(self):
+        """Writer loop - commits every batch_size rows or max_latency seconds"""
+        conn = connect_writer(self.db_path, self.profile)
+        try:
+            while True:
+                batch, flush_ticket, stamps = self._next_batch()
+                upserts = []
+                for aggregator in self.aggregators:
+                    upserts.extend(aggregator.drain())
+                ok = self.write_batch(conn, batch, upserts) if batch or upserts else True
+                if ok and stamps:
+                    self.record_commit(stamps)
+                with self.condition:
+                    if ok:
+                        self.written_count += len(batch)
+                    else:
+                        self.failed_count += len(batch)
+                    if flush_ticket is not None:
+                        self.flushes_done = flush_ticket
+                    self.condition.notify_all()
+                    if not self.running and not self.pending:
+                        break
+        finally:
+            conn.close()
+            
+    def record_commit(self, stamps):
+        """Add the store and total latencies of a committed batch"""
+        now = time.monotonic()
+        self.metrics.record('store', [now - handed for handed, _ in stamps])
+        self.metrics.record('total', [now - generated_at for _, generated_at in stamps if generated_at is not None])
+        
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been committed"""
+        with self.condition:
+            self.flush_requests += 1
+            ticket = self.flush_requests
+            self.condition.notify_all()
+            return self.condition.wait_for(
+                lambda: self.flushes_done >= ticket or not self.is_alive(),
+                timeout=timeout
+            )
+        
+    def close(self, timeout=5.0):
+        """Write out remaining rows, stop the thread and close the connection"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.is_alive():
+            self.join(timeout=timeout)
+
+class DataStorage:
+    def __init__(self, db_path="sensor_data.db", batch_size=500, max_latency=0.05,
+                 profile=DEFAULT_PROFILE, layout='standard', retention_days=7, metrics=None):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown storage profile: {profile}")
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown storage layout: {layout}")
+        self.db_path = db_path
+        self.profile = profile
+        self.layout = layout
+        self.retention_days = retention_days
+        self.init_database()
+        
+        # Device health is aggregated in memory and upserted once per device per batch
+        self.health = DeviceHealthAggregator()
+        # Likewise the per-minute / per-hour rollups, once per device and bucket
+        self.rollups = RollupAggregator()
+        # Health and rollups already aggregated by shard worker processes
+        self.merged = UpsertBuffer()
+        
+        # Backfills and index builds run in the background against live data
+        self.migrator = SchemaMigrator(db_path)
+        self.migrator.start()
+        
+        # All readings go through one batching writer thread
+        self.writer = StorageWriter(db_path, batch_size=batch_size, max_latency=max_latency,
+                                    profile=profile, aggregators=[self.health, self.rollups, self.merged],
+                                    layout=self.layout, metrics=metrics)
+        self.writer.start()
+        
+        self.checkpointer = WalCheckpointer(
+            db_path, interval=STORAGE_PROFILES[profile]['checkpoint_interval']
+        )
+        self.checkpointer.start()
+        
+        # Partitioned databases expire old days in the background
+        self.retention = None
+        if self.layout == 'partitioned':
+            self.retention = RetentionManager(db_path, retention_days=retention_days)
+            self.retention.start()
+        
+    def init_database(self):
+        """Initialize SQLite database with required tables"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        # WAL is persistent, so readers opened later see it as well
+        cursor.execute("PRAGMA journal_mode = WAL")
+        
+        # The layout is fixed when the database is created
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sensor_readings'")
+        created = cursor.fetchone() is None
+        if not created:
+            existing = storage_layout(conn)
+            if existing != self.layout:
+                print(f" Keeping existing {existing} layout of {self.db_path}")
+                self.layout = existing
+                
+        if self.layout == 'compact':
+            self.init_compact_schema(conn, created)
+        elif self.layout == 'partitioned':
+            self.init_partitioned_schema(conn, created)
+        
+        # Raw sensor data table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sensor_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_id TEXT,
+                device_name TEXT,
+                message_id INTEGER,
+                timestamp DATETIME,
+                temperature REAL,
+                vibration REAL,
+                voltage REAL,
+                status TEXT,
+                alert_type TEXT,
+                processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Device health table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS device_health (
+                device_id TEXT PRIMARY KEY,
+                device_name TEXT,
+                status TEXT DEFAULT 'Good',
+                uptime_seconds INTEGER DEFAULT 0,
+                packets_received INTEGER DEFAULT 0,
+                error_count INTEGER DEFAULT 0,
+                last_active DATETIME,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        conn.commit()
+        
+        # Quick schema changes must land before the writer starts inserting
+        apply_migrations(conn, foreground_only=True)
+        ensure_rollups(conn)
+        conn.close()
+        print(f" Database initialized: {self.db_path} ({self.layout} layout)")
+        
+    def init_compact_schema(self, conn, created=False):
+        """Create the compact tables, lookup rows and the sensor_readings view"""
+        conn.executescript(COMPACT_SCHEMA_SQL)
+        conn.executemany("INSERT OR IGNORE INTO statuses (code, status) VALUES (?, ?)",
+                         [(code, status) for status, code in STATUS_CODES.items()])
+        conn.executemany("INSERT OR IGNORE INTO alert_types (flags, alert_type) VALUES (?, ?)",
+                         [(flags, decode_alert_flags(flags)) for flags in range(1 << (2 * len(ALERT_FLAGS)))])
+        # Anomaly bits only appear on readings without threshold alerts
+        anomalies = [bits << (2 * len(ALERT_FLAGS)) for bits in range(1, 1 << len(ANOMALY_FLAGS))]
+        conn.executemany("INSERT OR IGNORE INTO alert_types (flags, alert_type) VALUES (?, ?)",
+                         [(flags, decode_alert_flags(flags)) for flags in anomalies])
+        # A new database is created fully indexed, so there is nothing to migrate;
+        # an existing one keeps its version for apply_migrations
+        if created:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+        
+    def init_partitioned_schema(self, conn, created=False):
+        """Create the partition catalog and the sensor_readings view"""
+        conn.executescript(PARTITIONED_SCHEMA_SQL)
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sensor_readings'").fetchone():
+            rebuild_partition_view(conn)
+        # Partitions are created fully indexed, so a new database has nothing to
+        # migrate; an existing one keeps its version for apply_migrations
+        if created:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+        
+    def store_sensor_data(self, data):
+        """Queue processed sensor data for the batching writer"""
+        try:
+            self.writer.write(reading_row(data), data.get('generated_at'))
+            self.rollups.record(data)
+            return True
+        except Exception as e:
+            print(f" Database error (store_sensor_data): {e}")
+            return False
+        
+    def store_processed(self, rows, upserts=(), generated=None):
+        """Queue reading_row rows together with the health/rollup upserts aggregated for them"""
+        try:
+            self.writer.write_many(rows, generated)
+            self.merged.add(upserts)
+            return True
+        except Exception as e:
+            print(f" Database error (store_processed): {e}")
+            return False
+        
+    def update_device_health(self, device_id, status, packets_increment=1, error_increment=0,
+                             device_name=None):
+        """Record device health metrics; persisted by the writer with the next batch"""
+        try:
+            self.health.record(device_id, device_name or device_id, status,
+                               packets_increment, error_increment)
+            return True
+        except Exception as e:
+            print(f" Error (update_device_health): {e}")
+            return False
+        
+    def flush(self):
+        """Commit all readings queued so far"""
+        return self.writer.flush()
+        
+    def close(self):
+        """Stop the migrator, flush pending readings, close the writer and checkpoint the WAL"""
+        self.migrator.stop()
+        if self.retention is not None:
+            self.retention.stop()
+        self.writer.close()
+        self.checkpointer.stop()
+        
+    def iter_readings(self, start, end, device_id=None, fetch_size=1000):
+        """Yield raw readings with start <= ts_epoch < end, only touching the partitions involved"""
+        conn = connect_reader(self.db_path, self.profile)
+        try:
+            sources, time_column = reading_sources(conn, start, end)
+            for source in sources:
+                sql = f'''
+                    SELECT {', '.join(READING_COLUMNS)} FROM {source}
+                    WHERE {time_column} >= ? AND {time_column} < ?
+                '''
+                params = [start, end]
+                if device_id is not None:
+                    sql += " AND device_id = ?"
+                    params.append(device_id)
+                cursor = conn.execute(sql + " ORDER BY id", params)
+                while True:
+                    rows = cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    yield from rows
+        finally:
+            conn.close()
+            
+    def get_rollups(self, start, end, resolution='1m', device_id=None):
+        """Return rollup rows with start <= bucket < end at '1m' or '1h' resolution"""
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"Unknown rollup resolution: {resolution}")
+        conn = connect_reader(self.db_path, self.profile)
+        try:
+            sql = f"SELECT * FROM rollup_{resolution} WHERE bucket >= ? AND bucket < ?"
+            params = [start, end]
+            if device_id is not None:
+                sql += " AND device_id = ?"
+                params.append(device_id)
+            return conn.execute(sql + " ORDER BY device_id, bucket", params).fetchall()
+        finally:
+            conn.close()
+        
+    def range_report(self, start, end, device_id=None):
+        """Summarize start <= ts_epoch < end from the rollups instead of raw readings"""
+        conn = connect_reader(self.db_path, self.profile)
+        try:
+            return summarize_range(conn, start, end, device_id)
+        finally:
+            conn.close()
+            
+    def live_seed(self):
+        """Return ({status: count}, latest reading per device) to start a live state from"""
+        try:
+            conn = connect_reader(self.db_path, self.profile)
+            try:
+                # One index count per status rather than a scan grouping every reading
+                counts = {
+                    status: conn.execute("SELECT COUNT(*) FROM sensor_readings WHERE status = ?",
+                                         (status,)).fetchone()[0]
+                    for status in STATUS_CODES
+                }
+                latest_sql, _ = reader_queries(conn)
+                return counts, conn.execute(latest_sql).fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f" Error (live_seed): {e}")
+            return {}, []
+            
+    def get_stats(self):
+        """Get basic statistics from database"""
+        try:
+            conn = connect_reader(self.db_path, self.profile)
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT COUNT(*) FROM sensor_readings')
+            total_readings = cursor.fetchone()[0]
+            
+            if schema_version(conn) >= SCHEMA_VERSION:
+                cursor.execute(COUNT_DEVICES_SQL)
+            else:
+                cursor.execute('SELECT COUNT(DISTINCT device_id) FROM sensor_readings')
+            active_devices = cursor.fetchone()[0]
+            
+            # IN list instead of != so idx_readings_status can be used
+            cursor.execute("SELECT COUNT(*) FROM sensor_readings WHERE status IN ('Warning', 'Critical', 'Anomaly')")
+            alerts_count = cursor.fetchone()[0]
+            
+            conn.close()
+            
+            return {
+                'total_readings': total_readings,
+                'active_devices': active_devices,
+                'alerts_count': alerts_count
+            }
+        except Exception as e:
+            print(f" Error getting stats: {e}")
             return {}
\ No newline at end of file
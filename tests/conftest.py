@@ -0,0 +1,31 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# main.py sits in the repository root and loads the component files by path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def reading():
+    """Factory for generate_sensor_data style readings"""
+    def make(device_id="DEV001", message_id=1, timestamp="2026-01-20T10:00:00",
+             temperature=30.0, vibration=1.0, voltage=220.0, **extra):
+        data = {
+            "device_id": device_id,
+            "device_name": f"Device {device_id}",
+            "message_id": message_id,
+            "timestamp": timestamp,
+            "temperature": temperature,
+            "vibration": vibration,
+            "voltage": voltage,
+        }
+        data.update(extra)
+        return data
+    return make
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    """Run every test in its own directory; the pipeline writes logs/ and stats files to the working directory"""
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,129 @@
+# tests/test_dashboard.py
+import io
+import os
+from datetime import datetime
+
+import dashboard
+from main import database
+
+STATUSES = ["Good", "Warning", "Critical", "Anomaly"]
+
+def stored_readings(path, reading, layout):
+    storage = database.DataStorage(path, layout=layout)
+    storage.migrator.join(timeout=10)
+    readings = []
+    for i in range(40):
+        data = reading(device_id=f"DEV00{i % 3 + 1}", message_id=i, timestamp=f"2026-01-20T10:{i:02d}:00",
+                       temperature=30.0 + i, status=STATUSES[i % 4], alert_type="Normal")
+        storage.store_sensor_data(data)
+        readings.append(data)
+    storage.close()
+    return readings
+
+def test_database_dashboard_data_matches_the_readings(tmp_path, reading):
+    for layout in ("standard", "compact", "partitioned"):
+        path = str(tmp_path / f"{layout}.db")
+        readings = stored_readings(path, reading, layout)
+        
+        live = dashboard.RealTimeDashboard(path, stats_path=str(tmp_path / "none.json"), live_port=0).get_live_data()
+        
+        counts = {status: sum(data["status"] == status for data in readings) for status in STATUSES}
+        assert (live["total"], live["critical"], live["warning"], live["anomaly"]) == (
+            len(readings), counts["Critical"], counts["Warning"], counts["Anomaly"]
+        ), layout
+        latest = {data["device_id"]: data for data in readings}
+        # The compact layout's view spells out the microseconds
+        assert [row[:5] + (datetime.fromisoformat(row[5]),) for row in live["devices"]] == [
+            (data["device_id"], data["temperature"], data["vibration"], data["voltage"], data["status"],
+             datetime.fromisoformat(data["timestamp"]))
+            for _, data in sorted(latest.items())
+        ], layout
+
+class FakeClient:
+    """Stands in for LiveStateClient, pushing a fixed list of updates"""
+    def __init__(self, updates):
+        self.updates = updates
+        
+    def subscribe(self, rate=10.0, wait=0.1):
+        yield from self.updates
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 20, 10, 0, 0)
+
+def live_update(devices, total=None):
+    """A pushed update: devices maps device_id -> (status, temperature)"""
+    counts = {}
+    for status, _ in devices.values():
+        counts[status] = counts.get(status, 0) + 1
+    return {
+        'total': total if total is not None else len(devices),
+        'counts': counts,
+        'devices': {device_id: [temperature, 1.0, 220.0, status, "2026-01-20T10:00:00"]
+                    for device_id, (status, temperature) in devices.items()},
+    }
+
+def live_dashboard(monkeypatch, lines=10, updates=()):
+    monkeypatch.setattr(dashboard, "datetime", FrozenDatetime)
+    monkeypatch.setattr(dashboard.shutil, "get_terminal_size", lambda: os.terminal_size((80, lines)))
+    return dashboard.LiveDashboard(FakeClient(list(updates)), out=io.StringIO())
+
+FLEET = {
+    "DEV001": ("Good", 30.0), "DEV002": ("Critical", 90.0), "DEV003": ("Warning", 75.0),
+    "DEV004": ("Good", 31.0), "DEV005": ("Critical", 88.0),
+}
+
+def test_live_dashboard_lists_the_most_severe_devices_first(monkeypatch):
+    live = live_dashboard(monkeypatch)
+    live.apply(live_update(FLEET))
+    assert live.device_rows() == ["DEV002", "DEV005", "DEV003", "DEV001", "DEV004"]
+
+def test_live_dashboard_pages_through_the_devices(monkeypatch):
+    # 10 lines leave 3 device rows per page
+    live = live_dashboard(monkeypatch, lines=10)
+    live.apply(live_update(FLEET))
+    
+    def shown():
+        frame = live.layout(80, 10)
+        return [frame[row][0].strip() for row in range(5, 8) if row in frame], frame[9][0]
+        
+    rows, footer = shown()
+    assert rows == ["DEV002", "DEV005", "DEV003"] and footer.startswith("Page 1/2")
+    assert live.handle_key('n')
+    rows, footer = shown()
+    assert rows == ["DEV001", "DEV004"] and footer.startswith("Page 2/2")
+    # Past the last page stays on it
+    live.handle_key('n')
+    assert shown()[1].startswith("Page 2/2")
+    live.handle_key('p')
+    live.handle_key('p')
+    assert shown()[1].startswith("Page 1/2")
+    assert not live.handle_key('q')
+
+def test_live_dashboard_redraws_only_changed_cells(monkeypatch):
+    live = live_dashboard(monkeypatch)
+    live.apply(live_update(FLEET))
+    live.draw()
+    first = live.out.getvalue()
+    assert first.startswith("\033[2J") and "DEV002" in first
+    
+    # Nothing changed: nothing written
+    live.out = io.StringIO()
+    live.draw()
+    assert live.out.getvalue() == ""
+    
+    # One temperature changed: only its cell (row 6, the second device) and the totals line
+    live.apply({'total': 6, 'counts': live.counts, 'devices': live_update({"DEV005": ("Critical", 95.5)})['devices']})
+    live.draw()
+    written = live.out.getvalue()
+    assert "95.5" in written and "\033[7;22H" in written
+    assert "Total: 6" in written
+    assert "DEV00" not in written and "\033[2J" not in written
+
+def test_live_dashboard_follows_pushed_updates(monkeypatch):
+    updates = [live_update(FLEET), None, live_update({"DEV006": ("Anomaly", 40.0)}, total=6)]
+    live = live_dashboard(monkeypatch, lines=20, updates=updates)
+    live.run()
+    assert set(live.devices) == set(FLEET) | {"DEV006"}
+    assert "DEV006" in live.out.getvalue()
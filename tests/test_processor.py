@@ -0,0 +1,536 @@
+# tests/test_processor.py
+import math
+import os
+import random
+import sqlite3
+import statistics
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import main
+from main import database, processing
+
+# Per-device and per-class overrides, so the batch path has to pick limit rows per reading
+RULES = {
+    "default": {"temperature": {"warning": 60.0}},
+    "classes": {"pump": {"vibration": {"warning": 5.0, "critical": 8.0}}},
+    "devices": {
+        "DEV002": {"class": "pump"},
+        "DEV003": {"voltage": {"warning_low": 200.0, "critical_low": 185.0}},
+    },
+}
+
+# Exactly on a limit is not over it
+BOUNDARIES = {
+    "temperature": [60.0, 70.0, 85.0],
+    "vibration": [5.0, 7.0, 8.0, 10.0],
+    "voltage": [180.0, 185.0, 190.0, 200.0],
+}
+
+def random_readings(reading, count, seed=7):
+    rng = random.Random(seed)
+    def value(sensor, low, high):
+        if rng.random() < 0.2:
+            return rng.choice(BOUNDARIES[sensor])
+        return round(rng.uniform(low, high), 2)
+    return [
+        reading(
+            device_id=rng.choice(["DEV001", "DEV002", "DEV003", "DEV004"]),
+            message_id=i,
+            temperature=value("temperature", 40.0, 95.0),
+            vibration=value("vibration", 0.0, 12.0),
+            voltage=value("voltage", 170.0, 240.0),
+        )
+        for i in range(count)
+    ]
+
+@pytest.mark.parametrize("config", [None, RULES])
+def test_analyze_batch_matches_analyze_data(reading, config):
+    processor = processing.DataProcessor(None, None, rules=processing.ThresholdRules(config))
+    batch = random_readings(reading, 2000)
+    
+    codes, flags = processor.analyze_batch(batch)
+    
+    expected = [processor.analyze_data(data) for data in batch]
+    assert [(processing.STATUSES[c], processing.ALERT_TYPES[f]) for c, f in zip(codes, flags)] == expected
+    assert flags == [processor.rules.flags(data) for data in batch]
+    assert {status for status, _ in expected} == {"Good", "Warning", "Critical"}
+
+@pytest.mark.parametrize("batch_size", [1, 256])
+def test_main_processor_updates_device_health(tmp_path, reading, batch_size):
+    path = str(tmp_path / "sensor_data.db")
+    storage = database.DataStorage(path)
+    readings = processing.ReadingQueue(capacity=100)
+    processor = main.DataProcessor(readings, storage, batch_size=batch_size)
+    processor.start()
+    for i in range(5):
+        readings.put(reading(device_id="DEV001", message_id=i))
+    readings.put(reading(device_id="DEV002", message_id=5, temperature=90.0))
+    readings.join()
+    processor.stop()
+    processor.alert_sink.close()
+    storage.close()
+    
+    conn = sqlite3.connect(path)
+    health = conn.execute(
+        "SELECT device_id, status, packets_received, error_count FROM device_health ORDER BY device_id"
+    ).fetchall()
+    conn.close()
+    assert health == [("DEV001", "Good", 5, 0), ("DEV002", "Critical", 1, 1)]
+
+def test_sharded_processor_keeps_each_device_in_order(tmp_path, reading):
+    path = str(tmp_path / "sensor_data.db")
+    storage = database.DataStorage(path)
+    readings = processing.ReadingQueue(capacity=1000)
+    devices = [f"DEV00{n}" for n in range(1, 6)]
+    # Every seventh reading is critical; small batches interleave the shards' results
+    for i in range(300):
+        readings.put(reading(device_id=devices[i % 5], message_id=i // 5 + 1,
+                             temperature=90.0 if i % 7 == 0 else 30.0))
+    processor = main.ShardedProcessor(readings, storage, workers=2, batch_size=8)
+    processor.start()
+    readings.join()
+    processor.stop()
+    storage.close()
+    
+    conn = sqlite3.connect(path)
+    stored = conn.execute("SELECT device_id, message_id, status FROM sensor_readings ORDER BY id").fetchall()
+    health = conn.execute(
+        "SELECT device_id, packets_received, error_count FROM device_health ORDER BY device_id"
+    ).fetchall()
+    conn.close()
+    assert len(stored) == 300
+    for device_id in devices:
+        assert [m for d, m, _ in stored if d == device_id] == list(range(1, 61))
+    assert health == [
+        (d, 60, sum(1 for i in range(300) if devices[i % 5] == d and i % 7 == 0)) for d in devices
+    ]
+    assert sum(errors for _, _, errors in health) == sum(status == "Critical" for _, _, status in stored)
+
+def test_thresholds_default_to_the_built_in_limits(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["main.py"])
+    assert main.parse_args().thresholds is None
+    rules = main.load_rules(os.path.join(main.BASE_DIR, "thresholds.example.json"))
+    assert rules.limits("DEV001") == processing.ThresholdRules().limits("DEV001")
+
+def alert_lines(count, devices=3):
+    """One alert line per second from 10:00:00, cycling through the devices"""
+    return [
+        f"[2026-01-20 10:{i // 60:02d}:{i % 60:02d}] DEV{i % devices + 1:03d} - High Temperature: "
+        f"Temp={70 + i % 10}.5°C, Vib=1.0, Volt=220.0V\n"
+        for i in range(count)
+    ]
+
+def written_alert_log(path, lines, max_bytes=4096, backups=100):
+    log = processing.AlertLog(path, max_bytes=max_bytes, backups=backups)
+    for i in range(0, len(lines), 7):
+        log.write(lines[i:i + 7])
+    log.close()
+    return lines
+
+def test_alert_log_keeps_backups_compressed_archives(tmp_path, monkeypatch, capsys):
+    # Slow compression so rotations overlap with archives still being compressed
+    compress_archive = processing.compress_archive
+    def slow_compress_archive(archive):
+        time.sleep(0.01)
+        compress_archive(archive)
+    monkeypatch.setattr(processing, "compress_archive", slow_compress_archive)
+    path = str(tmp_path / "alerts.log")
+    written_alert_log(path, alert_lines(1000), max_bytes=2048, backups=2)
+    
+    # Pruning never pulls an archive from under its compressor
+    assert "Failed to compress" not in capsys.readouterr().out
+    numbers = processing.archive_numbers(path)
+    assert len(numbers) == 2
+    leftovers = sorted(name for name in os.listdir(tmp_path) if name[:11] == "alerts.log." and name[11].isdigit())
+    assert leftovers == sorted(
+        f"alerts.log.{number}{suffix}" for number in numbers for suffix in (".gz", ".blocks", ".idx")
+    )
+
+def test_alert_log_reader_tails_across_archives(tmp_path):
+    path = str(tmp_path / "alerts.log")
+    lines = written_alert_log(path, alert_lines(400))
+    assert processing.archive_numbers(path)
+    
+    reader = processing.AlertLogReader(path)
+    assert reader.tail(3) == [line.rstrip("\n") for line in lines[-3:]]
+    assert reader.tail(150) == [line.rstrip("\n") for line in lines[-150:]]
+    assert reader.tail(0) == []
+
+def test_alert_log_reader_searches_by_device_and_time(tmp_path):
+    path = str(tmp_path / "alerts.log")
+    lines = written_alert_log(path, alert_lines(400))
+    # Written after the last index flush, found by scanning the live log
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("[2026-01-20 10:06:40] DEV002 - Low Voltage: Temp=30.0°C, Vib=1.0, Volt=185.0V\n")
+    reader = processing.AlertLogReader(path)
+    
+    device = list(reader.search(device_id="DEV002"))
+    assert device[:-1] == [line.rstrip("\n") for line in lines if " DEV002 - " in line]
+    assert device[-1].endswith("Volt=185.0V")
+    
+    window = list(reader.search(start=datetime(2026, 1, 20, 10, 1), end=datetime(2026, 1, 20, 10, 2)))
+    assert window == [line.rstrip("\n") for line in lines[60:120]]
+    both = list(reader.search("DEV001", datetime(2026, 1, 20, 10, 1), datetime(2026, 1, 20, 10, 2)))
+    assert both == [line for line in window if " DEV001 - " in line]
+
+def sink_log(sink):
+    """Lines the sink wrote to the warning log, after closing it"""
+    sink.close()
+    with open(os.path.join(sink.log_dir, processing.ALERT_LOGS["Warning"]), encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f]
+
+def emit_alerts(sink, numbers):
+    return [sink.emit("Warning", f"alert {i}", f"alert {i}") for i in numbers]
+
+def test_alert_sink_block_policy_waits_for_room(tmp_path):
+    sink = processing.AlertSink(log_dir=str(tmp_path), capacity=2, policy="block")
+    assert emit_alerts(sink, [1, 2]) == [True, True]
+    producer = threading.Thread(target=emit_alerts, args=(sink, [3]), daemon=True)
+    producer.start()
+    producer.join(timeout=0.3)
+    assert producer.is_alive()
+    
+    # The writer thread makes room
+    sink.start()
+    producer.join(timeout=2)
+    assert not producer.is_alive()
+    assert sink_log(sink) == ["alert 1", "alert 2", "alert 3"]
+    assert sink.dropped_count == 0
+
+def test_alert_sink_drop_oldest_policy(tmp_path):
+    sink = processing.AlertSink(log_dir=str(tmp_path), capacity=3, policy="drop-oldest")
+    assert all(emit_alerts(sink, range(1, 6)))
+    assert sink.dropped_count == 2
+    lines = sink_log(sink)
+    assert lines[:3] == ["alert 3", "alert 4", "alert 5"]
+    assert lines[3].endswith("2 alerts dropped (buffer full, policy drop-oldest)")
+
+def test_alert_sink_sample_policy_keeps_one_in_sample_every(tmp_path):
+    sink = processing.AlertSink(log_dir=str(tmp_path), capacity=3, policy="sample", sample_every=2)
+    # Past the third, every second alert is kept in place of the oldest
+    assert emit_alerts(sink, range(1, 8)) == [True, True, True, False, True, False, True]
+    assert sink.dropped_count == 4
+    lines = sink_log(sink)
+    assert lines[:3] == ["alert 3", "alert 5", "alert 7"]
+    assert lines[3].endswith("4 alerts dropped (buffer full, policy sample)")
+
+def alert_records(reading, count):
+    """Alerts of every status and alert type, with a summary (only its worst value) every tenth"""
+    records = []
+    for i in range(count):
+        timestamp = f"2026-01-20T10:00:{i % 60:02d}.{i:06d}"
+        if i % 10 == 9:
+            records.append(("summary", timestamp, f"DEV{i % 4:03d}", "Warning", "High Vibration",
+                            None, 7.5 + i, None, i))
+        else:
+            flags = i % (processing.ANOMALY_MASK + 1)
+            status = processing.STATUSES[processing.status_code_for(flags)]
+            data = reading(device_id=f"DEV{i % 4:03d}", timestamp=timestamp,
+                           temperature=60.0 + i / 4, vibration=i / 8, voltage=230.0 - i / 2)
+            records.append(processing.alert_record(data, status, processing.ALERT_TYPES[flags]))
+    return records
+
+@pytest.mark.parametrize("record_format, mmap", [("jsonl", False), ("binary", False), ("binary", True)])
+def test_load_alerts_round_trip(tmp_path, reading, record_format, mmap):
+    path = str(tmp_path / processing.ALERT_RECORD_FILES[record_format])
+    records = alert_records(reading, 300)
+    records_file = processing.AlertRecordFile(path, record_format, max_bytes=4096, backups=100)
+    for i in range(0, len(records), 16):
+        records_file.write(records[i:i + 16])
+    records_file.close()
+    assert processing.archive_numbers(path)
+    
+    columns = processing.load_alerts(path, mmap=mmap)
+    
+    for field_index, field in enumerate(processing.ALERT_RECORD_FIELDS):
+        expected = [record[field_index] for record in records]
+        if field == "timestamp":
+            expected = [datetime.fromisoformat(value) for value in expected]
+            assert columns[field].astype(datetime).tolist() == expected
+        elif field in ("temperature", "vibration", "voltage"):
+            assert [None if math.isnan(value) else value for value in columns[field].tolist()] == expected
+        else:
+            assert columns[field].tolist() == expected
+    assert columns["status_code"].tolist() == [processing.STATUSES.index(r[3]) for r in records]
+    assert columns["flags"].tolist() == [processing.ALERT_FLAGS_BY_TYPE[r[4]] for r in records]
+    assert len(processing.load_alerts(path, archives=False)["kind"]) < len(records)
+
+def test_binary_alert_records_drop_a_truncated_record(tmp_path, reading):
+    path = str(tmp_path / "alerts.bin")
+    records = alert_records(reading, 20)
+    records_file = processing.AlertRecordFile(path, "binary")
+    records_file.write(records[:10])
+    records_file.close()
+    # A crash mid-write leaves part of a record behind
+    with open(path, "ab") as f:
+        f.write(processing.encode_alert_record(records[10])[:7])
+    
+    records_file = processing.AlertRecordFile(path, "binary")
+    records_file.write(records[10:])
+    records_file.close()
+    
+    timestamps = processing.load_alerts(path)["timestamp"].astype(datetime).tolist()
+    assert timestamps == [datetime.fromisoformat(record[1]) for record in records]
+
+def device_ids(batch):
+    return [(data["device_id"], data["message_id"]) for data in batch]
+
+def joins(readings):
+    joiner = threading.Thread(target=readings.join, daemon=True)
+    joiner.start()
+    joiner.join(timeout=2)
+    return not joiner.is_alive()
+
+def test_block_policy_gives_up_after_the_timeout(reading):
+    readings = processing.ReadingQueue(capacity=2, policy="block", block_timeout=0.01)
+    assert readings.put(reading(message_id=1)) and readings.put(reading(message_id=2))
+    assert not readings.put(reading(message_id=3))
+    assert not readings.put_nowait(reading(message_id=4))
+    assert readings.dropped["timeout"] == 2
+    assert device_ids(readings.get_many(10)) == [("DEV001", 1), ("DEV001", 2)]
+
+@pytest.mark.parametrize("policy, kept, cause", [
+    ("drop-newest", [1, 2, 3], "newest"),
+    ("drop-oldest", [3, 4, 5], "oldest"),
+])
+def test_drop_policies(reading, policy, kept, cause):
+    readings = processing.ReadingQueue(capacity=3, policy=policy)
+    accepted = [readings.put(reading(message_id=i)) for i in range(1, 6)]
+    assert accepted == [True, True, True] + [policy == "drop-oldest"] * 2
+    assert readings.dropped[cause] == 2 and readings.dropped_count == 2
+    assert readings.full() and readings.metrics()["high_water"] == 3
+    
+    batch = readings.get_many(10)
+    assert [data["message_id"] for data in batch] == kept
+    readings.task_done(len(batch))
+    # Dropped readings do not hold up join
+    assert joins(readings)
+
+def test_fair_policy_evicts_the_heaviest_device(reading):
+    readings = processing.ReadingQueue(capacity=4, policy="fair")
+    for i in range(1, 5):
+        assert readings.put(reading(device_id="DEV001", message_id=i))
+    # Under its share of 2, so DEV001's oldest readings make room
+    assert readings.put(reading(device_id="DEV002", message_id=1))
+    assert readings.put(reading(device_id="DEV002", message_id=2))
+    # At its share now
+    assert not readings.put(reading(device_id="DEV002", message_id=3))
+    assert readings.dropped["fair"] == 1 and readings.qsize() == 4
+    
+    assert device_ids(readings.get_many(10)) == [
+        ("DEV001", 3), ("DEV001", 4), ("DEV002", 1), ("DEV002", 2)
+    ]
+    readings.task_done(4)
+    assert joins(readings)
+
+def test_fair_policy_keeps_order_and_shares_under_churn(reading):
+    rng = random.Random(3)
+    capacity = 8
+    readings = processing.ReadingQueue(capacity=capacity, policy="fair")
+    put, got = [], []
+    for i in range(20000):
+        if rng.random() < 0.8:
+            # DEV001 floods, the others trickle
+            device_id = "DEV001" if rng.random() < 0.6 else f"DEV00{rng.randint(2, 5)}"
+            data = reading(device_id=device_id, message_id=i)
+            if readings.put(data):
+                put.append(data)
+        else:
+            try:
+                got += readings.get_many(rng.randint(1, 3), block=False)
+            except processing.queue.Empty:
+                pass
+        assert readings.qsize() <= capacity
+    # A full queue of DEV001 still takes a reading of every other device
+    for i, device_id in enumerate(["DEV001"] * capacity + ["DEV002", "DEV003", "DEV004", "DEV005"], 20000):
+        data = reading(device_id=device_id, message_id=i)
+        if readings.put(data):
+            put.append(data)
+    queued = readings.get_many(capacity, block=False)
+    assert {data["device_id"] for data in queued} == {"DEV001", "DEV002", "DEV003", "DEV004", "DEV005"}
+    got += queued
+    
+    # Every reading comes out at most once, in enqueue order
+    order = [data["message_id"] for data in got]
+    assert order == sorted(set(order))
+    assert set(order) <= {data["message_id"] for data in put}
+    assert readings.empty()
+    readings.task_done(len(got))
+    assert joins(readings)
+
+class SlowRecorder:
+    """StreamRecorder stand-in whose writes wait until released"""
+    def __init__(self):
+        self.recorded = []
+        self.writing = threading.Event()
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        
+    def record(self, data):
+        with self.lock:
+            self.writing.set()
+            self.release.wait(timeout=5)
+            self.recorded.append(data)
+
+def test_recording_does_not_hold_up_the_consumer(reading):
+    slow = SlowRecorder()
+    readings = processing.ReadingQueue(capacity=10, recorder=slow)
+    producer = threading.Thread(target=readings.put, args=(reading(message_id=1),))
+    producer.start()
+    assert slow.writing.wait(timeout=2)
+    
+    started = time.monotonic()
+    assert readings.get(timeout=2)["message_id"] == 1
+    assert time.monotonic() - started < 1.0
+    slow.release.set()
+    producer.join(timeout=2)
+    assert [data["message_id"] for data in slow.recorded] == [1]
+
+def test_concurrent_producers_record_in_queue_order(reading):
+    slow = SlowRecorder()
+    slow.release.set()
+    readings = processing.ReadingQueue(capacity=10000, recorder=slow)
+    def produce(device_id):
+        for i in range(500):
+            readings.put(reading(device_id=device_id, message_id=i))
+    producers = [threading.Thread(target=produce, args=(f"DEV00{n}",)) for n in range(1, 5)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    
+    assert device_ids(slow.recorded) == device_ids(readings.get_many(10000))
+    assert len(slow.recorded) == 2000 and not readings.unrecorded
+
+class AlertLogs:
+    """log_alert / log_summary callbacks collecting what an AlertManager emits"""
+    def __init__(self):
+        self.alerts = []
+        self.summaries = []
+        
+    def log_alert(self, data, status, alert_type):
+        self.alerts.append((data["message_id"], status, alert_type))
+        
+    def log_summary(self, status, entry, record=None):
+        self.summaries.append((status, record[4], record[8]))
+
+def managed(manager, logs, data, now):
+    status = processing.STATUSES[processing.status_code_for(processing.ThresholdRules().flags(data))]
+    manager.process(data, status, processing.ThresholdRules(), logs.log_alert, logs.log_summary, now=now)
+
+def test_alert_manager_fires_on_rising_levels_only(reading):
+    manager, logs = processing.AlertManager(cooldown=60.0), AlertLogs()
+    for i, temperature in enumerate([30.0, 75.0, 76.0, 90.0, 91.0], 1):
+        managed(manager, logs, reading(message_id=i, temperature=temperature), now=i)
+    assert logs.alerts == [(2, "Warning", "High Temperature Warning"), (4, "Critical", "High Temperature")]
+    # The repeat at warning level is summarized when the level rises
+    assert logs.summaries == [("Warning", "High Temperature Warning", 1)]
+    assert (manager.raised_count, manager.suppressed_count) == (2, 2)
+
+def test_alert_manager_coalesces_repeats_per_cooldown(reading):
+    manager, logs = processing.AlertManager(cooldown=10.0), AlertLogs()
+    for second in range(25):
+        managed(manager, logs, reading(message_id=second, temperature=80.0 + second % 3), now=float(second))
+    assert logs.alerts == [(0, "Warning", "High Temperature Warning")]
+    # Repeats of seconds 1-10 at 10 s, then 11-20 at 20 s
+    assert logs.summaries == [("Warning", "High Temperature Warning", 10)] * 2
+    
+    # Quiet from here on: the sweep emits what came due, the flush the rest
+    manager.sweep(logs.log_summary, now=29.0)
+    assert len(logs.summaries) == 2
+    manager.sweep(logs.log_summary, now=30.0)
+    assert logs.summaries[-1] == ("Warning", "High Temperature Warning", 4)
+    manager.flush(logs.log_summary, now=31.0)
+    assert len(logs.summaries) == 3
+
+def test_alert_manager_summary_reports_the_worst_value(reading):
+    manager, logs = processing.AlertManager(cooldown=60.0), AlertLogs()
+    for i, voltage in enumerate([185.0, 183.0, 187.0], 1):
+        managed(manager, logs, reading(message_id=i, voltage=voltage), now=i)
+    records = []
+    manager.flush(lambda status, entry, record=None: records.append(record), now=4.0)
+    kind, _, device_id, status, alert_type, temperature, vibration, voltage, repeats = records[0]
+    assert (kind, device_id, status, alert_type, repeats) == ("summary", "DEV001", "Warning", "Low Voltage Warning", 2)
+    assert (temperature, vibration, voltage) == (None, None, 183.0)
+    
+    # Back to normal: nothing left to report, the state is gone
+    managed(manager, logs, reading(message_id=4), now=5.0)
+    assert not manager.states
+
+def test_alert_manager_clears_only_past_the_hysteresis_band(reading):
+    manager, logs = processing.AlertManager(cooldown=60.0), AlertLogs()
+    # Warning at 70 °C, cleared only below 70 - 2
+    for i, temperature in enumerate([71.0, 69.0, 71.0, 68.5, 67.9, 71.0], 1):
+        managed(manager, logs, reading(message_id=i, temperature=temperature), now=i)
+    assert [message_id for message_id, _, _ in logs.alerts] == [1, 6]
+    # The three repeats (69.0 and 68.5 still inside the band) are summarized when the level clears
+    assert logs.summaries == [("Warning", "High Temperature Warning", 3)]
+
+def test_processor_sweeps_when_idle_and_flushes_on_stop(tmp_path, reading):
+    storage = database.DataStorage(str(tmp_path / "sensor_data.db"))
+    readings = processing.ReadingQueue(capacity=10)
+    processor = processing.DataProcessor(readings, storage, alert_manager=processing.AlertManager(cooldown=0.5))
+    repeats = []
+    log_summary = processor.log_summary
+    def counting_log_summary(status, entry, record=None):
+        repeats.append(record[8])
+        log_summary(status, entry, record)
+    processor.log_summary = counting_log_summary
+    processor.start()
+    for i in range(3):
+        readings.put(reading(message_id=i, temperature=80.0))
+    readings.join()
+    # No more readings: the idle sweep (at most 1 s apart) reports the 2 repeats
+    deadline = time.monotonic() + 3
+    while not repeats and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert repeats == [2]
+    
+    readings.put(reading(message_id=3, temperature=80.0))
+    readings.join()
+    processor.stop()
+    storage.close()
+    assert repeats == [2, 1]
+
+def test_rolling_stats_match_a_brute_force_reference():
+    rng = random.Random(11)
+    stats = processing.RollingStats(window=10.0)
+    history = {"A": [], "B": []}
+    t = 0.0
+    for _ in range(600):
+        # Mostly short steps, sometimes a gap longer than the window
+        t += rng.choice([0.1, 0.5, 1.0, 2.0, 15.0])
+        device = rng.choice("AB")
+        values = (rng.uniform(20, 90), rng.uniform(0, 12), rng.uniform(170, 240))
+        stats.update(device, t, values)
+        history[device].append((t, values))
+        
+        seen = history[device]
+        for i, metric in enumerate(processing.METRICS):
+            got = stats.get(device, metric)
+            column = [v[i] for _, v in seen]
+            windowed = [v[i] for when, v in seen if when >= t - stats.window]
+            assert got["count"] == len(column)
+            assert got["mean"] == pytest.approx(sum(column) / len(column))
+            expected_std = statistics.stdev(column) if len(column) > 1 else 0.0
+            assert got["std"] == pytest.approx(expected_std)
+            assert (got["min"], got["max"]) == (min(windowed), max(windowed))
+            if len(seen) > 1:
+                (before, previous), (now, latest) = seen[-2], seen[-1]
+                assert got["rate"] == pytest.approx((latest[i] - previous[i]) / (now - before))
+    assert stats.get("C", "temperature") is None
+
+def test_rolling_stats_window_keeps_ties_and_the_boundary():
+    stats = processing.RollingStats(window=5.0)
+    for t, value in [(0.0, 50.0), (1.0, 50.0), (2.0, 40.0), (6.0, 45.0), (7.0, 45.0)]:
+        stats.update("A", t, (value, 1.0, 230.0))
+    # At t=7 the window starts at 2.0: the 40.0 reading is exactly on it
+    got = stats.get("A", "temperature")
+    assert (got["min"], got["max"]) == (40.0, 45.0)
+    stats.update("A", 7.5, (44.0, 1.0, 230.0))
+    got = stats.get("A", "temperature")
+    assert (got["min"], got["max"], got["rate"]) == (44.0, 45.0, -2.0)
@@ -0,0 +1,65 @@
+# tests/test_recorder.py
+import queue
+
+from main import recorder
+
+def recorded_readings(reading):
+    return [
+        reading(device_id="DEV001", message_id=1, timestamp="2026-01-20T10:00:00.123456", temperature=71.25),
+        reading(device_id="DEV002", message_id=2, timestamp="2026-01-20T10:00:01", device_name="Pumpe Süd"),
+        reading(device_id="DEV001", message_id=3, timestamp="2026-01-20T10:00:02.000001", voltage=0.1 + 0.2),
+    ]
+
+def replayed(path):
+    return [data for _, data in recorder.StreamReplayer(path).readings()]
+
+def test_replay_returns_the_recorded_readings(tmp_path, reading):
+    path = str(tmp_path / "stream.rec")
+    readings = recorded_readings(reading)
+    stream = recorder.StreamRecorder(path)
+    for data in readings:
+        stream.record(data)
+    stream.close()
+    
+    assert replayed(path) == readings
+    offsets = [offset for offset, _ in recorder.StreamReplayer(path).readings()]
+    assert offsets == sorted(offsets)
+
+def test_reopened_recording_appends_after_a_truncated_tail(tmp_path, reading):
+    path = str(tmp_path / "stream.rec")
+    first, second = recorded_readings(reading)[:2], recorded_readings(reading)[2:]
+    stream = recorder.StreamRecorder(path)
+    for data in first:
+        stream.record(data)
+    stream.close()
+    # A crash mid-write leaves part of a record behind
+    with open(path, "ab") as f:
+        f.write(b"R\x00\x01")
+    
+    stream = recorder.StreamRecorder(path)
+    for data in second:
+        stream.record(data)
+    stream.close()
+    
+    assert replayed(path) == first + second
+    # Devices seen in the first session keep their index
+    devices = [fields for kind, fields in recorder.StreamReplayer(path).records() if kind == 'D']
+    assert devices == [(0, "DEV001", "Device DEV001"), (1, "DEV002", "Pumpe Süd")]
+
+def test_replay_thread_feeds_the_recording_into_a_queue(tmp_path, reading):
+    path = str(tmp_path / "stream.rec")
+    readings = recorded_readings(reading)
+    stream = recorder.StreamRecorder(path)
+    for data in readings:
+        stream.record(data)
+    stream.close()
+    
+    data_queue = queue.Queue()
+    replay = recorder.ReplayThread(path, data_queue, speed=0)
+    replay.start()
+    replay.join(timeout=10)
+    
+    fed = [data_queue.get_nowait() for _ in range(data_queue.qsize())]
+    assert replay.packets_sent == len(readings)
+    assert all('generated_at' in data for data in fed)
+    assert [{k: v for k, v in data.items() if k != 'generated_at'} for data in fed] == readings
@@ -0,0 +1,65 @@
+# tests/test_simulator.py
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from main import database, processing, sensors
+
+def test_batch_timestamps_are_local_wall_time():
+    generator = sensors.BatchGenerator(devices=3, seed=1)
+    before = datetime.now()
+    rows = generator.rows(generator.generate(2))
+    
+    timestamps = [datetime.fromisoformat(row['timestamp']) for row in rows]
+    # Two readings per device, each 1-2 s after the previous one
+    assert all(before < t <= before + timedelta(seconds=5) for t in timestamps)
+    assert timestamps == sorted(timestamps)
+
+def test_generate_continues_each_device_clock_unless_restarted():
+    generator = sensors.BatchGenerator(devices=2, seed=1)
+    start = datetime(2026, 1, 20, 10, 0, 0)
+    first = generator.generate(3, start=start)
+    second = generator.generate(3)
+    assert second['timestamp'].min() > first['timestamp'].max()
+    assert sorted(second['message_id'].tolist()) == [4, 4, 5, 5, 6, 6]
+    
+    restarted = generator.generate(1, start=start)
+    earliest = restarted['timestamp'].min().astype(datetime)
+    assert start + timedelta(seconds=1) <= earliest <= start + timedelta(seconds=2)
+
+@pytest.mark.parametrize("count", [0, -1])
+def test_generate_rejects_empty_batches(count):
+    generator = sensors.BatchGenerator(devices=2, seed=1)
+    with pytest.raises(ValueError):
+        generator.generate(count)
+
+# Device overrides, so the column path has to pick limit rows per device
+RULES = {
+    "default": {"temperature": {"warning": 60.0}},
+    "classes": {"pump": {"vibration": {"warning": 5.0, "critical": 8.0}}},
+    "devices": {"DEV0002": {"class": "pump"}, "DEV0003": {"voltage": {"warning_low": 215.0}}},
+}
+
+def test_dispatch_matches_the_dict_path(tmp_path):
+    rates = {"temperature": 0.3, "vibration": 0.3, "voltage": 0.3}
+    start = datetime(2026, 1, 20, 10, 0, 0)
+    path = str(tmp_path / "sensor_data.db")
+    storage = database.DataStorage(path)
+    processor = processing.DataProcessor(None, storage, rules=processing.ThresholdRules(RULES))
+    sensors.BatchGenerator(devices=4, anomaly_rates=rates, seed=3).dispatch(processor, 50, start=start)
+    processor.alert_sink.close()
+    storage.close()
+    
+    generator = sensors.BatchGenerator(devices=4, anomaly_rates=rates, seed=3)
+    rows = generator.rows(generator.generate(50, start=start))
+    expected = sorted(
+        (row['device_id'], row['message_id'], *processor.analyze_data(row)) for row in rows
+    )
+    conn = sqlite3.connect(path)
+    stored = conn.execute(
+        "SELECT device_id, message_id, status, alert_type FROM sensor_readings ORDER BY device_id, message_id"
+    ).fetchall()
+    conn.close()
+    assert stored == expected
+    assert {status for _, _, status, _ in stored} == {"Good", "Warning", "Critical"}
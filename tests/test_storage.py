@@ -0,0 +1,195 @@
+# tests/test_storage.py
+import argparse
+import csv
+import io
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+from main import database
+
+def rollup_readings(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT SUM(readings) FROM rollup_1m").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_reopened_compact_database_runs_newer_migrations(tmp_path, reading):
+    path = str(tmp_path / "compact.db")
+    storage = database.DataStorage(path, layout='compact')
+    storage.store_sensor_data(reading())
+    storage.close()
+    
+    # Turn it into a database from before the rollup backfill migration
+    conn = sqlite3.connect(path)
+    conn.executescript("DROP TABLE rollup_1m; DROP TABLE rollup_1h;")
+    conn.execute(f"PRAGMA user_version = {database.SCHEMA_VERSION - 1}")
+    conn.close()
+    
+    storage = database.DataStorage(path, layout='compact')
+    storage.migrator.join(timeout=10)
+    storage.close()
+    conn = sqlite3.connect(path)
+    assert database.schema_version(conn) == database.SCHEMA_VERSION
+    conn.close()
+    assert rollup_readings(path) == 1
+
+class StopAfter:
+    """Stop event that is set after a number of checks, to interrupt a backfill between chunks"""
+    def __init__(self, checks):
+        self.checks = checks
+        
+    def is_set(self):
+        self.checks -= 1
+        return self.checks < 0
+
+def database_needing_rollup_backfill(path, reading, count):
+    """A standard database whose readings predate the rollup tables"""
+    storage = database.DataStorage(path)
+    for i in range(count):
+        storage.store_sensor_data(reading(f"DEV{i % 3 + 1:03d}", i + 1,
+                                          f"2026-01-20T10:{i // 600 % 60:02d}:{i // 10 % 60:02d}"))
+    storage.close()
+    conn = sqlite3.connect(path)
+    conn.executescript("DROP TABLE rollup_1m; DROP TABLE rollup_1h;")
+    database.ensure_rollups(conn)
+    return conn
+
+def test_backfill_rollups_resumes_after_interruption(tmp_path, reading):
+    path = str(tmp_path / "sensor.db")
+    conn = database_needing_rollup_backfill(path, reading, 12000)
+    
+    database.backfill_rollups(conn, chunk_size=5000, stop=StopAfter(1))
+    assert conn.execute("SELECT done_id FROM rollup_backfill").fetchone()[0] == 5000
+    assert rollup_readings(path) == 5000
+    
+    # A rerun, or a second migrator, starts from the saved id
+    database.backfill_rollups(conn, chunk_size=5000)
+    database.backfill_rollups(conn, chunk_size=5000)
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'rollup_backfill'").fetchone()
+    conn.close()
+    assert rollup_readings(path) == 12000
+
+def test_close_stops_the_migrator(tmp_path):
+    storage = database.DataStorage(str(tmp_path / "sensor.db"))
+    storage.close()
+    assert not storage.migrator.is_alive()
+
+def report_database(path, reading, layout='standard'):
+    """2026-01-20: DEV001 with an outage, a message_id gap and a restart; DEV002 steady, temperatures 1-100"""
+    base = datetime(2026, 1, 20, 10, 0, 0)
+    def at(seconds):
+        return (base + timedelta(seconds=seconds)).isoformat()
+    storage = database.DataStorage(path, layout=layout)
+    # Every 5 s, then 60 s silent, back at message 14, restarted at 1
+    dev001 = [(i * 5, i + 1) for i in range(10)] + [(105, 14), (110, 15), (115, 1)]
+    for seconds, message_id in dev001:
+        extra = {}
+        if message_id == 15:
+            extra = {"status": "Critical", "alert_type": "High Temperature, High Vibration"}
+        storage.store_sensor_data(reading("DEV001", message_id, at(seconds), **extra))
+    for i in range(100):
+        storage.store_sensor_data(reading("DEV002", i + 1, at(i * 2), temperature=float(i + 1)))
+    storage.close()
+
+def test_streaming_report_over_a_fixed_database(tmp_path, reading):
+    path = str(tmp_path / "sensor_data.db")
+    report_database(path, reading)
+    start, end = database.day_bounds("2026-01-20")
+    conn = sqlite3.connect(path)
+    report = database.stream_report(conn, start, end, fetch_size=7, now=end + 86400)
+    conn.close()
+    
+    assert report["readings"] == 113
+    assert report["statuses"] == {"Critical": 1, "Good": 112}
+    assert report["alerts"] == {"High Temperature": 1, "High Vibration": 1}
+    dev001, dev002 = report["devices"]["DEV001"], report["devices"]["DEV002"]
+    gaps = ("outages", "message_gaps", "missing_messages", "message_resets")
+    assert [dev001[key] for key in gaps] == [1, 1, 3, 1]
+    assert dev001["uptime_seconds"] == 45 + 10
+    assert (dev001["first_seen"], dev001["last_seen"]) == ("2026-01-20T10:00:00", "2026-01-20T10:01:55")
+    assert dev002["metrics"]["temperature"] == {
+        "min": 1.0, "max": 100.0, "mean": 50.5, "p50": 50.0, "p95": 95.0, "p99": 99.0
+    }
+    assert [dev002[key] for key in gaps] == [0, 0, 0, 0]
+    # A past day: uptime relative to the whole day
+    assert dev002["uptime_seconds"] == 198 and dev002["uptime_percent"] == round(100 * 198 / 86400, 2)
+
+def test_report_uptime_counts_only_the_part_of_the_range_that_has_passed(tmp_path, reading):
+    path = str(tmp_path / "sensor_data.db")
+    report_database(path, reading)
+    start, end = database.day_bounds("2026-01-20")
+    conn = sqlite3.connect(path)
+    # Today, shortly after the last reading
+    today = database.stream_report(conn, start, end, device_id="DEV002", now=start + 36000 + 200)
+    # Tomorrow has not begun
+    tomorrow = database.stream_report(conn, end, end + 86400, now=start + 36000 + 200)
+    conn.close()
+    
+    assert list(today["devices"]) == ["DEV002"]
+    assert today["devices"]["DEV002"]["uptime_percent"] == round(100 * 198 / 36200, 2)
+    assert tomorrow["readings"] == 0 and tomorrow["devices"] == {}
+
+@pytest.mark.parametrize("layout", ["compact", "partitioned"])
+def test_report_is_the_same_for_every_layout(tmp_path, reading, layout):
+    start, end = database.day_bounds("2026-01-20")
+    reports = []
+    for name, kind in (("standard.db", "standard"), (f"{layout}.db", layout)):
+        path = str(tmp_path / name)
+        report_database(path, reading, layout=kind)
+        conn = sqlite3.connect(path)
+        report = database.stream_report(conn, start, end, now=end)
+        conn.close()
+        report.pop("generated")
+        reports.append(report)
+    assert reports[0] == reports[1]
+
+def fixed_report(tmp_path, reading):
+    path = str(tmp_path / "sensor_data.db")
+    report_database(path, reading)
+    start, end = database.day_bounds("2026-01-20")
+    conn = sqlite3.connect(path)
+    report = database.stream_report(conn, start, end, now=end)
+    conn.close()
+    return report
+
+def test_write_report_formats(tmp_path, reading):
+    report = fixed_report(tmp_path, reading)
+    written = {}
+    for report_format in main.REPORT_FORMATS:
+        f = io.StringIO()
+        main.write_report(report, f, report_format)
+        written[report_format] = f.getvalue()
+    
+    assert json.loads(written["json"]) == report
+    
+    rows = {row["device_id"]: row for row in csv.DictReader(io.StringIO(written["csv"]))}
+    assert list(rows) == ["DEV001", "DEV002"]
+    assert rows["DEV001"]["readings"] == "13" and rows["DEV001"]["critical"] == "1"
+    assert [rows["DEV001"][key] for key in ("message_gaps", "missing_messages", "message_resets")] == ["1", "3", "1"]
+    assert rows["DEV001"]["High Vibration"] == "1" and rows["DEV002"]["High Vibration"] == "0"
+    assert (rows["DEV002"]["temperature_p50"], rows["DEV002"]["temperature_p99"]) == ("50.0", "99.0")
+    
+    text = written["text"].splitlines()
+    assert text[0] == "SENSOR REPORT - 2026-01-20T00:00:00 to 2026-01-21T00:00:00"
+    assert "Total Readings: 113" in text and "  High Temperature: 1" in text
+    assert "DEV001: 13 readings, 2026-01-20T10:00:00 - 2026-01-20T10:01:55" in text
+    assert any(line.startswith("  Uptime") and "1 outages), message gaps 1 (3 missing), restarts 1" in line
+               for line in text)
+    assert any(line.startswith("  Temperature") and "p50 50.00  p95 95.00  p99 99.00" in line for line in text)
+
+def test_run_report_writes_one_device_to_the_default_path(tmp_path, reading, capsys):
+    # run_report reads sensor_data.db in the working directory (the test's tmp_path)
+    report_database("sensor_data.db", reading)
+    args = argparse.Namespace(report=main.parse_report_days("2026-01-20"), report_device="DEV001",
+                              report_format="json", report_output=None)
+    assert main.run_report(args) == 0
+    
+    with open("reports/report_2026-01-20.json", encoding="utf-8") as f:
+        report = json.load(f)
+    assert list(report["devices"]) == ["DEV001"] and report["readings"] == 13
+    assert "Report of 13 readings from 1 devices saved to: reports/report_2026-01-20.json" in capsys.readouterr().out